@@ -1,17 +1,32 @@
 """
 广府非遗文化专家智能体模块
+专家类在第一次访问时才导入，启动时不加载全部专家
 """
 
-from .cantonese_opera_expert import CantoneseOperaExpert
-from .architecture_expert import ArchitectureExpert
-from .culinary_expert import CulinaryExpert
-from .festival_expert import FestivalExpert
-from .collaboration_manager import CollaborationManager
+import importlib
+
+from .base_expert import BaseExpert
+from .registry import EXPERT_REGISTRY, get_expert_registry, get_ambassador
+
+# 类名 -> 所在模块
+_LAZY_CLASSES = {spec["class"]: spec["module"] for spec in EXPERT_REGISTRY.values()}
+_LAZY_CLASSES["GuangfuAmbassador"] = "agents.guangfu_ambassador"
+_LAZY_CLASSES["CollaborationManager"] = "agents.collaboration_manager"
 
 __all__ = [
+    "BaseExpert",
     "CantoneseOperaExpert",
     "ArchitectureExpert", 
     "CulinaryExpert",
     "FestivalExpert",
-    "CollaborationManager"
+    "CollaborationManager",
+    "get_expert_registry",
+    "get_ambassador"
 ]
+
+
+def __getattr__(name):
+    module = _LAZY_CLASSES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module), name)
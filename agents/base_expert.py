@@ -0,0 +1,282 @@
+"""
+专家智能体基类
+各位专家的查询、流式查询、专家互动流程相同，子类只声明人设、提示词和知识等数据
+"""
+
+from typing import Dict, Any, List, Optional
+import logging
+from core.provider_router import get_llm_client
+from core.session_store import get_session_store
+from core.response_cache import get_response_cache
+from core.retrieval import get_retrieval_service
+from config import Config
+from utils.response_renderer import render_response
+from utils.text_replay import replay_text
+
+logger = logging.getLogger(__name__)
+
+# 专家互动时对其他专家的称呼
+PEER_TITLES = {
+    'cantonese_opera': '粤剧专家梅韵师傅',
+    'architecture': '建筑专家石匠老师',
+    'culinary': '美食专家味师傅',
+    'festival': '节庆专家庆典老师',
+    'tea_culture': '茶文化专家茗香居士',
+    'craft': '手工艺专家艺师傅',
+    'literature': '诗词文学专家文师傅',
+    'tcm': '中医药专家老中医师傅'
+}
+
+# 专业介绍模式的附加提示词
+PROFESSIONAL_MODE_PROMPT = "\n\n【当前模式】：专业介绍模式 - 请根据问题复杂度选择合适的回复格式。"
+
+
+class BaseExpert:
+    """专家智能体基类
+
+    子类通过类属性声明：
+    - agent_type / name / specialties / personality / description：专家标识和介绍
+    - system_prompt：系统提示词；casual_prompt：闲聊模式的附加提示词，为空时不区分对话情境
+    - domain / persona：专业领域和人设称呼，用于专家互动；persona 为空时不参与互动
+    - knowledge_category：检索背景知识的知识库分类；default_knowledge：没有检索到时使用的背景知识，
+      两者都为空时不附加背景知识
+    - default_response：上游服务不可用时的默认回复；topic：出错时重新介绍的主题
+    - full_temperature / full_max_tokens / render_full：非流式回复的生成参数和是否渲染为卡片
+    """
+
+    agent_type = ""
+    name = ""
+    specialties: List[str] = []
+    personality = ""
+    description = ""
+
+    system_prompt = ""
+    casual_prompt = ""
+
+    domain = ""
+    persona = ""
+
+    knowledge_category = ""
+    default_knowledge = ""
+    default_response = ""
+    topic = ""
+
+    full_temperature = 0.7
+    full_max_tokens = 2000
+    render_full = True
+
+    def __init__(self):
+        self.llm_client = get_llm_client(self.agent_type)
+        self.session_store = get_session_store()
+        self.response_cache = get_response_cache()
+
+    def _interaction_messages(self, user_query: str, other_responses: Dict[str, str]) -> Optional[List[Dict[str, str]]]:
+        """构建互动消息；不参与互动或没有其他专家的回答时返回 None"""
+        if not self.persona:
+            return None
+
+        other_expert_content = []
+        for expert_key, response in other_responses.items():
+            if expert_key != self.agent_type:  # 排除自己
+                expert_name = PEER_TITLES.get(expert_key, expert_key)
+                other_expert_content.append(f"{expert_name}的观点：{response}")
+
+        if not other_expert_content:
+            return None  # 没有其他专家的回答，不需要互动
+
+        return [
+            {"role": "system", "content": self.system_prompt + f"\n\n现在你需要针对其他专家的回答进行互动，可以：1)补充{self.domain}相关的内容 2)找出与{self.domain}的关联 3)提供不同角度的见解 4)表达认同或不同观点。保持{self.persona}的人格特质。"},
+            {
+                "role": "user",
+                "content": f"""用户问题：{user_query}
+
+其他专家的回答：
+{chr(10).join(other_expert_content)}
+
+请作为{self.domain}专家{self.persona}，针对其他专家的观点进行互动回应。可以补充{self.domain}相关的内容，或者从{self.domain}角度提供不同的见解。"""
+            }
+        ]
+
+    async def interact_with_other_experts(self, user_query: str, other_responses: Dict[str, str]) -> str:
+        """与其他专家互动，针对他们的回答进行补充或讨论"""
+        try:
+            messages = self._interaction_messages(user_query, other_responses)
+            if messages is None:
+                return ""
+
+            response_parts = []
+            async for chunk in self.llm_client.chat_completion(
+                messages=messages,
+                model=Config.SILICON_FLOW_MODEL,
+                temperature=0.8,
+                max_tokens=800
+            ):
+                response_parts.append(chunk)
+
+            return render_response(''.join(response_parts), self.agent_type)
+
+        except Exception as e:
+            logger.error(f"{self.name}互动失败: {e}")
+            return ""
+
+    async def interact_with_other_experts_stream(self, user_query: str, other_responses: Dict[str, str]):
+        """与其他专家互动（流式）"""
+        try:
+            messages = self._interaction_messages(user_query, other_responses)
+            if messages is None:
+                return
+
+            async for chunk in self.llm_client.chat_completion(
+                messages=messages,
+                model=Config.SILICON_FLOW_MODEL,
+                temperature=0.8,
+                max_tokens=800,
+                stream=True
+            ):
+                if chunk is not None:  # 确保chunk不为None
+                    yield chunk
+
+        except Exception as e:
+            logger.error(f"{self.name}互动失败: {e}")
+            return
+
+    def _build_messages(self, system_prompt: str, query: str, knowledge: str,
+                        history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """系统提示词 + 当前会话的对话历史 + 附加背景知识的用户问题"""
+        enhanced_query = f"{query}\n\n相关背景知识：{knowledge}" if knowledge else query
+        messages = [{"role": "system", "content": system_prompt}]
+        messages.extend(history)
+        messages.append({"role": "user", "content": enhanced_query})
+        return messages
+
+    async def process_query_stream(self, query: str, session_id: Optional[str] = None,
+                                   max_tokens: Optional[int] = None):
+        """处理用户查询（流式）"""
+        try:
+            relevant_knowledge = await self._retrieve_knowledge(query)
+            history = await self.session_store.get_history(session_id, self.agent_type)
+            messages = self._build_messages(self.system_prompt, query, relevant_knowledge, history)
+
+            # 没有对话历史的相同问题直接复用缓存的回复
+            cache_key = self.response_cache.key_for(self.agent_type, query, relevant_knowledge, history,
+                                                   max_tokens=max_tokens)
+            cached_response = await self.response_cache.get(cache_key)
+            if cached_response is not None:
+                async for chunk in self.response_cache.replay(cached_response):
+                    yield chunk
+                await self.session_store.append(session_id, self.agent_type, query, cached_response)
+                return
+
+            # 上游服务熔断期间直接使用默认回复，不再等待请求失败
+            if not self.llm_client.is_available():
+                async for frame in replay_text(self._get_default_response()):
+                    yield frame
+                return
+
+            try:
+                full_response = ""
+                async for chunk in self.llm_client.chat_completion(
+                    messages=messages,
+                    model=Config.SILICON_FLOW_MODEL,
+                    temperature=0.7,
+                    max_tokens=max_tokens or 2000,
+                    stream=True
+                ):
+                    if chunk is not None:  # 确保chunk不为None
+                        full_response += chunk
+                        yield chunk
+
+                # 保存到当前会话的对话历史
+                await self.session_store.append(session_id, self.agent_type, query, full_response)
+                await self.response_cache.put(cache_key, full_response)
+
+            except Exception as api_error:
+                logger.error(f"{self.name}API调用失败: {api_error}")
+                # 分帧输出默认回复
+                async for frame in replay_text(self._get_default_response()):
+                    yield frame
+
+        except Exception as e:
+            logger.error(f"{self.name}处理查询时发生错误: {e}")
+            async for frame in replay_text(self._get_error_response()):
+                yield frame
+
+    def _system_prompt_for(self, query: str) -> str:
+        """根据对话情境调整系统提示词"""
+        if not self.casual_prompt:
+            return self.system_prompt
+
+        from utils.conversation_context import ConversationContextAnalyzer
+        context_analysis = ConversationContextAnalyzer().analyze_context(query, self.agent_type)
+        if context_analysis['context_type'] == 'casual' and context_analysis['confidence'] >= 0.7:
+            # 闲聊模式：使用更自然的提示词
+            return self.system_prompt + self.casual_prompt
+        # 专业模式：使用完整的提示词
+        return self.system_prompt + PROFESSIONAL_MODE_PROMPT
+
+    async def process_query(self, query: str, session_id: Optional[str] = None,
+                            max_tokens: Optional[int] = None) -> str:
+        """处理用户查询"""
+        try:
+            relevant_knowledge = await self._retrieve_knowledge(query)
+            history = await self.session_store.get_history(session_id, self.agent_type)
+            messages = self._build_messages(self._system_prompt_for(query), query, relevant_knowledge, history)
+
+            # 没有对话历史的相同问题直接复用缓存的回复
+            cache_key = self.response_cache.key_for(self.agent_type, query, relevant_knowledge, history,
+                                                   mode="full", max_tokens=max_tokens)
+            response = await self.response_cache.get(cache_key)
+            if response is None:
+                # 上游服务熔断期间直接使用默认回复，不再等待请求失败
+                if not self.llm_client.is_available():
+                    return self._get_default_response()
+
+                response_parts = []
+                async for chunk in self.llm_client.chat_completion(
+                    messages=messages,
+                    model=Config.SILICON_FLOW_MODEL,
+                    temperature=self.full_temperature,
+                    max_tokens=max_tokens or self.full_max_tokens,
+                    stream=False
+                ):
+                    response_parts.append(chunk)
+
+                response = ''.join(response_parts)
+                await self.response_cache.put(cache_key, response)
+
+            # 保存到当前会话的对话历史
+            await self.session_store.append(session_id, self.agent_type, query, response)
+
+            if self.render_full:
+                return render_response(response, self.agent_type)
+            return response
+
+        except Exception as e:
+            logger.error(f"{self.name}处理查询失败: {e}")
+            return self._get_error_response()
+
+    async def _retrieve_knowledge(self, query: str) -> str:
+        """从知识库检索本领域的背景知识"""
+        if not self.knowledge_category:
+            return self.default_knowledge
+        knowledge = await get_retrieval_service().retrieve_text(query, self.knowledge_category)
+        return knowledge or self.default_knowledge
+
+    def _get_default_response(self) -> str:
+        """获取默认回复（上游服务不可用时使用）"""
+        return self.default_response
+
+    def _get_error_response(self) -> str:
+        """处理出错时的回复"""
+        if not self.topic:
+            return self._get_default_response()
+        return f"抱歉，我在处理您的问题时遇到了技术问题。让我重新为您介绍{self.topic}：{self._get_default_response()}"
+
+    def get_expert_info(self) -> Dict[str, Any]:
+        """获取专家信息"""
+        info = {"name": self.name, "specialties": self.specialties}
+        if self.personality:
+            info["personality"] = self.personality
+        if self.description:
+            info["description"] = self.description
+        return info
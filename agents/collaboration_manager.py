@@ -8,8 +8,11 @@
 from typing import Dict, List, Any, TypedDict
 import asyncio
 import json
-from core.llm_client import get_silicon_flow_client
+from core.provider_router import get_llm_client
+from core.rate_limiter import PRIORITY_BACKGROUND
 from config import Config
+from utils.keyword_router import get_keyword_router
+from .registry import get_expert_registry, get_ambassador
 
 class CollaborationState(TypedDict):
     """协同状态定义"""
@@ -22,25 +25,11 @@ class CollaborationState(TypedDict):
 class CollaborationManager:
     def __init__(self):
         self.name = "协同讨论管理器"
-        self.experts = {}
-        self.llm_client = get_silicon_flow_client()
+        self.llm_client = get_llm_client("collaboration")
         
-        # 初始化专家智能体
-        from .cantonese_opera_expert import CantoneseOperaExpert
-        from .architecture_expert import ArchitectureExpert
-        from .culinary_expert import CulinaryExpert
-        from .festival_expert import FestivalExpert
-        from .guangfu_ambassador import GuangfuAmbassador
-        
-        self.experts = {
-            "cantonese_opera": CantoneseOperaExpert(),
-            "architecture": ArchitectureExpert(),
-            "culinary": CulinaryExpert(),
-            "festival": FestivalExpert()
-        }
-        
-        # 初始化广府文化助手
-        self.ambassador = GuangfuAmbassador()
+        # 专家和广府文化助手与聊天接口共用注册表中的实例，第一次邀请时才创建
+        self.experts = get_expert_registry()
+        self.ambassador = get_ambassador()
         
         # 构建协同工作流
         self.workflow = self._build_collaboration_workflow()
@@ -56,15 +45,18 @@ class CollaborationManager:
             # 第一步：广府文化助手欢迎并初步回应
             ambassador_initial = await self.ambassador.initial_response(user_query)
             
-            # 第二步：大使分析并选择相关专家
-            selected_experts = self.ambassador.analyze_query_for_experts(user_query)
+            # 第二步：大使分析并在预算内选择相关专家
+            plan = self.ambassador.plan_collaboration(user_query)
+            selected_experts = plan["experts"]
             
             # 第三步：收集专家回应
             expert_responses = {}
             for expert_name in selected_experts:
                 if expert_name in self.experts:
                     try:
-                        response = await self.experts[expert_name].process_query(user_query)
+                        response = await self.experts[expert_name].process_query(
+                            user_query, max_tokens=plan["expert_max_tokens"]
+                        )
                         expert_responses[expert_name] = response
                     except Exception as e:
                         expert_responses[expert_name] = f"{expert_name}暂时无法回应：{str(e)}"
@@ -93,6 +85,7 @@ class CollaborationManager:
                 "user_query": user_query,
                 "ambassador_initial": ambassador_initial,
                 "selected_experts": selected_experts,
+                "skipped_experts": plan["skipped"],
                 "expert_responses": expert_responses,
                 "expert_interactions": expert_interactions,
                 "final_summary": final_summary,
@@ -117,22 +110,14 @@ class CollaborationManager:
             "requires_collaboration": True
         }
         
-        # 根据关键词判断涉及的文化领域
-        if any(keyword in query for keyword in ["粤剧", "戏曲", "表演", "唱腔"]):
-            analysis["cultural_domains"].append("cantonese_opera")
-        
-        if any(keyword in query for keyword in ["建筑", "骑楼", "园林", "民居"]):
-            analysis["cultural_domains"].append("architecture")
-        
-        if any(keyword in query for keyword in ["美食", "菜系", "茶楼", "小吃"]):
-            analysis["cultural_domains"].append("culinary")
-        
-        if any(keyword in query for keyword in ["节庆", "民俗", "传统", "庆典"]):
-            analysis["cultural_domains"].append("festival")
+        # 根据关键词得分判断涉及的文化领域
+        analysis["cultural_domains"] = [
+            expert for expert, _ in get_keyword_router().rank_experts(query) if expert in self.experts
+        ]
         
         # 如果没有明确领域，则涉及所有领域
         if not analysis["cultural_domains"]:
-            analysis["cultural_domains"] = ["cantonese_opera", "architecture", "culinary", "festival"]
+            analysis["cultural_domains"] = list(self.experts.keys())
         
         state["analysis"] = analysis
         return state
@@ -228,7 +213,8 @@ class CollaborationManager:
                 messages=messages,
                 model=Config.SILICON_FLOW_MODEL,
                 temperature=0.7,
-                max_tokens=2000
+                max_tokens=2000,
+                priority=PRIORITY_BACKGROUND
             ):
                 response_parts.append(chunk)
             
@@ -269,7 +255,8 @@ class CollaborationManager:
                 messages=messages,
                 model=Config.SILICON_FLOW_MODEL,
                 temperature=0.7,
-                max_tokens=2000
+                max_tokens=2000,
+                priority=PRIORITY_BACKGROUND
             ):
                 response_parts.append(chunk)
             
@@ -300,8 +287,9 @@ class CollaborationManager:
                 yield chunk
             yield "\n\n"
             
-            # 第二步：大使分析并选择相关专家
-            selected_experts = self.ambassador.analyze_query_for_experts(query)
+            # 第二步：大使分析并在预算内选择相关专家
+            plan = self.ambassador.plan_collaboration(query)
+            selected_experts = plan["experts"]
             
             # 第三步：收集专家回应
             expert_responses = {}
@@ -318,7 +306,9 @@ class CollaborationManager:
                     
                     try:
                         full_response = ""
-                        async for chunk in self.experts[expert_name].process_query_stream(query):
+                        async for chunk in self.experts[expert_name].process_query_stream(
+                            query, max_tokens=plan["expert_max_tokens"]
+                        ):
                             if chunk is not None:  # 确保chunk不为None
                                 full_response += chunk
                                 yield chunk
@@ -385,14 +375,8 @@ class CollaborationManager:
     
     def _select_relevant_expert(self, query: str) -> str:
         """选择最相关的专家"""
-        # 简单的关键词匹配
-        if any(keyword in query for keyword in ["粤剧", "戏曲", "表演"]):
-            return "cantonese_opera"
-        elif any(keyword in query for keyword in ["建筑", "骑楼", "园林"]):
-            return "architecture"
-        elif any(keyword in query for keyword in ["美食", "菜系", "茶楼"]):
-            return "culinary"
-        elif any(keyword in query for keyword in ["节庆", "民俗", "传统"]):
-            return "festival"
-        else:
-            return "cantonese_opera"  # 默认选择粤剧专家
+        # 取关键词得分最高的专家
+        for expert, _ in get_keyword_router().rank_experts(query):
+            if expert in self.experts:
+                return expert
+        return "cantonese_opera"  # 默认选择粤剧专家
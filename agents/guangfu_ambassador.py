@@ -5,20 +5,119 @@
 
 import asyncio
 import logging
-from typing import Dict, List, Any
-from core.llm_client import get_silicon_flow_client
+from typing import Dict, List, Any, Optional
+from core.provider_router import get_llm_client
+from core.rate_limiter import PRIORITY_BACKGROUND
 from config import Config
+from utils.keyword_router import get_keyword_router
+from utils.text_replay import replay_text
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 助手开场白和讨论总结的生成长度，计入协同讨论的token预算
+INITIAL_RESPONSE_MAX_TOKENS = 500
+SUMMARY_MAX_TOKENS = 400
+
+# 总结中需要去掉的markdown符号，按替换顺序排列（先去单字符符号，再去组合符号）
+_MARKDOWN_SINGLE_SYMBOLS = ('*', '#', '`')
+_MARKDOWN_PAIR_SYMBOLS = ('__', '~~', '- ', '+ ', '> ')
+_MARKDOWN_SYMBOLS = _MARKDOWN_SINGLE_SYMBOLS + _MARKDOWN_PAIR_SYMBOLS
+
+
+class _SymbolRemover:
+    """增量地去掉一个符号，与对整段文本执行一次 str.replace(symbol, '') 的结果相同
+
+    从左到右匹配，已匹配的位置不受后续片段影响；结尾可能是符号前缀的部分先暂存。
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self._pending = ""
+
+    def feed(self, chunk: str) -> str:
+        text = self._pending + chunk
+        parts = []
+        start = 0
+        while True:
+            index = text.find(self.symbol, start)
+            if index < 0:
+                break
+            parts.append(text[start:index])
+            start = index + len(self.symbol)
+        rest = text[start:]
+
+        # 结尾最长的符号前缀留到下一个片段
+        self._pending = ""
+        for length in range(min(len(self.symbol) - 1, len(rest)), 0, -1):
+            if rest.endswith(self.symbol[:length]):
+                self._pending = rest[-length:]
+                rest = rest[:-length]
+                break
+        parts.append(rest)
+        return "".join(parts)
+
+    def flush(self) -> str:
+        text, self._pending = self._pending, ""
+        return text
+
+
+class MarkdownStreamCleaner:
+    """_clean_markdown 的增量版本
+
+    每个符号一级去除器，按 _MARKDOWN_SYMBOLS 的顺序串联，与逐个 str.replace 的结果相同，
+    输出与片段的切分位置无关。开头的空白直接丢弃，中间的空白等到后面有内容时再输出，
+    结尾的空白在 flush 时丢弃。
+    """
+
+    def __init__(self):
+        self._removers = [_SymbolRemover(symbol) for symbol in _MARKDOWN_PAIR_SYMBOLS]
+        self._whitespace = ""
+        self._started = False
+
+    def feed(self, chunk: str) -> str:
+        """输入一个片段，返回可以立即输出的文本"""
+        for symbol in _MARKDOWN_SINGLE_SYMBOLS:
+            chunk = chunk.replace(symbol, '')
+        for remover in self._removers:
+            chunk = remover.feed(chunk)
+        return self._emit(chunk)
+
+    def flush(self) -> str:
+        """输出暂存的剩余文本"""
+        text = ""
+        for remover in self._removers:
+            # 上一级暂存的内容先经过本级，再取出本级暂存的内容
+            text = remover.feed(text) + remover.flush()
+        output = self._emit(text)
+        self._whitespace = ""
+        return output
+
+    def _emit(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+        body = text.rstrip()
+        trailing = text[len(body):]
+        if not body:
+            self._whitespace += trailing
+            return ""
+        output = self._whitespace + body
+        self._whitespace = trailing
+        return output
+
+
 class GuangfuAmbassador:
     def __init__(self):
         self.name = "广府文化助手"
         self.specialties = ["文化综合", "宣传推广", "总结概括", "文化传承"]
         self.personality = "热情洋溢、博学多才、善于总结、富有感染力"
-        self.llm_client = get_silicon_flow_client()
+        self.llm_client = get_llm_client("ambassador")
+        # 简短总结只有一两句话，可以单独配置更快、更便宜的模型
+        self.summary_llm_client = get_llm_client("ambassador_summary")
         
         # 系统提示词
         self.system_prompt = """你是广府文化助手，作为广府非遗文化的主持人和协调者，负责引导讨论并整合专家观点。
@@ -77,7 +176,7 @@ class GuangfuAmbassador:
                 messages=messages,
                 model=Config.SILICON_FLOW_MODEL,
                 temperature=0.8,
-                max_tokens=500,
+                max_tokens=INITIAL_RESPONSE_MAX_TOKENS,
                 stream=True
             ):
                 response_parts.append(chunk)
@@ -105,56 +204,64 @@ class GuangfuAmbassador:
                 messages=messages,
                 model=Config.SILICON_FLOW_MODEL,
                 temperature=0.8,
-                max_tokens=500,
-                stream=True
+                max_tokens=INITIAL_RESPONSE_MAX_TOKENS,
+                stream=True,
+                hedge=True
             ):
                 yield chunk
                 
         except Exception as e:
             logger.error(f"广府文化助手初始回应失败: {e}")
             default_response = f"各位朋友，欢迎来到广府非遗文化交流平台！关于您的问题「{user_query}」，让我邀请我们的专家团队来为您详细解答。"
-            for char in default_response:
-                yield char
-                await asyncio.sleep(0.01)
+            async for frame in replay_text(default_response):
+                yield frame
 
-    def analyze_query_for_experts(self, user_query: str) -> List[str]:
-        """分析问题，决定需要邀请哪些专家"""
-        relevant_experts = []
-        
-        # 根据关键词判断需要的专家
-        if any(keyword in user_query for keyword in ["粤剧", "戏曲", "表演", "唱腔", "行当", "脸谱"]):
-            relevant_experts.append("cantonese_opera")
-        
-        if any(keyword in user_query for keyword in ["建筑", "骑楼", "园林", "民居", "祠堂", "庙宇"]):
-            relevant_experts.append("architecture")
-        
-        if any(keyword in user_query for keyword in ["美食", "菜系", "小吃", "点心"]):
-            relevant_experts.append("culinary")
-        
-        if any(keyword in user_query for keyword in ["节庆", "民俗", "传统", "习俗", "庆典", "仪式"]):
-            relevant_experts.append("festival")
+    def analyze_query_for_experts(self, user_query: str, max_experts: Optional[int] = None) -> List[str]:
+        """分析问题，按关键词相关度和协同讨论预算决定需要邀请哪些专家"""
+        return self.plan_collaboration(user_query, max_experts)["experts"]
+    
+    def plan_collaboration(self, user_query: str, max_experts: Optional[int] = None,
+                           max_total_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """在预算内规划协同讨论
         
-        # 茶文化专家识别
-        if any(keyword in user_query for keyword in ["茶文化", "茶艺", "茶道", "茶叶", "品茶", "工夫茶", "乌龙茶", "单丛", "水仙", "普洱", "铁观音", "龙井", "绿茶", "红茶"]):
-            relevant_experts.append("tea_culture")
+        按相关度从高到低选择专家，数量不超过 max_experts；只要有专家命中关键词，
+        得分为0的候选就不参与。扣除助手开场和总结后，剩余token平均分给各位专家，
+        每位不少于 COLLABORATION_MIN_EXPERT_TOKENS，分不下时去掉相关度最低的专家；
+        一位专家也分不下时不邀请专家。邀请了专家时 planned_tokens 不超过 max_total_tokens。
+        """
+        if max_experts is None:
+            max_experts = Config.COLLABORATION_MAX_EXPERTS
+        if max_total_tokens is None:
+            max_total_tokens = Config.COLLABORATION_MAX_TOTAL_TOKENS
         
-        # 手工艺专家识别
-        if any(keyword in user_query for keyword in ["广绣", "广彩", "绣", "雕刻", "木雕", "石雕", "牙雕", "工艺", "技艺"]):
-            relevant_experts.append("craft")
+        candidates = get_keyword_router().candidate_experts(user_query)
+        # 没有专家命中时才由默认顺序的专家（得分为0）回答综合性问题
+        candidates = [item for item in candidates if item[1] > 0] or candidates
         
-        # 诗词文学专家识别
-        if any(keyword in user_query for keyword in ["诗词", "文学", "诗歌", "古文", "诗句", "诗词鉴赏", "古典"]):
-            relevant_experts.append("literature")
+        expert_budget = max_total_tokens - INITIAL_RESPONSE_MAX_TOKENS - SUMMARY_MAX_TOKENS
+        affordable = max(0, expert_budget // Config.COLLABORATION_MIN_EXPERT_TOKENS)
+        count = min(max_experts, affordable, len(candidates))
         
-        # 中医药专家识别
-        if any(keyword in user_query for keyword in ["中医", "中药", "养生", "食疗", "经络", "气血", "穴位", "药材"]):
-            relevant_experts.append("tcm")
+        selected = candidates[:count]
+        expert_max_tokens = min(Config.MAX_TOKENS, expert_budget // count) if count else 0
         
-        # 如果是综合性问题或没有明确领域，邀请所有专家
-        if not relevant_experts or any(keyword in user_query for keyword in ["广府", "文化", "传统", "历史", "介绍"]):
-            relevant_experts = ["cantonese_opera", "architecture", "culinary", "festival", "tea_culture", "craft", "literature", "tcm"]
+        skipped = []
+        for index, (expert, score) in enumerate(candidates[count:], start=count):
+            skipped.append({
+                "expert": expert,
+                "score": score,
+                "reason": "max_experts" if index >= max_experts else "token_budget"
+            })
         
-        return relevant_experts
+        return {
+            "experts": [expert for expert, _ in selected],
+            "scores": {expert: score for expert, score in selected},
+            "skipped": skipped,
+            "expert_max_tokens": expert_max_tokens,
+            "max_total_tokens": max_total_tokens,
+            "planned_tokens": (INITIAL_RESPONSE_MAX_TOKENS + SUMMARY_MAX_TOKENS + expert_max_tokens * count
+                               if count else INITIAL_RESPONSE_MAX_TOKENS)
+        }
     
     async def summarize_expert_responses(self, user_query: str, expert_responses: Dict[str, str]) -> str:
         """总结专家回复（非流式）"""
@@ -249,16 +356,14 @@ class GuangfuAmbassador:
                 logger.error(f"广府文化助手API调用失败: {api_error}")
                 # 流式输出默认总结
                 default_summary = self._get_default_summary(expert_responses)
-                for char in default_summary:
-                    yield char
-                    await asyncio.sleep(0.01)  # 模拟打字效果
+                async for frame in replay_text(default_summary):
+                    yield frame
                     
         except Exception as e:
             logger.error(f"广府文化助手处理总结时发生错误: {e}")
             error_msg = "各位朋友，我在总结专家回复时遇到了一些技术问题，但让我为大家简单概括一下："
-            for char in error_msg:
-                yield char
-                await asyncio.sleep(0.01)
+            async for frame in replay_text(error_msg):
+                yield frame
     
     def _get_default_summary(self, expert_responses: Dict[str, str]) -> str:
         """获取默认总结"""
@@ -283,6 +388,25 @@ class GuangfuAmbassador:
 
 广府文化博大精深，每一个领域都蕴含着深厚的历史底蕴和独特的文化魅力。正如各位专家所说，这些珍贵的文化遗产需要我们共同传承和发扬光大。让我们一起为广府文化的传承贡献力量！"""
     
+    async def generate_intelligent_summary_stream(self, prompt: str, user_message: str, discussion_content: str):
+        """流式生成智能总结，模型输出的片段清理后立即转发"""
+        started = False
+        try:
+            if self._is_planning_question(user_message):
+                stream = self._generate_planning_summary_stream(user_message, discussion_content)
+            else:
+                stream = self._generate_concise_summary_stream(user_message, discussion_content)
+            
+            async for chunk in stream:
+                started = True
+                yield chunk
+                
+        except Exception as e:
+            logger.error(f"生成智能总结失败: {e}")
+            # 已经输出了部分总结时不再追加默认总结
+            if not started:
+                yield self._get_enhanced_default_summary(user_message, discussion_content)
+    
     async def generate_intelligent_summary(self, prompt: str, user_message: str, discussion_content: str) -> str:
         """生成智能总结，支持步骤整理和路线规划"""
         try:
@@ -311,6 +435,11 @@ class GuangfuAmbassador:
     
     async def _generate_planning_summary(self, user_message: str, discussion_content: str) -> str:
         """生成规划类总结，整理专家建议为结构化步骤"""
+        parts = [chunk async for chunk in self._generate_planning_summary_stream(user_message, discussion_content)]
+        return ''.join(parts)
+    
+    async def _generate_planning_summary_stream(self, user_message: str, discussion_content: str):
+        """流式生成规划类总结"""
         planning_system_prompt = """你是广府文化助手，专门负责整理专家建议，形成结构化的推荐路线和步骤。
 
 你的任务：
@@ -350,24 +479,31 @@ class GuangfuAmbassador:
             }
         ]
         
-        # 调用大模型生成规划总结
-        response_parts = []
+        # 调用大模型生成规划总结，边生成边清理markdown符号
+        cleaner = MarkdownStreamCleaner()
         async for chunk in self.llm_client.chat_completion(
             messages=messages,
             model=Config.SILICON_FLOW_MODEL,
             temperature=0.7,
-            max_tokens=400,
-            stream=True
+            max_tokens=SUMMARY_MAX_TOKENS,
+            stream=True,
+            priority=PRIORITY_BACKGROUND
         ):
-            response_parts.append(chunk)
+            text = cleaner.feed(chunk)
+            if text:
+                yield text
         
-        # 处理返回内容
-        summary = ''.join(response_parts)
-        summary = self._clean_markdown(summary)
-        return summary
+        text = cleaner.flush()
+        if text:
+            yield text
     
     async def _generate_concise_summary(self, user_message: str, discussion_content: str) -> str:
         """生成简洁活泼的总结"""
+        parts = [chunk async for chunk in self._generate_concise_summary_stream(user_message, discussion_content)]
+        return ''.join(parts)
+    
+    async def _generate_concise_summary_stream(self, user_message: str, discussion_content: str):
+        """流式生成简洁活泼的总结"""
         # 构建简洁活泼的系统提示词
         intelligent_system_prompt = """你是广府文化助手，负责对专家讨论进行简洁活泼的总结。
 
@@ -412,28 +548,29 @@ class GuangfuAmbassador:
             }
         ]
         
-        # 调用大模型生成智能总结
-        response_parts = []
-        async for chunk in self.llm_client.chat_completion(
+        # 调用大模型生成智能总结，边生成边清理markdown符号
+        cleaner = MarkdownStreamCleaner()
+        async for chunk in self.summary_llm_client.chat_completion(
             messages=messages,
             model=Config.SILICON_FLOW_MODEL,
             temperature=0.9,
             max_tokens=100,
-            stream=True
+            stream=True,
+            priority=PRIORITY_BACKGROUND
         ):
-            response_parts.append(chunk)
+            text = cleaner.feed(chunk)
+            if text:
+                yield text
         
-        # 处理返回内容，清理markdown符号
-        summary = ''.join(response_parts)
-        summary = self._clean_markdown(summary)
-        return summary
+        text = cleaner.flush()
+        if text:
+            yield text
     
     def _clean_markdown(self, text: str) -> str:
         """清理markdown符号"""
         # 清理常见的markdown符号
-        text = text.replace('*', '').replace('#', '').replace('`', '')
-        text = text.replace('**', '').replace('__', '').replace('~~', '')
-        text = text.replace('- ', '').replace('+ ', '').replace('> ', '')
+        for symbol in _MARKDOWN_SYMBOLS:
+            text = text.replace(symbol, '')
         return text.strip()
     
     def _get_enhanced_default_summary(self, user_message: str, discussion_content: str) -> str:
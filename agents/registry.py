@@ -0,0 +1,129 @@
+"""
+专家注册表
+按专家标识或别名 O(1) 查找专家；专家类在第一次使用时才导入并实例化，每位专家全局只有一个实例
+"""
+
+import importlib
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 专家注册表：专家标识 -> 所在模块、类名、讨论中的展示名称和别名
+# 别名包括前端使用的智能体ID（如 cantonese_opera_critic、architecture_expert）
+EXPERT_REGISTRY: Dict[str, Dict[str, Any]] = {
+    "cantonese_opera": {
+        "module": "agents.cantonese_opera_expert", "class": "CantoneseOperaExpert",
+        "display_name": "粤剧专家", "aliases": ["cantonese_opera_critic", "cantonese_opera_expert"]
+    },
+    "architecture": {
+        "module": "agents.architecture_expert", "class": "ArchitectureExpert",
+        "display_name": "建筑专家", "aliases": ["architecture_expert"]
+    },
+    "culinary": {
+        "module": "agents.culinary_expert", "class": "CulinaryExpert",
+        "display_name": "美食专家", "aliases": ["culinary_expert"]
+    },
+    "festival": {
+        "module": "agents.festival_expert", "class": "FestivalExpert",
+        "display_name": "节庆专家", "aliases": ["festival_expert"]
+    },
+    "tea_culture": {
+        "module": "agents.tea_culture_expert", "class": "TeaCultureExpert",
+        "display_name": "茶文化专家", "aliases": ["tea_culture_expert"]
+    },
+    "craft": {
+        "module": "agents.craft_expert", "class": "CraftExpert",
+        "display_name": "传统手工艺专家", "aliases": ["craft_expert"]
+    },
+    "literature": {
+        "module": "agents.literature_expert", "class": "LiteratureExpert",
+        "display_name": "诗词文学专家", "aliases": ["literature_expert"]
+    },
+    "tcm": {
+        "module": "agents.tcm_expert", "class": "TCMExpert",
+        "display_name": "中医药专家", "aliases": ["tcm_expert"]
+    }
+}
+
+# 未知的智能体ID使用的默认专家
+DEFAULT_EXPERT = "cantonese_opera"
+
+
+class ExpertRegistry:
+    """专家注册表
+
+    查找顺序：专家标识或别名 -> 专家标识 -> 实例；实例在第一次 get() 时创建，
+    之后聊天接口和协同讨论共用同一个实例。可以像只读字典一样使用（in / [] / keys()）。
+    """
+
+    def __init__(self, registry: Dict[str, Dict[str, Any]], default: Optional[str] = None):
+        self._specs = registry
+        self.default = default
+        self._index: Dict[str, str] = {}
+        for key, spec in registry.items():
+            self._index[key] = key
+            for alias in spec.get("aliases", ()):
+                self._index[alias] = key
+        self._instances: Dict[str, Any] = {}
+
+    def resolve(self, agent_id: Optional[str]) -> Optional[str]:
+        """专家标识或别名 -> 专家标识，未注册时返回 None"""
+        return self._index.get(agent_id) if agent_id else None
+
+    def get(self, agent_id: Optional[str], fallback: bool = False):
+        """获取专家实例；未注册时 fallback 为 True 则返回默认专家，否则返回 None"""
+        key = self.resolve(agent_id)
+        if key is None:
+            if not fallback or self.default is None:
+                return None
+            key = self.default
+
+        expert = self._instances.get(key)
+        if expert is None:
+            spec = self._specs[key]
+            expert_class = getattr(importlib.import_module(spec["module"]), spec["class"])
+            expert = self._instances[key] = expert_class()
+            logger.info(f"已加载专家: {key}")
+        return expert
+
+    def display_name(self, agent_id: str) -> str:
+        """讨论中的展示名称，未注册时原样返回"""
+        key = self.resolve(agent_id)
+        return self._specs[key]["display_name"] if key else agent_id
+
+    def keys(self) -> List[str]:
+        return list(self._specs)
+
+    def __contains__(self, agent_id: str) -> bool:
+        return agent_id in self._index
+
+    def __getitem__(self, agent_id: str):
+        expert = self.get(agent_id)
+        if expert is None:
+            raise KeyError(agent_id)
+        return expert
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取注册和加载统计"""
+        return {"registered": len(self._specs), "loaded": sorted(self._instances)}
+
+
+# 全局注册表和广府文化助手实例
+_expert_registry = None
+_ambassador = None
+
+def get_expert_registry() -> ExpertRegistry:
+    """获取专家注册表"""
+    global _expert_registry
+    if _expert_registry is None:
+        _expert_registry = ExpertRegistry(EXPERT_REGISTRY, DEFAULT_EXPERT)
+    return _expert_registry
+
+def get_ambassador():
+    """获取广府文化助手实例（聊天接口和协同讨论共用）"""
+    global _ambassador
+    if _ambassador is None:
+        from agents.guangfu_ambassador import GuangfuAmbassador
+        _ambassador = GuangfuAmbassador()
+    return _ambassador
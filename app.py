@@ -10,49 +10,64 @@ from fastapi.responses import HTMLResponse, StreamingResponse
 import uvicorn
 import json
 import asyncio
-from typing import List, Dict, Any
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional
 import logging
 
-from agents.cantonese_opera_expert import CantoneseOperaExpert
-from agents.architecture_expert import ArchitectureExpert
-from agents.culinary_expert import CulinaryExpert
-from agents.festival_expert import FestivalExpert
-from agents.tea_culture_expert import TeaCultureExpert
-from agents.craft_expert import CraftExpert
-from agents.literature_expert import LiteratureExpert
-from agents.tcm_expert import TCMExpert
 from agents.collaboration_manager import CollaborationManager
-from agents.guangfu_ambassador import GuangfuAmbassador
+from agents.registry import get_expert_registry, get_ambassador
 from core.conversation_manager import ConversationManager
-from core.knowledge_base import KnowledgeBase
+from core.knowledge_base import get_knowledge_base
+from core.retrieval import get_retrieval_service
+from core.provider_router import get_provider_router, close_llm_client
+from core.session_store import get_session_store, resolve_session_id
+from core.response_cache import get_response_cache
+from utils.stream_multiplexer import StreamMultiplexer
+from utils.text_replay import replay_text
+from utils.stream_guard import get_stream_guard
+from utils.response_renderer import RENDER_FORMATS, get_response_renderer
+from utils.stream_formatter import StreamFormatters
+from config import Config
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时建立LLM连接池和对话写入任务，关闭时释放"""
+    await get_provider_router().start()
+    conversation_manager.start_writer()
+    yield
+    await conversation_manager.close()
+    knowledge_base.close()
+    get_response_cache().close()
+    await close_llm_client()
+
 app = FastAPI(
     title="广府非遗文化多智能体协同平台",
     description="基于LangGraph的广府非遗文化专家智能体协同系统",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # 静态文件和模板
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
-# 初始化智能体
-cantonese_opera_expert = CantoneseOperaExpert()
-architecture_expert = ArchitectureExpert()
-culinary_expert = CulinaryExpert()
-festival_expert = FestivalExpert()
-tea_culture_expert = TeaCultureExpert()
-craft_expert = CraftExpert()
-literature_expert = LiteratureExpert()
-tcm_expert = TCMExpert()
+# 初始化智能体（专家在第一次被调用时才创建，聊天接口与协同讨论共用同一实例）
+expert_registry = get_expert_registry()
+guangfu_ambassador = get_ambassador()
 collaboration_manager = CollaborationManager()
-guangfu_ambassador = GuangfuAmbassador()
-conversation_manager = ConversationManager()
-knowledge_base = KnowledgeBase()
+conversation_manager = ConversationManager(
+    flush_interval_ms=Config.CONVERSATION_FLUSH_INTERVAL_MS,
+    flush_batch_size=Config.CONVERSATION_FLUSH_BATCH_SIZE,
+    flush_max_retries=Config.CONVERSATION_FLUSH_MAX_RETRIES
+)
+knowledge_base = get_knowledge_base()
+
+# 会话记忆：内存未命中时从对话记录中恢复
+get_session_store().attach_conversation_manager(conversation_manager)
 
 # WebSocket连接管理
 class ConnectionManager:
@@ -124,10 +139,13 @@ async def features_page(request: Request):
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket连接处理"""
     await manager.connect(websocket)
+    # 客户端没有提供会话ID时，同一个连接内的消息属于同一会话
+    connection_session_id = resolve_session_id({})
     try:
         while True:
             data = await websocket.receive_text()
             message_data = json.loads(data)
+            message_data["session_id"] = resolve_session_id(message_data, connection_session_id)
             
             # 处理不同类型的消息
             if message_data["type"] == "chat":
@@ -150,67 +168,30 @@ async def handle_chat_message_stream(message_data: Dict[str, Any]):
     """处理流式聊天消息"""
     user_input = message_data["message"]
     agent_type = message_data.get("agent_id", message_data.get("agent_type", "cantonese_opera_critic"))
+    # 对话记忆按会话隔离，未提供session_id时退回到user_id，都没有时生成新的会话ID
+    session_id = message_data["session_id"] = resolve_session_id(message_data)
     
-    # 根据智能体类型选择专家（聊天页面只调用单个专家，不使用协同管理器）
-    if agent_type == "cantonese_opera_critic":
-        async for chunk in cantonese_opera_expert.process_query_stream(user_input):
-            yield chunk
-    elif agent_type == "architecture_expert":
-        async for chunk in architecture_expert.process_query_stream(user_input):
-            yield chunk
-    elif agent_type == "culinary_expert":
-        async for chunk in culinary_expert.process_query_stream(user_input):
-            yield chunk
-    elif agent_type == "festival_expert":
-        async for chunk in festival_expert.process_query_stream(user_input):
-            yield chunk
-    elif agent_type == "tea_culture_expert":
-        async for chunk in tea_culture_expert.process_query_stream(user_input):
-            yield chunk
-    elif agent_type == "craft_expert":
-        async for chunk in craft_expert.process_query_stream(user_input):
-            yield chunk
-    elif agent_type == "literature_expert":
-        async for chunk in literature_expert.process_query_stream(user_input):
-            yield chunk
-    elif agent_type == "tcm_expert":
-        async for chunk in tcm_expert.process_query_stream(user_input):
-            yield chunk
-    else:
-        # 默认使用粤剧专家（聊天页面不使用协同管理器）
-        async for chunk in cantonese_opera_expert.process_query_stream(user_input):
-            yield chunk
+    # 根据智能体类型选择专家，未知类型默认使用粤剧专家（聊天页面只调用单个专家，不使用协同管理器）
+    expert = expert_registry.get(agent_type, fallback=True)
+    async for chunk in expert.process_query_stream(user_input, session_id):
+        yield chunk
 
 async def handle_chat_message(message_data: Dict[str, Any]) -> Dict[str, Any]:
     """处理聊天消息"""
     user_input = message_data["message"]
     agent_type = message_data.get("agent_id", message_data.get("agent_type", "cantonese_opera_critic"))
+    # 对话记忆按会话隔离，未提供session_id时退回到user_id，都没有时生成新的会话ID
+    session_id = message_data["session_id"] = resolve_session_id(message_data)
     
-    # 根据智能体类型选择专家（聊天页面只调用单个专家，不使用协同管理器）
-    if agent_type == "cantonese_opera_critic":
-        response = await cantonese_opera_expert.process_query(user_input)
-    elif agent_type == "architecture_expert":
-        response = await architecture_expert.process_query(user_input)
-    elif agent_type == "culinary_expert":
-        response = await culinary_expert.process_query(user_input)
-    elif agent_type == "festival_expert":
-        response = await festival_expert.process_query(user_input)
-    elif agent_type == "tea_culture_expert":
-        response = await tea_culture_expert.process_query(user_input)
-    elif agent_type == "craft_expert":
-        response = await craft_expert.process_query(user_input)
-    elif agent_type == "literature_expert":
-        response = await literature_expert.process_query(user_input)
-    elif agent_type == "tcm_expert":
-        response = await tcm_expert.process_query(user_input)
-    else:
-        # 默认使用粤剧专家（聊天页面不使用协同管理器）
-        response = await cantonese_opera_expert.process_query(user_input)
+    # 根据智能体类型选择专家，未知类型默认使用粤剧专家（聊天页面只调用单个专家，不使用协同管理器）
+    expert = expert_registry.get(agent_type, fallback=True)
+    response = await expert.process_query(user_input, session_id)
     
     return {
         "type": "response",
         "content": response,
         "agent": agent_type,
+        "session_id": session_id,
         "timestamp": asyncio.get_event_loop().time()
     }
 
@@ -239,6 +220,23 @@ async def get_conversations(user_id: str):
         logger.error(f"获取对话历史失败: {e}")
         return {"conversations": []}
 
+@app.get("/api/conversations/{session_id}/messages")
+async def get_conversation_messages(session_id: str, format: str = "raw", limit: int = 20,
+                                    agent_type: Optional[str] = None):
+    """获取会话的对话记录（按时间倒序）
+
+    回复以原始文本保存，format 为 html（专家卡片）或 text（排版文本）时按需渲染，渲染结果会被缓存
+    """
+    if format not in RENDER_FORMATS:
+        return {"error": f"format 只能是 {', '.join(RENDER_FORMATS)}", "status": "error"}
+
+    renderer = get_response_renderer()
+    messages = await conversation_manager.get_conversation_history(session_id, limit, agent_type)
+    for message in messages:
+        message["agent_response"] = renderer.render(message["agent_response"], message["agent_type"], format)
+        message["format"] = format
+    return {"session_id": session_id, "messages": messages}
+
 @app.get("/api/agents")
 async def get_agents():
     """获取所有智能体信息"""
@@ -255,6 +253,29 @@ async def get_agents():
         ]
     }
 
+@app.get("/api/llm/stats")
+async def llm_stats_api():
+    """获取LLM各后端的路由、连接池使用统计"""
+    return {
+        "providers": get_provider_router().get_stats(),
+        "conversation_writes": conversation_manager.get_write_stats(),
+        "response_cache": get_response_cache().get_stats(),
+        "render_cache": get_response_renderer().get_stats(),
+        "retrieval": get_retrieval_service().get_stats(),
+        "experts": expert_registry.get_stats(),
+        "streams": get_stream_guard().get_stats()
+    }
+
+@app.get("/api/health")
+async def health_api():
+    """健康检查：大模型后端熔断时返回降级状态，全部熔断时专家改用默认回复"""
+    health = get_provider_router().get_health()
+    return {
+        "status": health["status"],
+        "version": Config.APP_VERSION,
+        "llm_backends": health["backends"]
+    }
+
 @app.post("/api/chat")
 async def chat_api(request: Request):
     """聊天API接口"""
@@ -266,21 +287,30 @@ async def chat_api(request: Request):
 
 @app.post("/api/chat/stream")
 async def chat_stream_api(request: Request):
-    """流式聊天API接口"""
+    """流式聊天API接口（format 为 text 时服务端边接收边排版，默认 raw 输出原始片段）"""
     data = await request.json()
+    session_id = data["session_id"] = resolve_session_id(data)
+    formatters = StreamFormatters(data.get("format", "raw"))
     
     async def generate_stream():
         async for chunk in handle_chat_message_stream(data):
-            yield f"data: {json.dumps({'content': chunk, 'type': 'chunk'}, ensure_ascii=False)}\n\n"
-        yield f"data: {json.dumps({'type': 'done'}, ensure_ascii=False)}\n\n"
+            content = formatters.feed("chat", chunk)
+            if content:
+                yield f"data: {json.dumps({'content': content, 'type': 'chunk'}, ensure_ascii=False)}\n\n"
+        content = formatters.flush("chat")
+        if content:
+            yield f"data: {json.dumps({'content': content, 'type': 'chunk'}, ensure_ascii=False)}\n\n"
+        yield f"data: {json.dumps({'type': 'done', 'session_id': session_id}, ensure_ascii=False)}\n\n"
     
+    # 客户端断开时取消上游的大模型请求
     return StreamingResponse(
-        generate_stream(),
+        get_stream_guard().guard(request, generate_stream(), "chat"),
         media_type="text/plain",
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
-            "Content-Type": "text/plain; charset=utf-8"
+            "Content-Type": "text/plain; charset=utf-8",
+            "X-Session-Id": session_id
         }
     )
 
@@ -289,57 +319,120 @@ async def collaboration_stream_api(request: Request):
     """协作讨论流式API接口 - 重新设计为协同讨论模式"""
     data = await request.json()
     message = data.get("message", "")
+    # 未提供会话ID时生成一个，随事件和响应头返回
+    session_id = resolve_session_id(data)
+    # 专家发言模式：sequential / ordered / interleaved
+    mode = data.get("mode", Config.COLLABORATION_STREAM_MODE)
+    # 输出格式：raw 为原始片段，text 为服务端增量排版（每位发言人各自排版）
+    formatters = StreamFormatters(data.get("format", "raw"))
+    
+    def chunk_event(expert_name: str, chunk: str) -> str:
+        content = formatters.feed(expert_name, chunk)
+        if not content:
+            return ""
+        return f"data: {json.dumps({'content': content, 'type': 'chunk', 'expert': expert_name}, ensure_ascii=False)}\n\n"
+    
+    def done_event(expert_name: str) -> str:
+        """发言结束：先输出排版器中剩余的内容"""
+        content = formatters.flush(expert_name)
+        done = f"data: {json.dumps({'type': 'expert_done', 'expert': expert_name}, ensure_ascii=False)}\n\n"
+        if not content:
+            return done
+        return f"data: {json.dumps({'content': content, 'type': 'chunk', 'expert': expert_name}, ensure_ascii=False)}\n\n" + done
     
     async def generate_stream():
+        multiplexer = None
         try:
-            # 第一步：广府文化助手先回应并主持讨论
+            # 第一步：分析问题，在协同预算内确定需要邀请的专家
+            plan = guangfu_ambassador.plan_collaboration(message)
+            relevant_experts = plan["experts"]
+            expert_max_tokens = plan["expert_max_tokens"]
+            
+            # 受邀专家：专家标识 -> (展示名称, 专家实例)
+            expert_mapping = {
+                key: (expert_registry.display_name(key), expert_registry.get(key))
+                for key in relevant_experts if key in expert_registry
+            }
+            
+            # 并发模式下，专家在助手开场时就同时开始生成，输出先缓存
+            if mode != "sequential":
+                multiplexer = StreamMultiplexer(
+                    {
+                        expert_mapping[key][0]: expert_mapping[key][1].process_query_stream(
+                            message, session_id, max_tokens=expert_max_tokens
+                        )
+                        for key in relevant_experts if key in expert_mapping
+                    },
+                    ordered=(mode != "interleaved")
+                )
+                multiplexer.start()
+            
+            # 告知前端本次邀请和因预算未邀请的专家
+            selection = {
+                'type': 'experts_selected',
+                'experts': [expert_mapping[key][0] for key in relevant_experts if key in expert_mapping],
+                'skipped': [
+                    {**item, 'expert': expert_registry.display_name(item['expert'])}
+                    for item in plan["skipped"]
+                ],
+                'expert_max_tokens': expert_max_tokens,
+                'planned_tokens': plan["planned_tokens"],
+                'session_id': session_id
+            }
+            yield f"data: {json.dumps(selection, ensure_ascii=False)}\n\n"
+            
+            # 第二步：广府文化助手先回应并主持讨论
             yield f"data: {json.dumps({'type': 'expert_start', 'expert': '广府文化助手'}, ensure_ascii=False)}\n\n"
             
             async for chunk in guangfu_ambassador.initial_response_stream(message):
                 if chunk and chunk.strip():
-                    yield f"data: {json.dumps({'content': chunk, 'type': 'chunk', 'expert': '广府文化助手'}, ensure_ascii=False)}\n\n"
-            
-            yield f"data: {json.dumps({'type': 'expert_done', 'expert': '广府文化助手'}, ensure_ascii=False)}\n\n"
-            
-            # 第二步：分析问题，确定需要邀请的专家
-            relevant_experts = guangfu_ambassador.analyze_query_for_experts(message)
+                    yield chunk_event('广府文化助手', chunk)
             
-            # 专家名称映射
-            expert_mapping = {
-                'cantonese_opera': ('粤剧专家', cantonese_opera_expert),
-                'architecture': ('建筑专家', architecture_expert),
-                'culinary': ('美食专家', culinary_expert),
-                'festival': ('节庆专家', festival_expert),
-                'tea_culture': ('茶文化专家', tea_culture_expert),
-                'craft': ('传统手工艺专家', craft_expert),
-                'literature': ('诗词文学专家', literature_expert),
-                'tcm': ('中医药专家', tcm_expert)
-            }
+            yield done_event('广府文化助手')
             
-            # 第三步：依次邀请相关专家回复
+            # 第三步：邀请相关专家回复
             expert_responses = {}
-            for expert_key in relevant_experts:
-                if expert_key in expert_mapping:
-                    expert_name, expert_agent = expert_mapping[expert_key]
-                    
-                    # 添加一个短暂的间隔，模拟真实讨论
-                    await asyncio.sleep(1)
-                    
-                    yield f"data: {json.dumps({'type': 'expert_start', 'expert': expert_name}, ensure_ascii=False)}\n\n"
-                    
-                    # 收集专家回复内容用于后续总结
-                    response_parts = []
-                    async for chunk in expert_agent.process_query_stream(message):
+            if multiplexer is not None:
+                # 并发模式：总耗时取决于最慢的专家，而不是所有专家之和
+                response_parts = {}
+                async for expert_name, event, chunk in multiplexer.events():
+                    if event == "start":
+                        response_parts[expert_name] = []
+                        yield f"data: {json.dumps({'type': 'expert_start', 'expert': expert_name}, ensure_ascii=False)}\n\n"
+                    elif event == "chunk":
                         if chunk and chunk.strip():
-                            response_parts.append(chunk)
-                            yield f"data: {json.dumps({'content': chunk, 'type': 'chunk', 'expert': expert_name}, ensure_ascii=False)}\n\n"
-                    
-                    expert_responses[expert_name] = ''.join(response_parts)
-                    yield f"data: {json.dumps({'type': 'expert_done', 'expert': expert_name}, ensure_ascii=False)}\n\n"
+                            response_parts[expert_name].append(chunk)
+                            yield chunk_event(expert_name, chunk)
+                    else:
+                        expert_responses[expert_name] = ''.join(response_parts[expert_name])
+                        yield done_event(expert_name)
+            else:
+                # 顺序模式：依次邀请专家发言
+                for expert_key in relevant_experts:
+                    if expert_key in expert_mapping:
+                        expert_name, expert_agent = expert_mapping[expert_key]
+                        
+                        # 添加一个短暂的间隔，模拟真实讨论
+                        await asyncio.sleep(1)
+                        
+                        yield f"data: {json.dumps({'type': 'expert_start', 'expert': expert_name}, ensure_ascii=False)}\n\n"
+                        
+                        # 收集专家回复内容用于后续总结
+                        response_parts = []
+                        async for chunk in expert_agent.process_query_stream(
+                            message, session_id, max_tokens=expert_max_tokens
+                        ):
+                            if chunk and chunk.strip():
+                                response_parts.append(chunk)
+                                yield chunk_event(expert_name, chunk)
+                        
+                        expert_responses[expert_name] = ''.join(response_parts)
+                        yield done_event(expert_name)
             
             # 第四步：如果有多个专家参与，广府文化助手进行智能总结
             if len(relevant_experts) > 1:
-                await asyncio.sleep(1)
+                if multiplexer is None:
+                    await asyncio.sleep(1)
                 yield f"data: {json.dumps({'type': 'expert_start', 'expert': '广府文化助手', 'is_summary': True}, ensure_ascii=False)}\n\n"
                 
                 # 构建专家讨论内容
@@ -347,43 +440,43 @@ async def collaboration_stream_api(request: Request):
                 for expert_name, response in expert_responses.items():
                     discussion_content += f"\n\n**{expert_name}**：\n{response}"
                 
-                # 调用广府文化助手生成智能总结
+                # 调用广府文化助手生成智能总结，模型输出到达即转发
                 try:
-                    summary = await guangfu_ambassador.generate_intelligent_summary(
+                    async for chunk in guangfu_ambassador.generate_intelligent_summary_stream(
                         prompt="请为这次专家讨论生成深度总结",
                         user_message=message,
                         discussion_content=discussion_content
-                    )
-                    
-                    # 流式输出智能总结
-                    for char in summary:
-                        yield f"data: {json.dumps({'content': char, 'type': 'chunk', 'expert': '广府文化助手'}, ensure_ascii=False)}\n\n"
-                        await asyncio.sleep(0.02)
+                    ):
+                        yield chunk_event('广府文化助手', chunk)
                         
                 except Exception as e:
                     logger.error(f"智能总结生成失败: {e}")
                     # 降级到简单总结
                     fallback_summary = f"刚才各位专家就「{message}」这个问题进行了精彩的讨论，让我来为大家做个总结。\n\n"
                     fallback_summary += "\n\n".join([f"**{name}**：{resp[:100]}..." for name, resp in expert_responses.items()])
-                    for char in fallback_summary:
-                        yield f"data: {json.dumps({'content': char, 'type': 'chunk', 'expert': '广府文化助手'}, ensure_ascii=False)}\n\n"
-                        await asyncio.sleep(0.02)
+                    async for frame in replay_text(fallback_summary):
+                        yield chunk_event('广府文化助手', frame)
                 
-                yield f"data: {json.dumps({'type': 'expert_done', 'expert': '广府文化助手'}, ensure_ascii=False)}\n\n"
+                yield done_event('广府文化助手')
             
-            yield f"data: {json.dumps({'type': 'discussion_complete'}, ensure_ascii=False)}\n\n"
+            yield f"data: {json.dumps({'type': 'discussion_complete', 'skipped': selection['skipped']}, ensure_ascii=False)}\n\n"
             
         except Exception as e:
             logger.error(f"Collaboration stream error: {str(e)}")
             yield f"data: {json.dumps({'type': 'error', 'message': '抱歉，讨论过程中出现了问题'}, ensure_ascii=False)}\n\n"
+        finally:
+            if multiplexer is not None:
+                await multiplexer.aclose()
     
+    # 客户端断开时取消助手、各位专家的生成任务和总结
     return StreamingResponse(
-        generate_stream(),
+        get_stream_guard().guard(request, generate_stream(), "collaboration"),
         media_type="text/plain",
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
-            "Content-Type": "text/plain; charset=utf-8"
+            "Content-Type": "text/plain; charset=utf-8",
+            "X-Session-Id": session_id
         }
     )
 
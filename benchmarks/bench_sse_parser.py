@@ -0,0 +1,118 @@
+"""
+SSE解析基准测试
+对比旧的字符串拼接解析（decode 后 buffer += ... 再 split）和 core.sse_parser.SSEDecoder
+
+用法：
+    python benchmarks/bench_sse_parser.py                      # 使用生成的模拟流
+    python benchmarks/bench_sse_parser.py --capture a.sse ...  # 使用录制的原始SSE响应体
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.sse_parser import SSEDecoder
+
+_SAMPLE_TEXT = (
+    "广府文化是岭南文化的重要组成部分，粤剧被誉为“南国红豆”，唱腔融合了梆子和二黄；"
+    "骑楼沿街而建，既能遮阳又能避雨；早茶的虾饺、烧卖和叉烧包更是街坊们的日常。"
+)
+
+
+def make_capture(events: int = 2000, seed: int = 0) -> bytes:
+    """生成与 OpenAI 兼容接口格式一致的模拟流式响应"""
+    rng = random.Random(seed)
+    parts = []
+    for index in range(events):
+        start = rng.randrange(len(_SAMPLE_TEXT) - 8)
+        content = _SAMPLE_TEXT[start:start + rng.randint(1, 8)]
+        event = {
+            "id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": 0,
+            "model": "bench", "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}]
+        }
+        parts.append(f"data: {json.dumps(event, ensure_ascii=False)}\n\n")
+    parts.append("data: [DONE]\n\n")
+    return "".join(parts).encode("utf-8")
+
+
+def make_long_capture(events: int = 5, repeat: int = 300) -> bytes:
+    """生成单个事件很长的模拟流（如一次性返回大段内容），一行跨越大量字节块"""
+    event = {"choices": [{"index": 0, "delta": {"content": _SAMPLE_TEXT * repeat}}]}
+    return (f"data: {json.dumps(event, ensure_ascii=False)}\n\n" * events + "data: [DONE]\n\n").encode("utf-8")
+
+
+def split_chunks(raw: bytes, chunk_size: int) -> List[bytes]:
+    return [raw[start:start + chunk_size] for start in range(0, len(raw), chunk_size)]
+
+
+def parse_legacy(chunks: List[bytes]) -> List[str]:
+    """旧实现：每个字节块单独解码后拼接到字符串缓冲区再按行切分"""
+    events = []
+    buffer = ""
+    for chunk in chunks:
+        # 旧实现在字符被切断时会抛出 UnicodeDecodeError，这里替换为乱码以便继续比较
+        buffer += chunk.decode("utf-8", errors="replace")
+        lines = buffer.split("\n")
+        buffer = lines[-1]
+        for line in lines[:-1]:
+            line = line.strip()
+            if line.startswith("data: "):
+                events.append(line[6:])
+    return events
+
+
+def parse_decoder(chunks: List[bytes]) -> List[str]:
+    decoder = SSEDecoder()
+    events = []
+    for chunk in chunks:
+        events.extend(decoder.feed(chunk))
+    events.extend(decoder.flush())
+    return events
+
+
+def bench(parse: Callable[[List[bytes]], List[str]], chunks: List[bytes], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(chunks)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--capture", nargs="*", help="录制的原始SSE响应体文件")
+    parser.add_argument("--events", type=int, default=2000, help="模拟流的事件数")
+    parser.add_argument("--chunk-sizes", default="64,1024,16384", help="字节块大小，逗号分隔")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    captures = []
+    for path in args.capture or []:
+        with open(path, "rb") as f:
+            captures.append((os.path.basename(path), f.read()))
+    if not captures:
+        captures.append((f"simulated({args.events} events)", make_capture(args.events)))
+        captures.append(("simulated(long events)", make_long_capture()))
+
+    print(f"{'capture':<28}{'chunk':>8}{'legacy ms':>12}{'decoder ms':>12}{'speedup':>9}{'corrupted':>11}")
+    for name, raw in captures:
+        expected = parse_decoder([raw])
+        for chunk_size in (int(size) for size in args.chunk_sizes.split(",")):
+            chunks = split_chunks(raw, chunk_size)
+            assert parse_decoder(chunks) == expected
+            corrupted = sum(1 for a, b in zip(parse_legacy(chunks), expected) if a != b)
+            legacy = bench(parse_legacy, chunks, args.repeat)
+            decoder = bench(parse_decoder, chunks, args.repeat)
+            print(f"{name:<28}{chunk_size:>8}{legacy * 1000:>12.2f}{decoder * 1000:>12.2f}"
+                  f"{legacy / decoder:>8.2f}x{corrupted:>11}")
+
+
+if __name__ == "__main__":
+    main()
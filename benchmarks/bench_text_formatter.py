@@ -0,0 +1,109 @@
+"""
+文本格式化基准测试
+在专家长回复语料上测量 utils.text_formatter 的吞吐量（KB/s）
+
+用法：
+    python benchmarks/bench_text_formatter.py
+    python benchmarks/bench_text_formatter.py --baseline old_text_formatter.py   # 与旧版本对比
+    python benchmarks/bench_text_formatter.py --db conversations.db              # 使用对话记录中的回复
+
+旧版本可以这样取出：git show <提交>:utils/text_formatter.py > old_text_formatter.py
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import sqlite3
+import sys
+import time
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.text_formatter as current_module
+
+_CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus", "expert_answers.json")
+
+# format_text 的各个处理阶段（旧版本的 format_text 到不了这些阶段，因此直接按顺序调用）
+_STAGES = ("_process_markdown", "_process_special_symbols", "_optimize_paragraphs",
+           "_process_lists", "_beautify_emphasis", "_clean_whitespace")
+
+
+def load_corpus(db_path: str = None) -> List[Tuple[str, str]]:
+    """读取 (专家类型, 回复) 列表"""
+    if db_path:
+        conn = sqlite3.connect(db_path)
+        try:
+            rows = conn.execute("SELECT agent_type, agent_response FROM conversations").fetchall()
+        finally:
+            conn.close()
+        return [(agent_type, response) for agent_type, response in rows if response]
+    with open(_CORPUS_PATH, encoding="utf-8") as f:
+        return [(item["agent_type"], item["response"]) for item in json.load(f)]
+
+
+def load_module(path: str):
+    spec = importlib.util.spec_from_file_location("baseline_text_formatter", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def workloads(module) -> List[Tuple[str, Callable[[str, str], str]]]:
+    formatter = module.TextFormatter()
+
+    def stages(agent_type: str, text: str) -> str:
+        for stage in _STAGES:
+            text = getattr(formatter, stage)(text)
+        return text
+
+    return [
+        ("format_agent_response", lambda agent_type, text: module.format_agent_response(text, agent_type)),
+        ("text pipeline", stages),
+    ]
+
+
+def throughput(run: Callable[[str, str], str], corpus: List[Tuple[str, str]], repeat: int) -> float:
+    """最好一轮的吞吐量（KB/s）"""
+    size = sum(len(text.encode("utf-8")) for _, text in corpus) / 1024
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for agent_type, text in corpus:
+            run(agent_type, text)
+        best = min(best, time.perf_counter() - start)
+    return size / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", help="用于对比的旧版 text_formatter.py")
+    parser.add_argument("--db", help="从对话数据库读取专家回复作为语料")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.db)
+    if not corpus:
+        print("语料为空")
+        return
+    size = sum(len(text.encode("utf-8")) for _, text in corpus) / 1024
+    print(f"语料：{len(corpus)} 条回复，共 {size:.1f} KB")
+
+    baseline = load_module(args.baseline) if args.baseline else None
+    current = workloads(current_module)
+    before = workloads(baseline) if baseline else [(name, None) for name, _ in current]
+
+    print(f"{'workload':<24}{'before KB/s':>14}{'after KB/s':>14}{'speedup':>9}{'same output':>13}")
+    for (name, run), (_, old_run) in zip(current, before):
+        after = throughput(run, corpus, args.repeat)
+        if old_run is None:
+            print(f"{name:<24}{'-':>14}{after:>14.1f}")
+            continue
+        same = all(run(agent_type, text) == old_run(agent_type, text) for agent_type, text in corpus)
+        old = throughput(old_run, corpus, args.repeat)
+        print(f"{name:<24}{old:>14.1f}{after:>14.1f}{after / old:>8.2f}x{str(same):>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,16 +12,69 @@ class Config:
     # OpenAI配置
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', 'your_openai_api_key_here')
     OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1')
+    OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
+    OPENAI_MODELS = os.getenv('OPENAI_MODELS', '')  # 该后端可用的其他模型，逗号分隔
+    OPENAI_WEIGHT = float(os.getenv('OPENAI_WEIGHT', 0))  # 0表示只在硅基流动不可用时使用
     
     # 硅基流动配置
     SILICON_FLOW_API_KEY = os.getenv('SILICON_FLOW_API_KEY', 'sk-xxx')
     SILICON_FLOW_BASE_URL = os.getenv('SILICON_FLOW_BASE_URL', 'https://api.siliconflow.cn/v1')
     SILICON_FLOW_MODEL = os.getenv('SILICON_FLOW_MODEL', 'deepseek-ai/DeepSeek-R1-0528-Qwen3-8B')
+    SILICON_FLOW_MODELS = os.getenv('SILICON_FLOW_MODELS', 'Qwen/Qwen2.5-7B-Instruct')
+    SILICON_FLOW_WEIGHT = float(os.getenv('SILICON_FLOW_WEIGHT', 1))
     
+    # 按智能体指定模型（智能体=模型，逗号分隔）；后端不提供该模型时使用后端的默认模型
+    # 默认让助手的简短总结使用更快、更便宜的小模型
+    LLM_AGENT_MODELS = os.getenv('LLM_AGENT_MODELS', 'ambassador_summary=Qwen/Qwen2.5-7B-Instruct')
+
+    # LLM连接池配置
+    LLM_POOL_LIMIT = int(os.getenv('LLM_POOL_LIMIT', 100))
+    LLM_POOL_LIMIT_PER_HOST = int(os.getenv('LLM_POOL_LIMIT_PER_HOST', 20))
+    LLM_DNS_CACHE_TTL = int(os.getenv('LLM_DNS_CACHE_TTL', 300))
+    LLM_KEEPALIVE_TIMEOUT = float(os.getenv('LLM_KEEPALIVE_TIMEOUT', 30))
+    LLM_REQUEST_TIMEOUT = float(os.getenv('LLM_REQUEST_TIMEOUT', 60))
+    
+    # LLM请求准入控制：最大并发数、每分钟请求数和tokens（0表示不限制），
+    # 排队超时时间，以及排队请求每等待多少秒提升一级优先级
+    LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 16))
+    LLM_REQUESTS_PER_MINUTE = int(os.getenv('LLM_REQUESTS_PER_MINUTE', 600))
+    LLM_TOKENS_PER_MINUTE = int(os.getenv('LLM_TOKENS_PER_MINUTE', 0))
+    LLM_QUEUE_TIMEOUT = float(os.getenv('LLM_QUEUE_TIMEOUT', 30))
+    LLM_PRIORITY_AGING_SECONDS = float(os.getenv('LLM_PRIORITY_AGING_SECONDS', 10))
+    
+    # LLM请求重试：限流（429）、5xx和连接重置时按指数退避加随机抖动重试，
+    # 遵守Retry-After；单次请求（含重试）不超过总时限
+    LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 3))
+    LLM_RETRY_BASE_DELAY = float(os.getenv('LLM_RETRY_BASE_DELAY', 0.5))
+    LLM_RETRY_MAX_DELAY = float(os.getenv('LLM_RETRY_MAX_DELAY', 8))
+    LLM_REQUEST_DEADLINE = float(os.getenv('LLM_REQUEST_DEADLINE', 120))
+    
+    # LLM熔断器：连续失败多少次后熔断，熔断多少秒后放行探测请求，半开时最多同时探测几个
+    LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv('LLM_BREAKER_FAILURE_THRESHOLD', 5))
+    LLM_BREAKER_RECOVERY_SECONDS = float(os.getenv('LLM_BREAKER_RECOVERY_SECONDS', 30))
+    LLM_BREAKER_HALF_OPEN_MAX_CALLS = int(os.getenv('LLM_BREAKER_HALF_OPEN_MAX_CALLS', 1))
+
+    # LLM对冲请求（仅大使的开场回复）：首个片段等待超过最近TTFT的分位数时再发一个相同请求，
+    # 对冲请求数不超过请求总数的比例上限；样本不足时不对冲
+    LLM_HEDGE_ENABLED = os.getenv('LLM_HEDGE_ENABLED', 'False').lower() == 'true'
+    LLM_HEDGE_PERCENTILE = float(os.getenv('LLM_HEDGE_PERCENTILE', 95))
+    LLM_HEDGE_MAX_RATIO = float(os.getenv('LLM_HEDGE_MAX_RATIO', 0.05))
+    LLM_HEDGE_MIN_SAMPLES = int(os.getenv('LLM_HEDGE_MIN_SAMPLES', 20))
+    LLM_HEDGE_MIN_DELAY_MS = int(os.getenv('LLM_HEDGE_MIN_DELAY_MS', 200))
+
+    # 合并并发的相同LLM请求（模型、消息、温度、最大长度都相同时共用一个上游流）
+    LLM_COALESCE_ENABLED = os.getenv('LLM_COALESCE_ENABLED', 'True').lower() == 'true'
+
     # 数据库配置
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///./agent_system.db')
     REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379')
     
+    # SQLite执行器配置（每个数据库一个线程池，每个线程复用一个连接）
+    DB_EXECUTOR_WORKERS = int(os.getenv('DB_EXECUTOR_WORKERS', 4))
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 64 * 1024 * 1024))
+    SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', -16000))  # 负数表示KiB
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    
     # 应用配置
     APP_NAME = os.getenv('APP_NAME', '广府非遗文化多智能体协同平台')
     APP_VERSION = os.getenv('APP_VERSION', '1.0.0')
@@ -40,6 +93,49 @@ class Config:
     AGENT_TEMPERATURE = 0.7
     MAX_TOKENS = 2000
     
+    # 协同讨论配置
+    # sequential：专家依次发言；ordered：专家并发生成、按顺序输出；interleaved：并发生成、交错输出
+    COLLABORATION_STREAM_MODE = os.getenv('COLLABORATION_STREAM_MODE', 'ordered')
+    # 协同讨论预算：每个问题最多邀请的专家数（按关键词相关度选择）、
+    # 整场讨论（助手开场、专家发言和总结）的max_tokens总和，以及每位专家至少分到的max_tokens
+    COLLABORATION_MAX_EXPERTS = int(os.getenv('COLLABORATION_MAX_EXPERTS', 3))
+    COLLABORATION_MAX_TOTAL_TOKENS = int(os.getenv('COLLABORATION_MAX_TOTAL_TOKENS', 4500))
+    COLLABORATION_MIN_EXPERT_TOKENS = int(os.getenv('COLLABORATION_MIN_EXPERT_TOKENS', 600))
+    
+    # 会话记忆配置（按会话保存各专家最近的对话轮次）
+    SESSION_MAX_ENTRIES = int(os.getenv('SESSION_MAX_ENTRIES', 1000))
+    SESSION_TTL_SECONDS = int(os.getenv('SESSION_TTL_SECONDS', 1800))
+    SESSION_MAX_TURNS = int(os.getenv('SESSION_MAX_TURNS', 5))
+    
+    # 专家回复缓存（默认关闭；只缓存没有对话历史的请求）
+    RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'False').lower() == 'true'
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 512))
+    RESPONSE_CACHE_TTL_SECONDS = int(os.getenv('RESPONSE_CACHE_TTL_SECONDS', 86400))
+    RESPONSE_CACHE_DB_PATH = os.getenv('RESPONSE_CACHE_DB_PATH', 'response_cache.db')
+    RESPONSE_CACHE_REPLAY_CHUNK = int(os.getenv('RESPONSE_CACHE_REPLAY_CHUNK', 8))
+    
+    # 回复按需渲染（HTML卡片/排版文本）的缓存条数
+    RENDER_CACHE_MAX_ENTRIES = int(os.getenv('RENDER_CACHE_MAX_ENTRIES', 256))
+    
+    # 专家背景知识检索：每次最多取几条知识、拼接后的token预算（按每个字符一个token估算）和缓存条数
+    RETRIEVAL_TOP_K = int(os.getenv('RETRIEVAL_TOP_K', 3))
+    RETRIEVAL_TOKEN_BUDGET = int(os.getenv('RETRIEVAL_TOKEN_BUDGET', 300))
+    RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv('RETRIEVAL_CACHE_MAX_ENTRIES', 512))
+    
+    # 对话记录延迟写入配置（按时间间隔或条数批量写入）
+    CONVERSATION_FLUSH_INTERVAL_MS = int(os.getenv('CONVERSATION_FLUSH_INTERVAL_MS', 200))
+    CONVERSATION_FLUSH_BATCH_SIZE = int(os.getenv('CONVERSATION_FLUSH_BATCH_SIZE', 50))
+    CONVERSATION_FLUSH_MAX_RETRIES = int(os.getenv('CONVERSATION_FLUSH_MAX_RETRIES', 3))  # 写入失败的批次最多重试几次
+    
+    # 默认回复、错误提示等整段文本的分帧输出（打字效果由前端完成，默认不延时）
+    STREAM_REPLAY_FRAME_CHARS = int(os.getenv('STREAM_REPLAY_FRAME_CHARS', 32))
+    STREAM_REPLAY_DELAY_MS = float(os.getenv('STREAM_REPLAY_DELAY_MS', 0))
+    
+    # 流式响应断线检测间隔（客户端断开后取消上游请求），以及等待发送给客户端的最大片段数
+    # （缓冲满时暂停读取上游，慢客户端的背压传递到大模型流）
+    STREAM_DISCONNECT_POLL_MS = int(os.getenv('STREAM_DISCONNECT_POLL_MS', 500))
+    STREAM_GUARD_QUEUE_SIZE = int(os.getenv('STREAM_GUARD_QUEUE_SIZE', 64))
+    
     # WebSocket配置
     WS_HEARTBEAT_INTERVAL = 30
     WS_MAX_CONNECTIONS = 100
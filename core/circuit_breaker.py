@@ -0,0 +1,100 @@
+"""
+熔断器
+上游服务连续失败时暂停请求并立即失败，过一段时间后放行少量探测请求，恢复后再关闭
+"""
+
+import time
+from typing import Any, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """熔断器
+
+    - closed：正常放行，连续失败达到 failure_threshold 次后打开
+    - open：直接拒绝请求，recovery_timeout 秒后进入半开
+    - half_open：最多同时放行 half_open_max_calls 个探测请求，
+      探测成功则关闭，失败则重新打开
+
+    每个放行的请求结束时必须调用 record_success / record_failure / release 之一。
+    """
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = max(1, half_open_max_calls)
+
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._probes_in_flight = 0
+        self._stats = {"opened": 0, "rejected": 0, "successes": 0, "failures": 0}
+
+    @property
+    def state(self) -> str:
+        """当前状态（open 状态超过恢复时间后视为 half_open）"""
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+        return self._state
+
+    def allow_request(self) -> bool:
+        """判断是否放行请求"""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and self._probes_in_flight < self.half_open_max_calls:
+            self._probes_in_flight += 1
+            return True
+        self._stats["rejected"] += 1
+        return False
+
+    def is_available(self) -> bool:
+        """是否可能放行请求（不占用探测名额）"""
+        state = self.state
+        return state == CLOSED or (state == HALF_OPEN and self._probes_in_flight < self.half_open_max_calls)
+
+    def record_success(self):
+        """请求成功：清零连续失败次数，半开状态下关闭熔断器"""
+        self._stats["successes"] += 1
+        self._consecutive_failures = 0
+        if self._state == HALF_OPEN:
+            self._state = CLOSED
+            self._probes_in_flight = 0
+
+    def record_failure(self):
+        """请求失败：半开状态或连续失败达到阈值时打开熔断器"""
+        self._stats["failures"] += 1
+        self._consecutive_failures += 1
+        if self._state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def release(self):
+        """请求结束但不能说明上游是否正常（如被取消、参数错误），只归还探测名额"""
+        if self._state == HALF_OPEN and self._probes_in_flight > 0:
+            self._probes_in_flight -= 1
+
+    def _open(self):
+        if self._state != OPEN:
+            self._stats["opened"] += 1
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probes_in_flight = 0
+
+    def get_state(self) -> Dict[str, Any]:
+        """获取熔断器状态"""
+        state = self.state
+        info: Dict[str, Any] = dict(self._stats)
+        info.update({
+            "state": state,
+            "consecutive_failures": self._consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "recovery_timeout": self.recovery_timeout
+        })
+        if state == OPEN:
+            info["retry_in"] = round(max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at)), 3)
+        return info
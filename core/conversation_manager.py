@@ -9,15 +9,35 @@ import asyncio
 from datetime import datetime
 import sqlite3
 import os
+import logging
+
+from core.db_executor import create_db_executor
+from utils.text_formatter import FORMAT_VERSION
+
+logger = logging.getLogger(__name__)
 
 class ConversationManager:
-    def __init__(self, db_path: str = "conversations.db"):
+    def __init__(self, db_path: str = "conversations.db",
+                 flush_interval_ms: int = 200, flush_batch_size: int = 50, flush_max_retries: int = 3):
         self.db_path = db_path
-        self._init_database()
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_batch_size = flush_batch_size
+        self.flush_max_retries = flush_max_retries
+
+        # 延迟写入队列：对话轮次先入队，由后台任务批量写入
+        self._pending: List[tuple] = []
+        self._flush_event: Optional[asyncio.Event] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flush_retries = 0  # 队首记录连续写入失败的次数
+        self._write_stats = {"enqueued": 0, "written": 0, "batches": 0, "retried": 0, "failed": 0}
+
+        # 所有数据库操作都在执行器的线程池中进行
+        self._db = create_db_executor(db_path)
+        self._db.run_sync(self._init_database)
     
-    def _init_database(self):
-        """初始化数据库"""
-        conn = sqlite3.connect(self.db_path)
+    def _init_database(self, conn: sqlite3.Connection):
+        """初始化数据库（执行器连接已启用WAL，批量写入不会阻塞读取）"""
         cursor = conn.cursor()
         
         # 创建对话表
@@ -28,10 +48,16 @@ class ConversationManager:
                 user_message TEXT NOT NULL,
                 agent_response TEXT NOT NULL,
                 agent_type TEXT NOT NULL,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                format_version INTEGER NOT NULL DEFAULT 0
             )
         """)
         
+        # 旧数据库补上格式版本列（回复一直以原始文本保存，旧记录的版本为0）
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(conversations)")}
+        if "format_version" not in columns:
+            cursor.execute("ALTER TABLE conversations ADD COLUMN format_version INTEGER NOT NULL DEFAULT 0")
+        
         # 创建会话表
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS sessions (
@@ -42,165 +68,279 @@ class ConversationManager:
         """)
         
         conn.commit()
-        conn.close()
     
     async def save_conversation(self, session_id: str, user_message: str, 
                               agent_response: str, agent_type: str) -> bool:
-        """保存对话记录"""
+        """保存对话记录（立即写入）"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO conversations (session_id, user_message, agent_response, agent_type)
-                VALUES (?, ?, ?, ?)
-            """, (session_id, user_message, agent_response, agent_type))
-            
-            # 更新会话活动时间
-            cursor.execute("""
-                INSERT OR REPLACE INTO sessions (id, last_activity)
-                VALUES (?, CURRENT_TIMESTAMP)
-            """, (session_id,))
-            
-            conn.commit()
-            conn.close()
+            await self._db.run(self._write_batch, [self._make_row(session_id, user_message, agent_response, agent_type)])
             return True
             
         except Exception as e:
             print(f"保存对话记录失败: {e}")
             return False
     
-    async def get_conversation_history(self, session_id: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """获取对话历史"""
+    def enqueue_conversation(self, session_id: str, user_message: str,
+                             agent_response: str, agent_type: str):
+        """对话记录入队，由后台任务批量写入"""
+        self._pending.append(self._make_row(session_id, user_message, agent_response, agent_type))
+        self._write_stats["enqueued"] += 1
+        
+        if self._writer_task is None:
+            self.start_writer()
+        if len(self._pending) >= self.flush_batch_size and self._flush_event is not None:
+            self._flush_event.set()
+    
+    def start_writer(self):
+        """启动后台写入任务（需要在事件循环中调用）"""
+        if self._writer_task is not None and not self._writer_task.done():
+            return
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._flush_event = asyncio.Event()
+        self._flush_lock = None
+        self._writer_task = loop.create_task(self._writer_loop())
+    
+    async def _writer_loop(self):
+        """每隔 flush_interval 或积累满 flush_batch_size 条时写入一次"""
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+            await self.flush()
+    
+    async def flush(self) -> bool:
+        """把队列中的对话记录在一个事务中写入数据库；返回是否写入成功
+
+        写入失败的记录放回队首，下次重试；连续失败超过 flush_max_retries 次才放弃
+        """
+        if not self._pending:
+            return True
+        async with self._get_flush_lock():
+            batch, self._pending = self._pending, []
+            if not batch:
+                return True
+            try:
+                await self._db.run(self._write_batch, batch)
+                self._write_stats["written"] += len(batch)
+                self._write_stats["batches"] += 1
+                self._flush_retries = 0
+                return True
+            except Exception as e:
+                if self._flush_retries < self.flush_max_retries:
+                    self._flush_retries += 1
+                    self._pending = batch + self._pending
+                    self._write_stats["retried"] += len(batch)
+                    logger.warning(f"批量保存对话记录失败（{len(batch)}条），第{self._flush_retries}次重试: {e}")
+                else:
+                    self._flush_retries = 0
+                    self._write_stats["failed"] += len(batch)
+                    logger.error(f"批量保存对话记录失败（{len(batch)}条），已放弃: {e}")
+                return False
+    
+    def _get_flush_lock(self) -> asyncio.Lock:
+        """写入锁：保证同一时间只有一个批次在写，删除会话时等待正在写入的批次"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        return self._flush_lock
+    
+    async def close(self):
+        """停止后台写入任务，写入剩余记录后关闭数据库执行器"""
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._writer_task = None
+        # 失败的记录会放回队列重试，直到写完或重试次数用尽
+        while self._pending:
+            if not await self.flush():
+                await asyncio.sleep(self.flush_interval)
+        self._db.close()
+    
+    def get_write_stats(self) -> Dict[str, Any]:
+        """获取延迟写入统计"""
+        stats = dict(self._write_stats)
+        stats["pending"] = len(self._pending)
+        stats["executor"] = self._db.get_stats()
+        return stats
+    
+    @staticmethod
+    def _make_row(session_id: str, user_message: str, agent_response: str, agent_type: str) -> tuple:
+        """生成一条对话记录，时间戳取入队时刻（与 CURRENT_TIMESTAMP 格式一致）
+
+        agent_response 保存原始文本，展示时再按需渲染
+        """
+        timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        return (session_id, user_message, agent_response, agent_type, timestamp, FORMAT_VERSION)
+    
+    def _write_batch(self, conn: sqlite3.Connection, rows: List[tuple]):
+        """在一个事务中写入多条对话记录并更新会话活动时间"""
+        with conn:
+            conn.executemany("""
+                INSERT INTO conversations (session_id, user_message, agent_response, agent_type, timestamp,
+                                           format_version)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
             
+            # 每个会话只取最后一条记录的时间
+            last_activity = {row[0]: row[4] for row in rows}
+            conn.executemany("""
+                INSERT INTO sessions (id, created_at, last_activity)
+                VALUES (?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET last_activity = excluded.last_activity
+            """, [(sid, ts, ts) for sid, ts in last_activity.items()])
+    
+    async def get_conversation_history(self, session_id: str, limit: int = 10,
+                                       agent_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """获取对话历史（按时间倒序），可按智能体类型过滤"""
+        try:
+            return await self._db.run(self._get_conversation_history, session_id, limit, agent_type)
+            
+        except Exception as e:
+            print(f"获取对话历史失败: {e}")
+            return []
+    
+    def _get_conversation_history(self, conn: sqlite3.Connection, session_id: str, limit: int,
+                                  agent_type: Optional[str]) -> List[Dict[str, Any]]:
+        cursor = conn.cursor()
+        
+        if agent_type:
+            cursor.execute("""
+                SELECT user_message, agent_response, agent_type, timestamp, format_version
+                FROM conversations
+                WHERE session_id = ? AND agent_type = ?
+                ORDER BY timestamp DESC, id DESC
+                LIMIT ?
+            """, (session_id, agent_type, limit))
+        else:
             cursor.execute("""
-                SELECT user_message, agent_response, agent_type, timestamp
+                SELECT user_message, agent_response, agent_type, timestamp, format_version
                 FROM conversations
                 WHERE session_id = ?
-                ORDER BY timestamp DESC
+                ORDER BY timestamp DESC, id DESC
                 LIMIT ?
             """, (session_id, limit))
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
-            conversations = []
-            for row in rows:
-                conversations.append({
-                    "user_message": row[0],
-                    "agent_response": row[1],
-                    "agent_type": row[2],
-                    "timestamp": row[3]
-                })
-            
-            return conversations
-            
-        except Exception as e:
-            print(f"获取对话历史失败: {e}")
-            return []
+        
+        rows = cursor.fetchall()
+        
+        conversations = []
+        for row in rows:
+            conversations.append({
+                "user_message": row[0],
+                "agent_response": row[1],
+                "agent_type": row[2],
+                "timestamp": row[3],
+                "format_version": row[4]
+            })
+        
+        return conversations
     
     async def get_session_info(self, session_id: str) -> Optional[Dict[str, Any]]:
         """获取会话信息"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT created_at, last_activity
-                FROM sessions
-                WHERE id = ?
-            """, (session_id,))
-            
-            row = cursor.fetchone()
-            conn.close()
-            
-            if row:
-                return {
-                    "session_id": session_id,
-                    "created_at": row[0],
-                    "last_activity": row[1]
-                }
-            return None
+            return await self._db.run(self._get_session_info, session_id)
             
         except Exception as e:
             print(f"获取会话信息失败: {e}")
             return None
     
+    def _get_session_info(self, conn: sqlite3.Connection, session_id: str) -> Optional[Dict[str, Any]]:
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT created_at, last_activity
+            FROM sessions
+            WHERE id = ?
+        """, (session_id,))
+        
+        row = cursor.fetchone()
+        
+        if row:
+            return {
+                "session_id": session_id,
+                "created_at": row[0],
+                "last_activity": row[1]
+            }
+        return None
+    
     async def create_session(self, session_id: str) -> bool:
         """创建新会话"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT OR REPLACE INTO sessions (id, created_at, last_activity)
-                VALUES (?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-            """, (session_id,))
-            
-            conn.commit()
-            conn.close()
+            await self._db.run(self._create_session, session_id)
             return True
             
         except Exception as e:
             print(f"创建会话失败: {e}")
             return False
     
+    def _create_session(self, conn: sqlite3.Connection, session_id: str):
+        with conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO sessions (id, created_at, last_activity)
+                VALUES (?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+            """, (session_id,))
+    
     async def get_active_sessions(self, limit: int = 20) -> List[Dict[str, Any]]:
         """获取活跃会话列表"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT s.id, s.created_at, s.last_activity, COUNT(c.id) as message_count
-                FROM sessions s
-                LEFT JOIN conversations c ON s.id = c.session_id
-                GROUP BY s.id, s.created_at, s.last_activity
-                ORDER BY s.last_activity DESC
-                LIMIT ?
-            """, (limit,))
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
-            sessions = []
-            for row in rows:
-                sessions.append({
-                    "session_id": row[0],
-                    "created_at": row[1],
-                    "last_activity": row[2],
-                    "message_count": row[3]
-                })
-            
-            return sessions
+            return await self._db.run(self._get_active_sessions, limit)
             
         except Exception as e:
             print(f"获取活跃会话失败: {e}")
             return []
     
+    def _get_active_sessions(self, conn: sqlite3.Connection, limit: int) -> List[Dict[str, Any]]:
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT s.id, s.created_at, s.last_activity, COUNT(c.id) as message_count
+            FROM sessions s
+            LEFT JOIN conversations c ON s.id = c.session_id
+            GROUP BY s.id, s.created_at, s.last_activity
+            ORDER BY s.last_activity DESC
+            LIMIT ?
+        """, (limit,))
+        
+        rows = cursor.fetchall()
+        
+        sessions = []
+        for row in rows:
+            sessions.append({
+                "session_id": row[0],
+                "created_at": row[1],
+                "last_activity": row[2],
+                "message_count": row[3]
+            })
+        
+        return sessions
+    
     async def delete_session(self, session_id: str) -> bool:
         """删除会话"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # 删除对话记录
-            cursor.execute("DELETE FROM conversations WHERE session_id = ?", (session_id,))
-            
-            # 删除会话记录
-            cursor.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
-            
-            conn.commit()
-            conn.close()
+            # 等待正在写入的批次完成，并丢弃尚未写入的记录，避免删除后又被写回
+            async with self._get_flush_lock():
+                self._pending = [row for row in self._pending if row[0] != session_id]
+                await self._db.run(self._delete_session, session_id)
             return True
             
         except Exception as e:
             print(f"删除会话失败: {e}")
             return False
     
+    def _delete_session(self, conn: sqlite3.Connection, session_id: str):
+        with conn:
+            # 删除对话记录
+            conn.execute("DELETE FROM conversations WHERE session_id = ?", (session_id,))
+            
+            # 删除会话记录
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+    
     async def get_user_conversations(self, user_id: str) -> List[Dict[str, Any]]:
         """获取用户的所有对话记录（返回活跃会话列表）"""
         return await self.get_active_sessions()
@@ -0,0 +1,118 @@
+"""
+数据库执行器
+在独立线程池中执行SQLite操作，避免阻塞事件循环
+"""
+
+import asyncio
+import functools
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+
+class DatabaseExecutor:
+    """SQLite数据库执行器
+
+    每个工作线程持有一个复用的连接，连接创建时统一设置 PRAGMA；
+    通过 run() 提交的函数以连接作为第一个参数，在线程池中执行。
+    函数抛出异常时回滚未提交的事务，保证连接可以继续复用。
+    """
+
+    def __init__(self, db_path: str, max_workers: int = 4,
+                 mmap_size: int = 64 * 1024 * 1024, cache_size: int = -16000,
+                 busy_timeout_ms: int = 5000,
+                 on_connect: Optional[Callable[[sqlite3.Connection], None]] = None):
+        self.db_path = db_path
+        self.max_workers = max_workers
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.on_connect = on_connect
+
+        name = os.path.splitext(os.path.basename(db_path))[0] or "sqlite"
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"db-{name}")
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "in_flight": 0, "peak_in_flight": 0, "errors": 0}
+
+    def _connection(self) -> sqlite3.Connection:
+        """获取当前线程的连接，首次使用时创建"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # 连接只在所属线程中使用，关闭时由主线程统一释放
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+            conn.execute(f"PRAGMA cache_size={int(self.cache_size)}")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            if self.on_connect is not None:
+                self.on_connect(conn)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """在工作线程中执行函数"""
+        conn = self._connection()
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["in_flight"] += 1
+            self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._stats["in_flight"])
+        try:
+            return fn(conn, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._stats["errors"] += 1
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            with self._lock:
+                self._stats["in_flight"] -= 1
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """在线程池中执行 fn(conn, *args, **kwargs) 并等待结果"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(self._call, fn, *args, **kwargs)
+        )
+
+    def run_sync(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """同步执行，供初始化等不在事件循环中的代码使用"""
+        return self._executor.submit(self._call, fn, *args, **kwargs).result()
+
+    def close(self):
+        """关闭线程池和所有连接"""
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取执行统计"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["connections"] = len(self._connections)
+        stats["max_workers"] = self.max_workers
+        return stats
+
+
+def create_db_executor(db_path: str,
+                       on_connect: Optional[Callable[[sqlite3.Connection], None]] = None) -> DatabaseExecutor:
+    """按配置创建数据库执行器"""
+    from config import Config
+    return DatabaseExecutor(
+        db_path,
+        max_workers=Config.DB_EXECUTOR_WORKERS,
+        mmap_size=Config.SQLITE_MMAP_SIZE,
+        cache_size=Config.SQLITE_CACHE_SIZE,
+        busy_timeout_ms=Config.SQLITE_BUSY_TIMEOUT_MS,
+        on_connect=on_connect
+    )
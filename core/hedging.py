@@ -0,0 +1,151 @@
+"""
+对冲请求
+首个片段迟迟未到时再发一个相同的请求，谁先返回内容就用谁，另一个立即取消，用于压低尾部延迟
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional
+
+
+class HedgePolicy:
+    """对冲策略
+
+    记录最近 window 个请求的首个片段到达时间（TTFT），等待超过其 percentile
+    分位数（至少 min_delay 秒）仍没有内容时发出对冲请求；样本不足 min_samples 个时不对冲。
+    对冲请求数不超过请求总数的 max_ratio，避免上游故障时请求量翻倍。
+    """
+
+    def __init__(self, enabled: bool = False, percentile: float = 95.0, max_ratio: float = 0.05,
+                 window: int = 200, min_samples: int = 20, min_delay: float = 0.2):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self._ttft: Deque[float] = deque(maxlen=window)
+        self._stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "capped": 0}
+
+    def _quantile(self, percentile: float) -> Optional[float]:
+        if not self._ttft:
+            return None
+        samples = sorted(self._ttft)
+        return samples[min(len(samples) - 1, int(len(samples) * percentile / 100))]
+
+    def hedge_delay(self) -> Optional[float]:
+        """发出对冲请求前的等待秒数，不对冲时返回 None"""
+        if not self.enabled or len(self._ttft) < self.min_samples:
+            return None
+        return max(self.min_delay, self._quantile(self.percentile))
+
+    def record_request(self):
+        self._stats["requests"] += 1
+
+    def record_ttft(self, seconds: float, hedge_won: bool = False):
+        self._ttft.append(seconds)
+        if hedge_won:
+            self._stats["hedge_wins"] += 1
+
+    def try_hedge(self) -> bool:
+        """在对冲比例上限内占用一次对冲名额"""
+        if self._stats["hedged"] + 1 > self.max_ratio * self._stats["requests"]:
+            self._stats["capped"] += 1
+            return False
+        self._stats["hedged"] += 1
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取对冲统计"""
+        stats = dict(self._stats)
+        p50 = self._quantile(50)
+        p99 = self._quantile(99)
+        stats.update({
+            "enabled": self.enabled,
+            "hedge_ratio": round(stats["hedged"] / stats["requests"], 4) if stats["requests"] else 0.0,
+            "ttft_samples": len(self._ttft),
+            "ttft_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "ttft_p99_ms": round(p99 * 1000, 1) if p99 is not None else None,
+            "hedge_delay_ms": round(self.hedge_delay() * 1000, 1) if self.hedge_delay() is not None else None
+        })
+        return stats
+
+
+async def _pump(index: int, stream: AsyncIterator[str], queue: asyncio.Queue):
+    """把一路请求的输出搬运到共享队列"""
+    try:
+        async for item in stream:
+            queue.put_nowait((index, "chunk", item))
+        queue.put_nowait((index, "end", None))
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        queue.put_nowait((index, "error", e))
+
+
+async def hedged_stream(start_primary: Callable[[], AsyncIterator[str]],
+                        start_hedge: Callable[[], AsyncIterator[str]],
+                        policy: HedgePolicy) -> AsyncIterator[str]:
+    """带对冲的流式请求
+
+    先发出主请求；超过 policy.hedge_delay() 仍没有内容时发出对冲请求。先产出内容的一路胜出，
+    另一路立即取消。主请求在对冲前就失败时直接抛出它的错误（切换后端由调用方负责，
+    不占用对冲名额）；两路都失败时抛出主请求的错误。
+    """
+    policy.record_request()
+    started = time.monotonic()
+    delay = policy.hedge_delay()
+    queue: asyncio.Queue = asyncio.Queue()
+    tasks: List[asyncio.Task] = [asyncio.create_task(_pump(0, start_primary(), queue))]
+    errors: List[Exception] = []
+    winner: Optional[int] = None
+    hedged = False
+
+    def launch_hedge():
+        tasks.append(asyncio.create_task(_pump(1, start_hedge(), queue)))
+
+    try:
+        # 竞速阶段：等待第一路产出内容
+        while winner is None:
+            timeout = None
+            if len(tasks) == 1 and delay is not None:
+                timeout = max(0.0, started + delay - time.monotonic())
+            try:
+                index, kind, value = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                delay = None
+                if policy.try_hedge():
+                    hedged = True
+                    launch_hedge()
+                continue
+
+            if kind == "error":
+                errors.append(value)
+                if len(errors) == len(tasks):
+                    raise errors[0]
+                continue
+
+            winner = index
+            policy.record_ttft(time.monotonic() - started, hedge_won=(hedged and index == 1))
+            for other, task in enumerate(tasks):
+                if other != index:
+                    task.cancel()
+            if kind == "end":
+                return
+            yield value
+
+        # 胜出的一路继续输出，丢弃另一路残留在队列中的内容
+        while True:
+            index, kind, value = await queue.get()
+            if index != winner:
+                continue
+            if kind == "end":
+                return
+            if kind == "error":
+                raise value
+            yield value
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
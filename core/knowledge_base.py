@@ -1,25 +1,94 @@
 """
 知识库管理器
 负责管理广府非遗文化知识库
+
+全文索引 knowledge_fts 中保存的是在 Python 中切分好的检索词。knowledge_items 上的触发器只用普通SQL
+把增删改的条目id记入 knowledge_fts_pending，不依赖自定义函数，其他工具（sqlite3 命令行、管理脚本、
+迁移）也可以直接读写 knowledge_items；本模块在写入后、检索前和启动时把记录的条目同步到索引。
 """
 
 import json
 import os
+import re
+import hashlib
 from typing import Dict, List, Any, Optional
 import sqlite3
 from datetime import datetime
 
+from core.db_executor import create_db_executor
+
+# 数据库结构版本：2 起knowledge_items以(category, title)唯一，并记录内容哈希
+SCHEMA_VERSION = 2
+
+# 中文按连续字符二元组切分，英文和数字按整词切分
+_TOKEN_PATTERN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[A-Za-z0-9]+')
+
+def cjk_bigrams(text: Optional[str]) -> str:
+    """把文本切分为空格分隔的检索词：中文取字符二元组，英文数字取整词"""
+    if not text:
+        return ""
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(text):
+        run = match.group()
+        if run.isascii():
+            tokens.append(run.lower())
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return " ".join(tokens)
+
+def content_hash(content: str, tags: str) -> str:
+    """计算知识条目内容哈希，用于判断种子数据是否变化"""
+    return hashlib.sha256(f"{content}\x00{tags}".encode("utf-8")).hexdigest()
+
+# 按(category, title)写入知识条目，只有内容哈希变化时才更新
+_UPSERT_KNOWLEDGE_SQL = """
+    INSERT INTO knowledge_items (title, content, category, tags, content_hash)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (category, title) DO UPDATE SET
+        content = excluded.content,
+        tags = excluded.tags,
+        content_hash = excluded.content_hash,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE knowledge_items.content_hash IS NOT excluded.content_hash
+"""
+
 class KnowledgeBase:
     def __init__(self, db_path: str = "knowledge_base.db"):
         self.db_path = db_path
+        self.fts_enabled = False
+        # 内容版本号，知识条目变化时递增，用于让检索缓存失效
+        self.version = 0
+        # 所有数据库操作都在执行器的线程池中进行
+        self._db = create_db_executor(db_path)
         self._init_database()
         self._load_cultural_knowledge()
     
+    def close(self):
+        """关闭数据库执行器"""
+        self._db.close()
+    
     def _init_database(self):
         """初始化知识库数据库"""
-        conn = sqlite3.connect(self.db_path)
+        migrated = self._db.run_sync(self._init_schema)
+        
+        # 迁移时删除了大量重复行，顺带回收空间
+        if migrated:
+            self.compact()
+    
+    def _init_schema(self, conn: sqlite3.Connection) -> bool:
+        """创建表和全文索引，必要时升级旧版本结构；返回是否执行了迁移"""
         cursor = conn.cursor()
         
+        # 创建元数据表，记录结构版本和种子数据哈希
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS kb_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+        """)
+        
         # 创建知识条目表
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS knowledge_items (
@@ -29,6 +98,7 @@ class KnowledgeBase:
                 category TEXT NOT NULL,
                 tags TEXT,
                 source TEXT,
+                content_hash TEXT,
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                 updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
             )
@@ -45,7 +115,177 @@ class KnowledgeBase:
         """)
         
         conn.commit()
-        conn.close()
+        
+        try:
+            self._init_fts(cursor)
+            conn.commit()
+            self.fts_enabled = True
+        except sqlite3.OperationalError as e:
+            # 当前SQLite未编译FTS5时退回到LIKE检索
+            print(f"全文索引初始化失败，使用普通检索: {e}")
+        
+        # 旧版本数据库：补充字段、去重并建立唯一索引
+        migrated = False
+        if self._get_meta(cursor, "schema_version") != str(SCHEMA_VERSION):
+            self._migrate_schema(cursor)
+            self._set_meta(cursor, "schema_version", str(SCHEMA_VERSION))
+            conn.commit()
+            migrated = True
+        
+        return migrated
+    
+    def _get_meta(self, cursor: sqlite3.Cursor, key: str) -> Optional[str]:
+        """读取元数据"""
+        cursor.execute("SELECT value FROM kb_meta WHERE key = ?", (key,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+    
+    def _set_meta(self, cursor: sqlite3.Cursor, key: str, value: str):
+        """写入元数据"""
+        cursor.execute("""
+            INSERT INTO kb_meta (key, value) VALUES (?, ?)
+            ON CONFLICT (key) DO UPDATE SET value = excluded.value
+        """, (key, value))
+    
+    def _migrate_schema(self, cursor: sqlite3.Cursor):
+        """升级数据库结构到当前版本"""
+        cursor.execute("PRAGMA table_info(knowledge_items)")
+        columns = {row[1] for row in cursor.fetchall()}
+        if "content_hash" not in columns:
+            cursor.execute("ALTER TABLE knowledge_items ADD COLUMN content_hash TEXT")
+        
+        removed = self._deduplicate(cursor)
+        if removed:
+            print(f"知识库去重：删除 {removed} 条重复记录")
+        
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_knowledge_items_category_title
+            ON knowledge_items (category, title)
+        """)
+        
+        # 为历史数据补充内容哈希
+        cursor.execute("SELECT id, content, tags FROM knowledge_items WHERE content_hash IS NULL")
+        cursor.executemany(
+            "UPDATE knowledge_items SET content_hash = ? WHERE id = ?",
+            [(content_hash(row[1], row[2] or ""), row[0]) for row in cursor.fetchall()]
+        )
+    
+    def _deduplicate(self, cursor: sqlite3.Cursor) -> int:
+        """删除(category, title)重复的条目，每组只保留最新一条"""
+        cursor.execute("""
+            DELETE FROM knowledge_items
+            WHERE id NOT IN (
+                SELECT MAX(id) FROM knowledge_items GROUP BY category, title
+            )
+        """)
+        removed = cursor.rowcount
+        if removed and self.fts_enabled:
+            self._sync_index(cursor)
+        return removed
+    
+    def compact(self) -> int:
+        """一次性整理数据库：去重、合并全文索引段并回收磁盘空间"""
+        return self._db.run_sync(self._compact)
+    
+    def _compact(self, conn: sqlite3.Connection) -> int:
+        cursor = conn.cursor()
+        
+        removed = self._deduplicate(cursor)
+        if self.fts_enabled:
+            cursor.execute("INSERT INTO knowledge_fts (knowledge_fts) VALUES ('optimize')")
+        conn.commit()
+        
+        cursor.execute("VACUUM")
+        return removed
+    
+    def _init_fts(self, cursor: sqlite3.Cursor):
+        """创建FTS5全文索引和记录变更的触发器，并同步索引"""
+        # 索引中保存的是切分后的检索词，原文仍以knowledge_items为准
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_fts USING fts5(
+                title, content, tags, tokenize = 'unicode61'
+            )
+        """)
+        
+        # 待同步的条目id，由触发器写入；允许重复，同步时去重
+        # （UPSERT 会覆盖触发器内 INSERT OR IGNORE 的冲突处理，因此不设唯一约束）
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS knowledge_fts_pending (
+                id INTEGER NOT NULL
+            )
+        """)
+        
+        # 触发器只记录条目id，任何连接写入knowledge_items都不需要额外的函数
+        # （旧版本的同名触发器调用了 cjk_bigrams()，先删除再重建）
+        for trigger in ("knowledge_items_ai", "knowledge_items_ad", "knowledge_items_au"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        cursor.execute("""
+            CREATE TRIGGER knowledge_items_ai AFTER INSERT ON knowledge_items BEGIN
+                INSERT INTO knowledge_fts_pending (id) VALUES (new.id);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER knowledge_items_ad AFTER DELETE ON knowledge_items BEGIN
+                INSERT INTO knowledge_fts_pending (id) VALUES (old.id);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER knowledge_items_au AFTER UPDATE ON knowledge_items BEGIN
+                INSERT INTO knowledge_fts_pending (id) VALUES (old.id), (new.id);
+            END
+        """)
+        
+        # 补记建立触发器之前增删、还没有同步的条目
+        cursor.execute("""
+            INSERT INTO knowledge_fts_pending (id)
+            SELECT id FROM knowledge_items WHERE id NOT IN (SELECT rowid FROM knowledge_fts)
+        """)
+        cursor.execute("""
+            INSERT INTO knowledge_fts_pending (id)
+            SELECT rowid FROM knowledge_fts WHERE rowid NOT IN (SELECT id FROM knowledge_items)
+        """)
+        self._sync_index(cursor)
+    
+    def _sync_index(self, cursor: sqlite3.Cursor) -> int:
+        """把触发器记录的条目同步到全文索引，返回同步的条目数"""
+        cursor.execute("SELECT DISTINCT id FROM knowledge_fts_pending")
+        ids = [row[0] for row in cursor.fetchall()]
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            # 先取走记录（同时开始写事务），再读取条目的最新内容，避免漏掉并发的修改
+            cursor.execute(f"DELETE FROM knowledge_fts_pending WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            self._index_items(cursor, chunk)
+        return len(ids)
+    
+    def _index_items(self, cursor: sqlite3.Cursor, ids: List[int]):
+        """为指定条目（重新）建立全文索引，已删除的条目只删除索引"""
+        if not ids:
+            return
+        rows = []
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            cursor.execute(f"DELETE FROM knowledge_fts WHERE rowid IN ({placeholders})", chunk)
+            cursor.execute(f"SELECT id, title, content, tags FROM knowledge_items WHERE id IN ({placeholders})", chunk)
+            rows.extend(cursor.fetchall())
+        cursor.executemany(
+            "INSERT INTO knowledge_fts (rowid, title, content, tags) VALUES (?, ?, ?, ?)",
+            [(row[0], cjk_bigrams(row[1]), cjk_bigrams(row[2]), cjk_bigrams(row[3])) for row in rows]
+        )
+    
+    def rebuild_index(self):
+        """重建全部全文索引"""
+        if self.fts_enabled:
+            self._db.run_sync(self._rebuild_index)
+    
+    def _rebuild_index(self, conn: sqlite3.Connection):
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM knowledge_fts_pending")
+        cursor.execute("DELETE FROM knowledge_fts")
+        cursor.execute("SELECT id FROM knowledge_items")
+        self._index_items(cursor, [row[0] for row in cursor.fetchall()])
+        conn.commit()
+        self.version += 1
     
     def _load_cultural_knowledge(self):
         """加载广府文化知识"""
@@ -61,30 +301,56 @@ class KnowledgeBase:
                 "骑楼文化": "骑楼是广府建筑的重要特色，一楼为商铺，二楼以上为住宅，形成独特的商业街景。这种建筑形式既实用又美观，体现了广府人民的智慧。",
                 "岭南园林": "岭南园林以小巧精致著称，如余荫山房、清晖园等，体现了岭南文化的特色。布局紧凑、装饰精美、意境深远。",
                 "传统民居": "广府传统民居以三间两廊、四点金等格局为主，注重通风采光和防潮，体现了广府人民对居住环境的智慧设计。",
-                "建筑装饰": "广府建筑装饰丰富，有木雕、石雕、砖雕、灰塑等，工艺精湛，寓意深刻，是广府文化的重要载体。"
+                "建筑装饰": "广府建筑装饰丰富，有木雕、石雕、砖雕、灰塑等，工艺精湛，寓意深刻，是广府文化的重要载体。",
+                "建筑历史": "广府建筑融合了中原建筑传统和岭南地方特色，形成了独特的建筑风格。"
             },
             "岭南美食": {
                 "广府菜系": "广府菜是粤菜的重要组成部分，以清淡鲜美、原汁原味著称，注重食材的新鲜和烹饪的精细。",
                 "茶楼文化": "广府茶楼文化历史悠久，早茶、下午茶是广府人重要的社交方式，体现了悠闲的生活态度。",
                 "传统小吃": "广府传统小吃丰富多样，如肠粉、虾饺、烧卖、叉烧包等，制作精细，口味独特。",
-                "饮食习俗": "广府饮食习俗体现了岭南文化的特色，如煲汤文化、糖水文化等，注重养生和美味。"
+                "饮食习俗": "广府饮食习俗体现了岭南文化的特色，如煲汤文化、糖水文化等，注重养生和美味。",
+                "烹饪技艺": "广府烹饪技艺精湛，有蒸、炒、炖、煲等多种技法，注重火候和调味。"
             },
             "节庆民俗": {
                 "春节习俗": "广府春节习俗丰富，有贴春联、放鞭炮、拜年、舞狮等，体现了浓厚的节日氛围。",
                 "端午节": "广府端午节有赛龙舟、吃粽子、挂艾草等习俗，龙舟竞渡是重要的民俗活动。",
                 "中秋节": "广府中秋节有赏月、吃月饼、玩花灯等习俗，体现了团圆和思乡之情。",
-                "重阳节": "广府重阳节有登高、赏菊、吃重阳糕等习俗，体现了敬老和祈福的寓意。"
+                "重阳节": "广府重阳节有登高、赏菊、吃重阳糕等习俗，体现了敬老和祈福的寓意。",
+                "民俗活动": "广府民俗活动丰富多样，有舞狮、舞龙、粤剧表演等，体现了深厚的文化底蕴。"
+            },
+            "茶文化": {
+                "茶艺茶道": "广府茶艺以工夫茶为主，注重冲泡技法，讲究水温、时间和手法，体现了精致的品味。",
+                "茶叶品种": "广府茶文化以乌龙茶、红茶为主，如单丛、水仙、滇红等，各有独特风味。",
+                "茶具鉴赏": "广府茶具以紫砂壶、盖碗、公道杯为主，工艺精湛，造型雅致，富有文化内涵。",
+                "饮茶习俗": "广府人喜欢饮茶，早茶、下午茶是重要的社交活动，茶楼文化历史悠久。",
+                "茶楼礼仪": "广府茶楼文化注重礼仪和氛围，斟茶叩谢、留茶底等习俗体现了茶文化的深厚底蕴。",
+                "工夫茶": "工夫茶是广府茶艺的精髓，讲究七泡有余香，每一次冲泡都有不同的茶韵。",
+                "茶文化": "茶文化在广府文化中占有重要地位，既是生活艺术，也是精神追求，体现了东方哲学思想。"
+            },
+            "传统手工艺": {
+                "广绣": "广绣是中国四大名绣之一，以构图饱满、色彩浓艳、针法多样著称，擅长绣制人物、花鸟等题材。",
+                "广彩": "广彩是广府独有的瓷器装饰工艺，以色彩斑斓、金碧辉煌著称，融合了中西绘画技法。",
+                "木雕": "广府木雕工艺精湛，以镂空雕、浮雕为主，题材丰富，寓意深刻，常见于建筑装饰和家具制作。",
+                "石雕": "广府石雕历史悠久，以线条流畅、造型生动著称，常见于祠堂、庙宇等传统建筑中。",
+                "牙雕": "广府牙雕工艺精细入微，以题材丰富、雕刻精细闻名，是岭南工艺美术的重要代表。",
+                "传统技艺": "广府传统手工艺体现了工匠精神和文化传承，每一件作品都蕴含着深厚的文化内涵和精湛的技艺。"
             }
         }
         
         # 将文化知识存储到数据库
-        self._store_cultural_data(cultural_data)
+        self._db.run_sync(self._store_cultural_data, cultural_data)
     
-    def _store_cultural_data(self, cultural_data: Dict[str, Dict[str, str]]):
-        """存储文化数据到数据库"""
-        conn = sqlite3.connect(self.db_path)
+    def _store_cultural_data(self, conn: sqlite3.Connection, cultural_data: Dict[str, Dict[str, str]]):
+        """存储文化数据到数据库（种子数据未变化时不写库）"""
+        seed_hash = hashlib.sha256(
+            json.dumps(cultural_data, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+        
         cursor = conn.cursor()
         
+        if self._get_meta(cursor, "seed_hash") == seed_hash:
+            return
+        
         for category, items in cultural_data.items():
             # 插入分类
             cursor.execute("""
@@ -92,175 +358,266 @@ class KnowledgeBase:
                 VALUES (?, ?)
             """, (category, f"{category}相关知识"))
             
-            # 插入知识条目
+            # 插入或更新知识条目
             for title, content in items.items():
-                cursor.execute("""
-                    INSERT OR REPLACE INTO knowledge_items (title, content, category, tags)
-                    VALUES (?, ?, ?, ?)
-                """, (title, content, category, f"{category},{title}"))
+                tags = f"{category},{title}"
+                cursor.execute(_UPSERT_KNOWLEDGE_SQL, (title, content, category, tags, content_hash(content, tags)))
         
+        if self.fts_enabled:
+            self._sync_index(cursor)
+        self._set_meta(cursor, "seed_hash", seed_hash)
         conn.commit()
-        conn.close()
+        self.version += 1
     
-    async def search_knowledge(self, query: str, category: Optional[str] = None) -> List[Dict[str, Any]]:
-        """搜索知识库"""
+    async def search_knowledge(self, query: str, category: Optional[str] = None,
+                               limit: int = 10, offset: int = 0) -> List[Dict[str, Any]]:
+        """搜索知识库，按bm25相关度排序并返回摘要片段"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            if category:
-                cursor.execute("""
-                    SELECT title, content, category, tags
-                    FROM knowledge_items
-                    WHERE category = ? AND (title LIKE ? OR content LIKE ?)
-                    ORDER BY updated_at DESC
-                """, (category, f"%{query}%", f"%{query}%"))
-            else:
-                cursor.execute("""
-                    SELECT title, content, category, tags
-                    FROM knowledge_items
-                    WHERE title LIKE ? OR content LIKE ?
-                    ORDER BY updated_at DESC
-                """, (f"%{query}%", f"%{query}%"))
-            
-            rows = cursor.fetchall()
-            conn.close()
+            if not self.fts_enabled:
+                return await self._db.run(self._search_knowledge_like, query, category, limit, offset)
             
-            results = []
-            for row in rows:
-                results.append({
-                    "title": row[0],
-                    "content": row[1],
-                    "category": row[2],
-                    "tags": row[3].split(",") if row[3] else []
-                })
+            match_query = self._build_match_query(query)
+            if not match_query:
+                return []
             
-            return results
+            return await self._db.run(self._search_knowledge_fts, match_query, category, limit, offset)
             
         except Exception as e:
             print(f"搜索知识库失败: {e}")
             return []
     
+    def _search_knowledge_fts(self, conn: sqlite3.Connection, match_query: str,
+                              category: Optional[str], limit: int, offset: int) -> List[Dict[str, Any]]:
+        """全文索引检索"""
+        cursor = conn.cursor()
+        
+        # 其他工具写入的条目在检索前同步到索引
+        cursor.execute("SELECT 1 FROM knowledge_fts_pending LIMIT 1")
+        if cursor.fetchone() is not None:
+            self._sync_index(cursor)
+            conn.commit()
+            self.version += 1
+        
+        # 标题权重最高，其次是标签，最后是正文
+        sql = """
+            SELECT k.title, k.content, k.category, k.tags,
+                   bm25(knowledge_fts, 5.0, 1.0, 2.0) AS score
+            FROM knowledge_fts
+            JOIN knowledge_items k ON k.id = knowledge_fts.rowid
+            WHERE knowledge_fts MATCH ?
+        """
+        params: List[Any] = [match_query]
+        if category:
+            sql += " AND k.category = ?"
+            params.append(category)
+        sql += " ORDER BY score LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        
+        terms = match_query.replace('"', '').split(" OR ")
+        results = []
+        for row in rows:
+            results.append({
+                "title": row[0],
+                "content": row[1],
+                "category": row[2],
+                "tags": row[3].split(",") if row[3] else [],
+                "score": -row[4],
+                "snippet": self._make_snippet(row[1], terms)
+            })
+        
+        return results
+    
+    def _build_match_query(self, query: str) -> str:
+        """把自然语言问题转换为FTS5的OR查询"""
+        terms = list(dict.fromkeys(cjk_bigrams(query).split()))
+        return " OR ".join(f'"{term}"' for term in terms)
+    
+    def _make_snippet(self, content: str, terms: List[str], width: int = 60) -> str:
+        """截取命中检索词附近的原文作为摘要"""
+        positions = [content.find(term) for term in terms]
+        positions = [pos for pos in positions if pos >= 0]
+        if not positions:
+            return content[:width] + ("…" if len(content) > width else "")
+        
+        start = max(0, min(positions) - width // 4)
+        end = min(len(content), start + width)
+        prefix = "…" if start > 0 else ""
+        suffix = "…" if end < len(content) else ""
+        return prefix + content[start:end] + suffix
+    
+    def _search_knowledge_like(self, conn: sqlite3.Connection, query: str, category: Optional[str],
+                               limit: int, offset: int) -> List[Dict[str, Any]]:
+        """未启用全文索引时的子串检索"""
+        cursor = conn.cursor()
+        
+        if category:
+            cursor.execute("""
+                SELECT title, content, category, tags
+                FROM knowledge_items
+                WHERE category = ? AND (title LIKE ? OR content LIKE ?)
+                ORDER BY updated_at DESC
+                LIMIT ? OFFSET ?
+            """, (category, f"%{query}%", f"%{query}%", limit, offset))
+        else:
+            cursor.execute("""
+                SELECT title, content, category, tags
+                FROM knowledge_items
+                WHERE title LIKE ? OR content LIKE ?
+                ORDER BY updated_at DESC
+                LIMIT ? OFFSET ?
+            """, (f"%{query}%", f"%{query}%", limit, offset))
+        
+        rows = cursor.fetchall()
+        
+        results = []
+        for row in rows:
+            results.append({
+                "title": row[0],
+                "content": row[1],
+                "category": row[2],
+                "tags": row[3].split(",") if row[3] else [],
+                "score": 0.0,
+                "snippet": self._make_snippet(row[1], [query])
+            })
+        
+        return results
+    
     async def get_knowledge_by_category(self, category: str) -> List[Dict[str, Any]]:
         """根据分类获取知识"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT title, content, tags
-                FROM knowledge_items
-                WHERE category = ?
-                ORDER BY title
-            """, (category,))
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
-            results = []
-            for row in rows:
-                results.append({
-                    "title": row[0],
-                    "content": row[1],
-                    "tags": row[2].split(",") if row[2] else []
-                })
-            
-            return results
+            return await self._db.run(self._get_knowledge_by_category, category)
             
         except Exception as e:
             print(f"获取分类知识失败: {e}")
             return []
     
+    def _get_knowledge_by_category(self, conn: sqlite3.Connection, category: str) -> List[Dict[str, Any]]:
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT title, content, tags
+            FROM knowledge_items
+            WHERE category = ?
+            ORDER BY title
+        """, (category,))
+        
+        rows = cursor.fetchall()
+        
+        results = []
+        for row in rows:
+            results.append({
+                "title": row[0],
+                "content": row[1],
+                "tags": row[2].split(",") if row[2] else []
+            })
+        
+        return results
+    
     async def add_knowledge(self, title: str, content: str, category: str, tags: List[str] = None) -> bool:
-        """添加知识条目"""
+        """添加知识条目（同一分类下标题相同则更新内容）"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            tags_str = ",".join(tags) if tags else ""
-            
-            cursor.execute("""
-                INSERT INTO knowledge_items (title, content, category, tags)
-                VALUES (?, ?, ?, ?)
-            """, (title, content, category, tags_str))
-            
-            conn.commit()
-            conn.close()
+            await self._db.run(self._add_knowledge, title, content, category, tags)
+            self.version += 1
             return True
             
         except Exception as e:
             print(f"添加知识条目失败: {e}")
             return False
     
+    def _add_knowledge(self, conn: sqlite3.Connection, title: str, content: str,
+                       category: str, tags: Optional[List[str]]):
+        tags_str = ",".join(tags) if tags else ""
+        
+        cursor = conn.cursor()
+        cursor.execute(_UPSERT_KNOWLEDGE_SQL, (title, content, category, tags_str, content_hash(content, tags_str)))
+        if self.fts_enabled:
+            self._sync_index(cursor)
+        conn.commit()
+    
     async def get_categories(self) -> List[Dict[str, Any]]:
         """获取所有分类"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT name, description, COUNT(k.id) as item_count
-                FROM categories c
-                LEFT JOIN knowledge_items k ON c.name = k.category
-                GROUP BY c.name, c.description
-                ORDER BY c.name
-            """)
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
-            categories = []
-            for row in rows:
-                categories.append({
-                    "name": row[0],
-                    "description": row[1],
-                    "item_count": row[2]
-                })
-            
-            return categories
+            return await self._db.run(self._get_categories)
             
         except Exception as e:
             print(f"获取分类失败: {e}")
             return []
     
+    def _get_categories(self, conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT name, description, COUNT(k.id) as item_count
+            FROM categories c
+            LEFT JOIN knowledge_items k ON c.name = k.category
+            GROUP BY c.name, c.description
+            ORDER BY c.name
+        """)
+        
+        rows = cursor.fetchall()
+        
+        categories = []
+        for row in rows:
+            categories.append({
+                "name": row[0],
+                "description": row[1],
+                "item_count": row[2]
+            })
+        
+        return categories
+    
     async def get_related_knowledge(self, title: str, limit: int = 5) -> List[Dict[str, Any]]:
         """获取相关知识"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # 先获取当前条目的分类
-            cursor.execute("SELECT category FROM knowledge_items WHERE title = ?", (title,))
-            row = cursor.fetchone()
-            
-            if not row:
-                return []
-            
-            category = row[0]
-            
-            # 获取同分类的其他条目
-            cursor.execute("""
-                SELECT title, content, tags
-                FROM knowledge_items
-                WHERE category = ? AND title != ?
-                ORDER BY updated_at DESC
-                LIMIT ?
-            """, (category, title, limit))
-            
-            rows = cursor.fetchall()
-            conn.close()
-            
-            results = []
-            for row in rows:
-                results.append({
-                    "title": row[0],
-                    "content": row[1],
-                    "tags": row[2].split(",") if row[2] else []
-                })
-            
-            return results
+            return await self._db.run(self._get_related_knowledge, title, limit)
             
         except Exception as e:
             print(f"获取相关知识失败: {e}")
             return []
+    
+    def _get_related_knowledge(self, conn: sqlite3.Connection, title: str, limit: int) -> List[Dict[str, Any]]:
+        cursor = conn.cursor()
+        
+        # 先获取当前条目的分类
+        cursor.execute("SELECT category FROM knowledge_items WHERE title = ?", (title,))
+        row = cursor.fetchone()
+        
+        if not row:
+            return []
+        
+        category = row[0]
+        
+        # 获取同分类的其他条目
+        cursor.execute("""
+            SELECT title, content, tags
+            FROM knowledge_items
+            WHERE category = ? AND title != ?
+            ORDER BY updated_at DESC
+            LIMIT ?
+        """, (category, title, limit))
+        
+        rows = cursor.fetchall()
+        
+        results = []
+        for row in rows:
+            results.append({
+                "title": row[0],
+                "content": row[1],
+                "tags": row[2].split(",") if row[2] else []
+            })
+        
+        return results
+
+
+# 全局知识库实例
+_knowledge_base = None
 
+def get_knowledge_base() -> KnowledgeBase:
+    """获取知识库实例（接口和专家检索共用）"""
+    global _knowledge_base
+    if _knowledge_base is None:
+        _knowledge_base = KnowledgeBase()
+    return _knowledge_base
@@ -5,98 +5,345 @@
 
 import requests
 import json
+import time
 import asyncio
 import aiohttp
+from contextlib import asynccontextmanager
 from typing import List, Dict, Any, Optional
 import logging
 
+from core.rate_limiter import RateLimiter, PRIORITY_INTERACTIVE
+from core.circuit_breaker import CircuitBreaker
+from core.sse_parser import iter_sse_data
+from core.retry_policy import RetryPolicy, parse_retry_after
+
 logger = logging.getLogger(__name__)
 
+# 请求失败时可以展示给用户的提示语（见 LLMError.user_message）
+SERVICE_UNAVAILABLE_MESSAGE = "抱歉，AI服务暂时不可用，请稍后再试。"
+TIMEOUT_MESSAGE = "抱歉，请求超时，请稍后再试。"
+SERVICE_ERROR_MESSAGE = "抱歉，服务出现异常，请稍后再试。"
+ERROR_MESSAGES = (SERVICE_UNAVAILABLE_MESSAGE, TIMEOUT_MESSAGE, SERVICE_ERROR_MESSAGE)
+
+# 可以重试的HTTP状态码（限流和服务端临时故障）
+RETRYABLE_STATUS = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+
+
+class LLMError(Exception):
+    """大模型请求失败
+
+    user_message 为可以展示给用户的提示语，retryable 表示是否值得重试。
+    """
+    user_message = SERVICE_ERROR_MESSAGE
+    retryable = False
+
+    def __init__(self, message: str, retryable: Optional[bool] = None):
+        super().__init__(message)
+        if retryable is not None:
+            self.retryable = retryable
+
+
+class LLMTimeoutError(LLMError):
+    """请求超时"""
+    user_message = TIMEOUT_MESSAGE
+    retryable = True
+
+
+class LLMConnectionError(LLMError):
+    """连接失败或连接被重置"""
+    retryable = True
+
+
+class LLMStatusError(LLMError):
+    """服务端返回了非200的状态码"""
+    user_message = SERVICE_UNAVAILABLE_MESSAGE
+
+    def __init__(self, status: int, body: str = "", retry_after: Optional[float] = None):
+        super().__init__(f"API请求失败: {status}, {body[:200]}", retryable=status in RETRYABLE_STATUS)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class LLMQueueTimeoutError(LLMTimeoutError):
+    """排队等待准入超时（已经等了很久，不再重试）"""
+    retryable = False
+
+
+class LLMCircuitOpenError(LLMError):
+    """熔断器打开期间直接拒绝的请求"""
+    user_message = SERVICE_UNAVAILABLE_MESSAGE
+
+
 class SiliconFlowClient:
     """硅基流动API客户端"""
     
-    def __init__(self, api_key: str, base_url: str = "https://api.siliconflow.cn/v1"):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.siliconflow.cn/v1",
+        pool_limit: int = 100,
+        pool_limit_per_host: int = 20,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 30.0,
+        request_timeout: float = 60.0,
+        rate_limiter: Optional[RateLimiter] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None
+    ):
         self.api_key = api_key
         self.base_url = base_url
         self.chat_url = f"{base_url}/chat/completions"
         
+        # 连接池配置
+        self.pool_limit = pool_limit
+        self.pool_limit_per_host = pool_limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.request_timeout = request_timeout
+        
+        # 全局准入控制（并发数、每分钟请求数和tokens），默认只限制并发
+        self.rate_limiter = rate_limiter or RateLimiter(max_concurrency=pool_limit_per_host)
+        
+        # 限流、服务端临时故障和连接重置时的重试策略
+        self.retry_policy = retry_policy or RetryPolicy()
+        
+        # 上游连续失败时熔断，避免每个请求都等到超时才降级
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        
+        # 长连接会话（首次使用或应用启动时创建）
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._sync_session: Optional[requests.Session] = None
+        
+        # 连接池使用统计
+        self._pool_stats = {
+            "requests_total": 0,
+            "in_flight": 0,
+            "peak_in_flight": 0,
+            "sessions_created": 0,
+            "cancelled": 0,
+            "retries": 0,
+            "failures": 0
+        }
+    
+    async def start(self) -> aiohttp.ClientSession:
+        """创建共享的连接池会话（应用启动时调用）"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_limit,
+                limit_per_host=self.pool_limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout)
+            )
+            self._pool_stats["sessions_created"] += 1
+        return self._session
+    
+    async def close(self):
+        """关闭连接池（应用关闭时调用）"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        if self._sync_session is not None:
+            self._sync_session.close()
+            self._sync_session = None
+    
+    @asynccontextmanager
+    async def _track_request(self):
+        """统计在途请求数，用于评估连接池大小"""
+        stats = self._pool_stats
+        stats["requests_total"] += 1
+        stats["in_flight"] += 1
+        stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+        try:
+            yield
+        except (asyncio.CancelledError, GeneratorExit):
+            # 调用方取消或提前关闭了流（如客户端断线），退出时连接随之释放
+            stats["cancelled"] += 1
+            raise
+        finally:
+            stats["in_flight"] -= 1
+    
+    @staticmethod
+    def _estimate_prompt_tokens(messages: List[Dict[str, str]]) -> int:
+        """粗略估算提示词的tokens（按每个字符一个token，宁多勿少）"""
+        return sum(len(message.get("content") or "") for message in messages)
+    
+    @asynccontextmanager
+    async def _admit(self, messages: List[Dict[str, str]], max_tokens: int, priority: int):
+        """排队等待准入，预留提示词加 max_tokens 的额度，结束后按实际用量退回"""
+        prompt_tokens = self._estimate_prompt_tokens(messages)
+        try:
+            ticket = await self.rate_limiter.acquire(prompt_tokens + max_tokens, priority)
+        except asyncio.TimeoutError:
+            raise LLMQueueTimeoutError("排队等待准入超时")
+        ticket.used_tokens = prompt_tokens
+        try:
+            yield ticket
+        finally:
+            self.rate_limiter.release(ticket)
+    
+    def is_available(self) -> bool:
+        """上游服务是否可用（熔断器打开时返回 False，调用方可以直接降级）"""
+        return self.circuit_breaker.is_available()
+    
+    def _check_circuit(self):
+        """熔断器打开时立即失败"""
+        if not self.circuit_breaker.allow_request():
+            raise LLMCircuitOpenError("上游服务熔断中，暂停请求")
+    
+    def _record_failure(self, error: LLMError):
+        """只有限流、服务端故障、超时和连接失败才计入熔断器"""
+        if error.retryable:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.release()
+    
+    def _retry_delay(self, error: LLMError, attempt: int, remaining: float, emitted: bool = False) -> Optional[float]:
+        """判断失败的请求是否重试，返回等待秒数；不重试时记录失败并返回 None
+
+        流式请求只有在还没有输出任何内容时才重试，避免重复输出。
+        """
+        delay = None
+        if error.retryable and not emitted:
+            delay = self.retry_policy.next_delay(attempt, remaining, getattr(error, "retry_after", None))
+        if delay is None:
+            self._pool_stats["failures"] += 1
+            logger.error(f"API请求失败（已重试{attempt}次）: {error}")
+        else:
+            self._pool_stats["retries"] += 1
+            logger.warning(f"API请求失败，{delay:.2f}秒后第{attempt + 1}次重试: {error}")
+        return delay
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """获取连接池使用统计"""
+        stats = dict(self._pool_stats)
+        stats.update({
+            "pool_limit": self.pool_limit,
+            "pool_limit_per_host": self.pool_limit_per_host,
+            "utilisation": round(stats["in_flight"] / self.pool_limit_per_host, 3) if self.pool_limit_per_host else 0.0,
+            "session_open": self._session is not None and not self._session.closed,
+            "admission": self.rate_limiter.get_stats(),
+            "circuit": self.circuit_breaker.get_state()
+        })
+        return stats
+        
     async def chat_completion(
         self, 
         messages: List[Dict[str, str]], 
         model: str = "Qwen/QwQ-32B",
         temperature: float = 0.7,
         max_tokens: int = 2000,
-        stream: bool = False
+        stream: bool = False,
+        priority: int = PRIORITY_INTERACTIVE
     ):
-        """发送聊天完成请求"""
-        try:
-            payload = {
-                "model": model,
-                "messages": messages,
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-                "stream": stream
-            }
-            
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            async with aiohttp.ClientSession() as session:
+        """发送聊天完成请求
+
+        失败时按重试策略重试，仍然失败则抛出 LLMError，不再把提示语当作回复返回。
+        """
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": stream
+        }
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.retry_policy.deadline
+        attempt = 0
+        while True:
+            self._check_circuit()
+            emitted = False
+            settled = False
+            try:
+                async for content in self._request(payload, priority, deadline - loop.time()):
+                    if not settled:
+                        # 收到第一个片段即说明上游可用
+                        self.circuit_breaker.record_success()
+                        settled = True
+                    emitted = True
+                    yield content
+                if not settled:
+                    self.circuit_breaker.record_success()
+                    settled = True
+                return
+            except LLMError as e:
+                self._record_failure(e)
+                settled = True
+                delay = self._retry_delay(e, attempt, deadline - loop.time(), emitted)
+                if delay is None:
+                    raise
+            finally:
+                if not settled:
+                    # 被取消或提前关闭，不能说明上游是否正常
+                    self.circuit_breaker.release()
+            attempt += 1
+            await asyncio.sleep(delay)
+    
+    async def _request(self, payload: Dict[str, Any], priority: int, remaining: float):
+        """发送一次请求，把各种失败统一转换为 LLMError"""
+        if remaining <= 0:
+            raise LLMTimeoutError("已超过请求总时限", retryable=False)
+        
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        session = await self.start()
+        async with self._admit(payload["messages"], payload["max_tokens"], priority) as ticket, self._track_request():
+            try:
                 async with session.post(
                     self.chat_url, 
                     json=payload, 
                     headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=60)
+                    timeout=aiohttp.ClientTimeout(total=min(self.request_timeout, remaining))
                 ) as response:
-                    if response.status == 200:
-                        if stream:
-                            # 流式响应处理
-                            buffer = ""
-                            async for chunk in response.content.iter_chunked(1024):
-                                buffer += chunk.decode('utf-8')
-                                lines = buffer.split('\n')
-                                buffer = lines[-1]  # 保留最后一行（可能不完整）
-                                
-                                for line in lines[:-1]:
-                                    line = line.strip()
-                                    if line.startswith('data: '):
-                                        data = line[6:]  # 移除 'data: ' 前缀
-                                        if data == '[DONE]':
-                                            return
-                                        try:
-                                            chunk_data = json.loads(data)
-                                            if 'choices' in chunk_data and len(chunk_data['choices']) > 0:
-                                                delta = chunk_data['choices'][0].get('delta', {})
-                                                if 'content' in delta and delta['content'] is not None:
-                                                    yield delta['content']
-                                        except json.JSONDecodeError:
-                                            continue
-                        else:
-                            # 非流式响应处理
-                            result = await response.json()
-                            yield result["choices"][0]["message"]["content"]
-                    else:
+                    if response.status != 200:
                         error_text = await response.text()
-                        logger.error(f"API请求失败: {response.status}, {error_text}")
-                        if stream:
-                            yield "抱歉，AI服务暂时不可用，请稍后再试。"
-                        else:
-                            yield "抱歉，AI服务暂时不可用，请稍后再试。"
-                        
-        except asyncio.TimeoutError:
-            logger.error("API请求超时")
-            if stream:
-                yield "抱歉，请求超时，请稍后再试。"
-            else:
-                yield "抱歉，请求超时，请稍后再试。"
-        except Exception as e:
-            logger.error(f"API请求异常: {str(e)}")
-            if stream:
-                yield "抱歉，服务出现异常，请稍后再试。"
-            else:
-                yield "抱歉，服务出现异常，请稍后再试。"
+                        raise LLMStatusError(
+                            response.status, error_text,
+                            parse_retry_after(response.headers.get("Retry-After"))
+                        )
+                    
+                    if payload["stream"]:
+                        # 流式响应处理：增量解码SSE事件
+                        async for data in iter_sse_data(response.content.iter_any()):
+                            if data == '[DONE]':
+                                return
+                            content = self._delta_content(data)
+                            if content:
+                                ticket.used_tokens += len(content)
+                                yield content
+                    else:
+                        # 非流式响应处理
+                        result = await response.json()
+                        content = result["choices"][0]["message"]["content"]
+                        ticket.used_tokens += len(content or "")
+                        yield content
+            except asyncio.TimeoutError:
+                raise LLMTimeoutError("API请求超时")
+            except aiohttp.ContentTypeError as e:
+                raise LLMError(f"API响应格式异常: {e}")
+            except aiohttp.ClientError as e:
+                raise LLMConnectionError(f"API连接异常: {e}")
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                raise LLMError(f"API响应格式异常: {e}")
+    
+    @staticmethod
+    def _delta_content(data: str) -> Optional[str]:
+        """从流式事件中取出增量文本，无法解析的事件返回 None"""
+        try:
+            chunk_data = json.loads(data)
+        except json.JSONDecodeError:
+            return None
+        choices = chunk_data.get('choices') if isinstance(chunk_data, dict) else None
+        if not choices:
+            return None
+        return (choices[0].get('delta') or {}).get('content')
     
     def chat_completion_sync(
         self, 
@@ -105,94 +352,111 @@ class SiliconFlowClient:
         temperature: float = 0.7,
         max_tokens: int = 2000
     ) -> str:
-        """同步版本的聊天完成请求"""
+        """同步版本的聊天完成请求（不经过准入控制），失败时抛出 LLMError"""
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        
+        deadline = time.monotonic() + self.retry_policy.deadline
+        attempt = 0
+        while True:
+            self._check_circuit()
+            try:
+                content = self._request_sync(payload, deadline - time.monotonic())
+            except LLMError as e:
+                self._record_failure(e)
+                delay = self._retry_delay(e, attempt, deadline - time.monotonic())
+                if delay is None:
+                    raise
+            else:
+                self.circuit_breaker.record_success()
+                return content
+            attempt += 1
+            time.sleep(delay)
+    
+    def _request_sync(self, payload: Dict[str, Any], remaining: float) -> str:
+        """同步发送一次请求"""
+        if remaining <= 0:
+            raise LLMTimeoutError("已超过请求总时限", retryable=False)
+        
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        if self._sync_session is None:
+            self._sync_session = requests.Session()
+        
         try:
-            payload = {
-                "model": model,
-                "messages": messages,
-                "temperature": temperature,
-                "max_tokens": max_tokens
-            }
-            
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            response = requests.post(
+            response = self._sync_session.post(
                 self.chat_url, 
                 json=payload, 
                 headers=headers,
-                timeout=60
+                timeout=min(self.request_timeout, remaining)
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result["choices"][0]["message"]["content"]
-            else:
-                logger.error(f"API请求失败: {response.status_code}, {response.text}")
-                return "抱歉，AI服务暂时不可用，请稍后再试。"
-                
         except requests.exceptions.Timeout:
-            logger.error("API请求超时")
-            return "抱歉，请求超时，请稍后再试。"
-        except Exception as e:
-            logger.error(f"API请求异常: {str(e)}")
-            return "抱歉，服务出现异常，请稍后再试。"
+            raise LLMTimeoutError("API请求超时")
+        except requests.exceptions.RequestException as e:
+            raise LLMConnectionError(f"API连接异常: {e}")
+        
+        if response.status_code != 200:
+            raise LLMStatusError(
+                response.status_code, response.text,
+                parse_retry_after(response.headers.get("Retry-After"))
+            )
+        try:
+            return response.json()["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            raise LLMError(f"API响应格式异常: {e}")
     
     async def stream_chat_completion(
         self, 
         messages: List[Dict[str, str]], 
         model: str = "Qwen/QwQ-32B",
         temperature: float = 0.7,
-        max_tokens: int = 2000
+        max_tokens: int = 2000,
+        priority: int = PRIORITY_INTERACTIVE
     ):
         """流式聊天完成请求"""
-        try:
-            payload = {
-                "model": model,
-                "messages": messages,
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-                "stream": True
-            }
-            
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.chat_url, 
-                    json=payload, 
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=60)
-                ) as response:
-                    if response.status == 200:
-                        async for line in response.content:
-                            if line:
-                                line = line.decode('utf-8')
-                                if line.startswith('data: '):
-                                    data = line[6:].strip()
-                                    if data == '[DONE]':
-                                        break
-                                    try:
-                                        chunk = json.loads(data)
-                                        if 'choices' in chunk and len(chunk['choices']) > 0:
-                                            delta = chunk['choices'][0].get('delta', {})
-                                            if 'content' in delta:
-                                                yield delta['content']
-                                    except json.JSONDecodeError:
-                                        continue
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"流式API请求失败: {response.status}, {error_text}")
-                        yield "抱歉，AI服务暂时不可用，请稍后再试。"
-                        
-        except Exception as e:
-            logger.error(f"流式API请求异常: {str(e)}")
-            yield "抱歉，服务出现异常，请稍后再试。"
+        async for content in self.chat_completion(
+            messages, model=model, temperature=temperature,
+            max_tokens=max_tokens, stream=True, priority=priority
+        ):
+            yield content
+
+def create_llm_client(api_key: str, base_url: str) -> SiliconFlowClient:
+    """按配置创建 OpenAI 兼容接口的客户端（连接池、准入控制、重试和熔断）"""
+    from config import Config
+    return SiliconFlowClient(
+        api_key=api_key,
+        base_url=base_url,
+        pool_limit=Config.LLM_POOL_LIMIT,
+        pool_limit_per_host=Config.LLM_POOL_LIMIT_PER_HOST,
+        dns_cache_ttl=Config.LLM_DNS_CACHE_TTL,
+        keepalive_timeout=Config.LLM_KEEPALIVE_TIMEOUT,
+        request_timeout=Config.LLM_REQUEST_TIMEOUT,
+        rate_limiter=RateLimiter(
+            max_concurrency=Config.LLM_MAX_CONCURRENCY,
+            requests_per_minute=Config.LLM_REQUESTS_PER_MINUTE,
+            tokens_per_minute=Config.LLM_TOKENS_PER_MINUTE,
+            queue_timeout=Config.LLM_QUEUE_TIMEOUT,
+            aging_seconds=Config.LLM_PRIORITY_AGING_SECONDS
+        ),
+        retry_policy=RetryPolicy(
+            max_retries=Config.LLM_MAX_RETRIES,
+            base_delay=Config.LLM_RETRY_BASE_DELAY,
+            max_delay=Config.LLM_RETRY_MAX_DELAY,
+            deadline=Config.LLM_REQUEST_DEADLINE
+        ),
+        circuit_breaker=CircuitBreaker(
+            failure_threshold=Config.LLM_BREAKER_FAILURE_THRESHOLD,
+            recovery_timeout=Config.LLM_BREAKER_RECOVERY_SECONDS,
+            half_open_max_calls=Config.LLM_BREAKER_HALF_OPEN_MAX_CALLS
+        )
+    )
 
 # 全局客户端实例
 _silicon_flow_client = None
@@ -202,9 +466,11 @@ def get_silicon_flow_client() -> SiliconFlowClient:
     global _silicon_flow_client
     if _silicon_flow_client is None:
         from config import Config
-        _silicon_flow_client = SiliconFlowClient(
-            api_key=Config.SILICON_FLOW_API_KEY,
-            base_url=Config.SILICON_FLOW_BASE_URL
-        )
+        _silicon_flow_client = create_llm_client(Config.SILICON_FLOW_API_KEY, Config.SILICON_FLOW_BASE_URL)
     return _silicon_flow_client
 
+async def close_silicon_flow_client():
+    """关闭全局客户端的连接池"""
+    if _silicon_flow_client is not None:
+        await _silicon_flow_client.close()
+
@@ -0,0 +1,338 @@
+"""
+大模型服务路由
+在多个 OpenAI 兼容的后端（硅基流动、OpenAI 等）之间按权重、实测延迟和错误率分配请求，
+某个后端出错时切换到其他后端，并支持按智能体指定模型
+"""
+
+import logging
+import random
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from core.hedging import HedgePolicy, hedged_stream
+from core.llm_client import (
+    SiliconFlowClient, LLMError, LLMCircuitOpenError, LLMQueueTimeoutError, create_llm_client
+)
+from core.rate_limiter import PRIORITY_INTERACTIVE
+from core.single_flight import SingleFlight, request_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# 延迟和错误率的指数滑动平均系数
+_EWMA_ALPHA = 0.2
+# 还没有延迟数据的后端按此延迟（秒）估算
+_DEFAULT_LATENCY = 1.0
+# 本地拒绝（熔断中、排队超时）的请求没有到达后端，不计入后端的错误率
+_LOCAL_REJECTIONS = (LLMCircuitOpenError, LLMQueueTimeoutError)
+
+
+class ProviderBackend:
+    """一个 OpenAI 兼容的后端
+
+    models 为该后端可以提供的模型，请求的模型不在其中时改用 default_model。
+    latency 为首个片段到达时间的滑动平均，error_rate 为失败率的滑动平均。
+    weight 为0的后端只在其他后端都不可用时使用。
+    """
+
+    def __init__(self, name: str, client: SiliconFlowClient, default_model: str,
+                 models: Iterable[str] = (), weight: float = 1.0):
+        self.name = name
+        self.client = client
+        self.default_model = default_model
+        self.models = {default_model, *[model for model in models if model]}
+        self.weight = weight
+
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self._stats = {"requests": 0, "failures": 0, "failovers": 0}
+
+    def model_for(self, model: Optional[str]) -> str:
+        """该后端实际使用的模型"""
+        return model if model in self.models else self.default_model
+
+    def score(self) -> float:
+        """路由得分：权重越高、延迟越低、错误率越低，得分越高"""
+        latency = self.latency if self.latency is not None else _DEFAULT_LATENCY
+        return self.weight * (1.0 - self.error_rate) / max(latency, 0.05)
+
+    def record_latency(self, seconds: float):
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += _EWMA_ALPHA * (seconds - self.latency)
+
+    def record_failover(self):
+        self._stats["failovers"] += 1
+
+    def record_result(self, ok: bool):
+        self._stats["requests"] += 1
+        if not ok:
+            self._stats["failures"] += 1
+        self.error_rate += _EWMA_ALPHA * ((0.0 if ok else 1.0) - self.error_rate)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats.update({
+            "default_model": self.default_model,
+            "models": sorted(self.models),
+            "weight": self.weight,
+            "score": round(self.score(), 3),
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "available": self.client.is_available(),
+            "pool": self.client.get_pool_stats()
+        })
+        return stats
+
+
+class ProviderRouter:
+    """大模型服务路由，接口与 SiliconFlowClient.chat_completion 一致
+
+    每个请求按得分加权随机选择首选后端（同时考虑权重、延迟和错误率），
+    提供所需模型的后端优先；失败且还没有输出内容时依次切换到其他可用后端。
+    agent_models 为智能体到模型的映射，用于给不同智能体指定不同的模型。
+    hedge_policy 为对冲策略，只作用于 hedge=True 的流式请求。
+    single_flight 用于合并并发的相同请求。
+    """
+
+    def __init__(self, backends: List[ProviderBackend], agent_models: Optional[Dict[str, str]] = None,
+                 hedge_policy: Optional[HedgePolicy] = None, single_flight: Optional[SingleFlight] = None):
+        if not backends:
+            raise ValueError("至少需要配置一个大模型后端")
+        self.backends = backends
+        self.agent_models = dict(agent_models or {})
+        self.hedge_policy = hedge_policy or HedgePolicy()
+        self.single_flight = single_flight or SingleFlight(enabled=False)
+
+    def for_agent(self, agent: str) -> "AgentLLMClient":
+        """获取绑定了智能体的客户端（应用该智能体的模型配置）"""
+        return AgentLLMClient(self, agent)
+
+    def _candidates(self, model: Optional[str]) -> List[ProviderBackend]:
+        """按尝试顺序排列的后端"""
+        available = [backend for backend in self.backends if backend.client.is_available()]
+        if not available:
+            return []
+
+        serving = [backend for backend in available if model in backend.models]
+        preferred = serving or available
+        weighted = [backend for backend in preferred if backend.score() > 0]
+        if weighted:
+            first = random.choices(weighted, weights=[backend.score() for backend in weighted])[0]
+        else:
+            first = max(preferred, key=lambda backend: backend.weight)
+
+        rest = sorted(
+            (backend for backend in available if backend is not first),
+            key=lambda backend: (model not in backend.models, -backend.score())
+        )
+        return [first] + rest
+
+    async def _attempt(self, backend: ProviderBackend, model: Optional[str], messages: List[Dict[str, str]],
+                       temperature: float, max_tokens: int, stream: bool, priority: int):
+        """在一个后端上发送请求，并记录延迟和成败"""
+        started = time.monotonic()
+        emitted = False
+        try:
+            async for content in backend.client.chat_completion(
+                messages=messages,
+                model=backend.model_for(model),
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=stream,
+                priority=priority
+            ):
+                if not emitted:
+                    backend.record_latency(time.monotonic() - started)
+                    emitted = True
+                yield content
+        except _LOCAL_REJECTIONS:
+            raise
+        except LLMError:
+            backend.record_result(False)
+            raise
+        backend.record_result(True)
+
+    async def chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        stream: bool = False,
+        priority: int = PRIORITY_INTERACTIVE,
+        agent: Optional[str] = None,
+        hedge: bool = False
+    ):
+        """发送聊天完成请求，失败时切换后端；全部失败时抛出最后一个 LLMError
+
+        模型、消息、温度、最大长度和调用方式都相同的并发请求共用一个上游请求。
+        hedge=True 且启用了对冲时，流式请求首个片段迟迟未到会向下一个后端
+        （只有一个后端时向同一后端）再发一个相同的请求，先产出内容的一路胜出。
+        """
+        model = self.agent_models.get(agent, model) if agent else model
+        key = request_fingerprint(model, messages, temperature, max_tokens, stream)
+        async for content in self.single_flight.stream(
+            key, lambda: self._dispatch(messages, model, temperature, max_tokens, stream, priority, hedge)
+        ):
+            yield content
+
+    async def _dispatch(self, messages: List[Dict[str, str]], model: Optional[str], temperature: float,
+                        max_tokens: int, stream: bool, priority: int, hedge: bool):
+        """选择后端发送请求（对冲或依次切换）"""
+        candidates = self._candidates(model)
+        last_error: Optional[LLMError] = None
+
+        if hedge and stream and self.hedge_policy.enabled and candidates:
+            primary = candidates[0]
+            secondary = candidates[1] if len(candidates) > 1 else primary
+            tried: List[ProviderBackend] = []
+
+            def start(backend: ProviderBackend):
+                tried.append(backend)
+                return self._attempt(backend, model, messages, temperature, max_tokens, stream, priority)
+
+            emitted = False
+            try:
+                async for content in hedged_stream(lambda: start(primary), lambda: start(secondary),
+                                                   self.hedge_policy):
+                    emitted = True
+                    yield content
+                return
+            except LLMError as e:
+                if emitted:
+                    raise
+                # 没有输出内容就失败了：和普通请求一样依次切换到还没尝试过的后端
+                last_error = e
+                candidates = [backend for backend in candidates if backend not in tried]
+
+        for backend in candidates:
+            if last_error is not None:
+                backend.record_failover()
+                logger.warning(f"切换到大模型后端 {backend.name}: {last_error}")
+
+            emitted = False
+            try:
+                async for content in self._attempt(backend, model, messages, temperature,
+                                                   max_tokens, stream, priority):
+                    emitted = True
+                    yield content
+            except LLMError as e:
+                if emitted:
+                    # 已经输出了部分内容，换后端会重复输出
+                    raise
+                last_error = e
+                continue
+            return
+
+        raise last_error or LLMCircuitOpenError("所有大模型后端均不可用")
+
+    def is_available(self) -> bool:
+        """是否有可用的后端"""
+        return any(backend.client.is_available() for backend in self.backends)
+
+    async def start(self):
+        """创建各后端的连接池"""
+        for backend in self.backends:
+            await backend.client.start()
+
+    async def close(self):
+        """关闭各后端的连接池"""
+        for backend in self.backends:
+            await backend.client.close()
+
+    def get_health(self) -> Dict[str, Any]:
+        """健康状态：全部后端正常为 ok，部分熔断为 degraded，全部熔断为 down"""
+        circuits = {backend.name: backend.client.circuit_breaker.get_state() for backend in self.backends}
+        closed = sum(1 for circuit in circuits.values() if circuit["state"] == "closed")
+        if closed == len(circuits):
+            status = "ok"
+        elif self.is_available():
+            status = "degraded"
+        else:
+            status = "down"
+        return {"status": status, "backends": circuits}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各后端的路由统计"""
+        return {
+            "backends": {backend.name: backend.get_stats() for backend in self.backends},
+            "agent_models": dict(self.agent_models),
+            "hedging": self.hedge_policy.get_stats(),
+            "coalescing": self.single_flight.get_stats()
+        }
+
+
+class AgentLLMClient:
+    """绑定了智能体的客户端，调用时自动带上智能体名称"""
+
+    def __init__(self, router: ProviderRouter, agent: str):
+        self.router = router
+        self.agent = agent
+
+    def chat_completion(self, messages: List[Dict[str, str]], model: Optional[str] = None, **kwargs):
+        return self.router.chat_completion(messages, model=model, agent=self.agent, **kwargs)
+
+    def is_available(self) -> bool:
+        return self.router.is_available()
+
+
+def _parse_list(value: str) -> List[str]:
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+def _parse_mapping(value: str) -> Dict[str, str]:
+    """解析 "agent=model,agent=model" 形式的配置"""
+    mapping = {}
+    for item in _parse_list(value):
+        if "=" in item:
+            key, model = item.split("=", 1)
+            mapping[key.strip()] = model.strip()
+    return mapping
+
+
+# 全局路由实例
+_provider_router = None
+
+def get_provider_router() -> ProviderRouter:
+    """获取大模型服务路由实例（按配置创建后端）"""
+    global _provider_router
+    if _provider_router is None:
+        from config import Config
+        from core.llm_client import get_silicon_flow_client
+
+        backends = [ProviderBackend(
+            "siliconflow", get_silicon_flow_client(),
+            default_model=Config.SILICON_FLOW_MODEL,
+            models=_parse_list(Config.SILICON_FLOW_MODELS),
+            weight=Config.SILICON_FLOW_WEIGHT
+        )]
+        if Config.OPENAI_API_KEY and Config.OPENAI_API_KEY != 'your_openai_api_key_here':
+            backends.append(ProviderBackend(
+                "openai", create_llm_client(Config.OPENAI_API_KEY, Config.OPENAI_BASE_URL),
+                default_model=Config.OPENAI_MODEL,
+                models=_parse_list(Config.OPENAI_MODELS),
+                weight=Config.OPENAI_WEIGHT
+            ))
+        hedge_policy = HedgePolicy(
+            enabled=Config.LLM_HEDGE_ENABLED,
+            percentile=Config.LLM_HEDGE_PERCENTILE,
+            max_ratio=Config.LLM_HEDGE_MAX_RATIO,
+            min_samples=Config.LLM_HEDGE_MIN_SAMPLES,
+            min_delay=Config.LLM_HEDGE_MIN_DELAY_MS / 1000
+        )
+        _provider_router = ProviderRouter(
+            backends, _parse_mapping(Config.LLM_AGENT_MODELS), hedge_policy,
+            SingleFlight(enabled=Config.LLM_COALESCE_ENABLED)
+        )
+    return _provider_router
+
+def get_llm_client(agent: Optional[str] = None):
+    """获取大模型客户端；指定智能体时返回应用了该智能体模型配置的客户端"""
+    router = get_provider_router()
+    return router.for_agent(agent) if agent else router
+
+async def close_llm_client():
+    """关闭所有后端的连接池"""
+    if _provider_router is not None:
+        await _provider_router.close()
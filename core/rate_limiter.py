@@ -0,0 +1,182 @@
+"""
+大模型请求准入控制
+全局限制上游请求的并发数、每分钟请求数和每分钟tokens，超出限制的请求按优先级公平排队
+"""
+
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+# 请求优先级（数值越小越优先）：用户正在等待的对话优先于后台的总结、综合
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+
+class TokenBucket:
+    """令牌桶，按每分钟的额度匀速补充，容量为一分钟的额度"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay_for(self, amount: float, now: float) -> float:
+        """距离桶内有足够令牌还需等待的秒数"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float):
+        """退回预留但没有用掉的令牌"""
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class AdmissionTicket:
+    """一次准入的凭证，记录预留的tokens和实际用量"""
+
+    __slots__ = ("priority", "seq", "tokens", "used_tokens", "enqueued_at", "future")
+
+    def __init__(self, priority: int, seq: int, tokens: int, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.used_tokens: Optional[int] = None
+        self.enqueued_at = time.monotonic()
+        self.future = future
+
+
+class RateLimiter:
+    """上游请求准入控制
+
+    同时满足三个条件的请求才会放行：在途请求数小于 max_concurrency、
+    每分钟请求数和每分钟tokens的令牌桶有余量（额度为0表示不限制）。
+    排队的请求按优先级放行，同优先级先到先得；每等待 aging_seconds 秒
+    优先级提升一级，后台请求不会被一直饿死。
+    """
+
+    def __init__(self, max_concurrency: int = 16, requests_per_minute: int = 0,
+                 tokens_per_minute: int = 0, queue_timeout: float = 60.0,
+                 aging_seconds: float = 10.0):
+        self.max_concurrency = max(1, max_concurrency)
+        self.queue_timeout = queue_timeout
+        self.aging_seconds = aging_seconds
+        self._request_bucket = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+
+        self._waiters: List[AdmissionTicket] = []
+        self._active = 0
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._stats = {
+            "admitted": 0,
+            "timeouts": 0,
+            "throttled": 0,
+            "peak_queue_depth": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0
+        }
+
+    def _effective_priority(self, ticket: AdmissionTicket, now: float) -> int:
+        if self.aging_seconds <= 0:
+            return ticket.priority
+        return ticket.priority - int((now - ticket.enqueued_at) / self.aging_seconds)
+
+    def _dispatch(self):
+        """在并发和额度允许的范围内放行排队的请求"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._waiters and self._active < self.max_concurrency:
+            now = time.monotonic()
+            ticket = min(self._waiters, key=lambda t: (self._effective_priority(t, now), t.seq))
+            if ticket.future.done():
+                # 已超时或被取消的请求
+                self._waiters.remove(ticket)
+                continue
+
+            delay = 0.0
+            if self._request_bucket is not None:
+                delay = max(delay, self._request_bucket.delay_for(1, now))
+            if self._token_bucket is not None:
+                delay = max(delay, self._token_bucket.delay_for(ticket.tokens, now))
+            if delay > 0:
+                # 额度不足：队首请求等到额度恢复再放行，后面的请求不插队
+                self._stats["throttled"] += 1
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+
+            if self._request_bucket is not None:
+                self._request_bucket.consume(1)
+            if self._token_bucket is not None:
+                self._token_bucket.consume(ticket.tokens)
+            self._waiters.remove(ticket)
+            self._active += 1
+            ticket.future.set_result(None)
+
+    async def acquire(self, tokens: int = 0, priority: int = PRIORITY_INTERACTIVE) -> AdmissionTicket:
+        """排队等待放行，超过 queue_timeout 时抛出 asyncio.TimeoutError"""
+        loop = asyncio.get_running_loop()
+        ticket = AdmissionTicket(priority, next(self._seq), tokens, loop.create_future())
+        self._waiters.append(ticket)
+        self._stats["peak_queue_depth"] = max(self._stats["peak_queue_depth"], len(self._waiters))
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(ticket.future, self.queue_timeout if self.queue_timeout > 0 else None)
+        except BaseException as e:
+            if ticket in self._waiters:
+                self._waiters.remove(ticket)
+            elif ticket.future.done() and not ticket.future.cancelled():
+                # 刚被放行调用方就放弃了，归还名额
+                self.release(ticket)
+            if isinstance(e, asyncio.TimeoutError):
+                self._stats["timeouts"] += 1
+            raise
+
+        waited = time.monotonic() - ticket.enqueued_at
+        self._stats["admitted"] += 1
+        self._stats["wait_time_total"] += waited
+        self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+        return ticket
+
+    def release(self, ticket: AdmissionTicket):
+        """请求结束，归还并发名额并退回没有用掉的tokens"""
+        self._active -= 1
+        if self._token_bucket is not None and ticket.used_tokens is not None and ticket.used_tokens < ticket.tokens:
+            self._token_bucket.refund(ticket.tokens - ticket.used_tokens)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def admit(self, tokens: int = 0, priority: int = PRIORITY_INTERACTIVE) -> AsyncIterator[AdmissionTicket]:
+        """在准入控制下执行一次请求"""
+        ticket = await self.acquire(tokens, priority)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取排队和限流统计"""
+        stats = dict(self._stats)
+        stats.update({
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": len(self._waiters),
+            "avg_wait_time": stats["wait_time_total"] / stats["admitted"] if stats["admitted"] else 0.0,
+            "requests_per_minute": self._request_bucket.capacity if self._request_bucket else 0,
+            "tokens_per_minute": self._token_bucket.capacity if self._token_bucket else 0
+        })
+        return stats
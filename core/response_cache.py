@@ -0,0 +1,180 @@
+"""
+专家回复缓存
+对没有对话上下文的相同问题复用已生成的回复，减少重复的大模型调用
+"""
+
+import hashlib
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from core.llm_client import ERROR_MESSAGES
+from utils.text_replay import replay_text
+
+# 归一化时去掉的空白和标点（含全角标点）
+_NORMALIZE_PATTERN = re.compile(r'[\s\u3000-\u303f\uff00-\uff0f\uff1a-\uff20\uff3b-\uff40\uff5b-\uff65!-/:-@\[-`{-~]+')
+
+
+def normalize_query(query: str) -> str:
+    """归一化问题文本：去掉空白和标点，英文转小写"""
+    return _NORMALIZE_PATTERN.sub("", query or "").lower()
+
+
+class ResponseCache:
+    """专家回复缓存
+
+    以 (智能体类型, 归一化问题, 检索到的背景知识, 调用方式) 的哈希为键。
+    内存中是带过期时间的LRU，磁盘上用SQLite保存，重启后仍然有效。
+    带有对话历史的请求不走缓存，失败提示语不会被缓存。
+    """
+
+    def __init__(self, enabled: bool = False, max_entries: int = 512, ttl_seconds: float = 86400,
+                 db_path: str = "response_cache.db", replay_chunk_size: int = 8):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.replay_chunk_size = max(1, replay_chunk_size)
+
+        # 键 -> (过期时间, 回复文本)
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "bypassed": 0}
+        self._db = None
+        if enabled:
+            from core.db_executor import create_db_executor
+            self._db = create_db_executor(db_path)
+            self._db.run_sync(self._init_database)
+
+    def _init_database(self, conn: sqlite3.Connection):
+        """创建磁盘缓存表"""
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    key TEXT PRIMARY KEY,
+                    agent_type TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_response_cache_expires ON response_cache (expires_at)")
+
+    def key_for(self, agent_type: str, query: str, knowledge: str = "",
+                history: Optional[List[Dict[str, str]]] = None, mode: str = "stream",
+                max_tokens: Optional[int] = None) -> Optional[str]:
+        """生成缓存键；未启用缓存或请求带有对话历史时返回 None"""
+        if not self.enabled:
+            return None
+        if history:
+            self._stats["bypassed"] += 1
+            return None
+        raw = "\x00".join([agent_type, mode, str(max_tokens or ""), normalize_query(query), knowledge or ""])
+        return f"{agent_type}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+    async def get(self, key: Optional[str]) -> Optional[str]:
+        """读取缓存，内存未命中时查询磁盘"""
+        if key is None:
+            return None
+
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._stats["hits"] += 1
+                self._entries.move_to_end(key)
+                return entry[1]
+            del self._entries[key]
+
+        row = await self._db.run(self._load, key, now) if self._db is not None else None
+        if row is None:
+            self._stats["misses"] += 1
+            return None
+
+        self._stats["hits"] += 1
+        self._stats["disk_hits"] += 1
+        self._put_memory(key, row[1], row[0])
+        return row[1]
+
+    async def put(self, key: Optional[str], response: str):
+        """写入缓存（空回复和失败提示语不缓存）"""
+        if key is None or not self.is_cacheable(response):
+            return
+
+        expires_at = time.time() + self.ttl_seconds
+        self._put_memory(key, response, expires_at)
+        self._stats["stores"] += 1
+        if self._db is not None:
+            await self._db.run(self._store, key, key.split(":", 1)[0], response, expires_at)
+
+    @staticmethod
+    def is_cacheable(response: str) -> bool:
+        """判断回复是否可以缓存"""
+        if not response or not response.strip():
+            return False
+        return not any(message in response for message in ERROR_MESSAGES)
+
+    async def replay(self, response: str) -> AsyncIterator[str]:
+        """把缓存的回复按固定长度分片输出，与实时生成时的流式片段一致"""
+        async for frame in replay_text(response, frame_size=self.replay_chunk_size, by_sentence=False):
+            yield frame
+
+    def _put_memory(self, key: str, response: str, expires_at: float):
+        self._entries[key] = (expires_at, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _load(conn: sqlite3.Connection, key: str, now: float) -> Optional[Tuple[float, str]]:
+        row = conn.execute(
+            "SELECT expires_at, response FROM response_cache WHERE key = ? AND expires_at > ?",
+            (key, now)
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    @staticmethod
+    def _store(conn: sqlite3.Connection, key: str, agent_type: str, response: str, expires_at: float):
+        with conn:
+            conn.execute("""
+                INSERT INTO response_cache (key, agent_type, response, expires_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    response = excluded.response,
+                    expires_at = excluded.expires_at
+            """, (key, agent_type, response, expires_at))
+            # 顺带清理已过期的条目
+            conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (time.time(),))
+
+    def close(self):
+        """关闭磁盘缓存"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取命中统计"""
+        stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["entries"] = len(self._entries)
+        stats["enabled"] = self.enabled
+        return stats
+
+
+# 全局回复缓存实例
+_response_cache = None
+
+def get_response_cache() -> ResponseCache:
+    """获取专家回复缓存实例"""
+    global _response_cache
+    if _response_cache is None:
+        from config import Config
+        _response_cache = ResponseCache(
+            enabled=Config.RESPONSE_CACHE_ENABLED,
+            max_entries=Config.RESPONSE_CACHE_MAX_ENTRIES,
+            ttl_seconds=Config.RESPONSE_CACHE_TTL_SECONDS,
+            db_path=Config.RESPONSE_CACHE_DB_PATH,
+            replay_chunk_size=Config.RESPONSE_CACHE_REPLAY_CHUNK
+        )
+    return _response_cache
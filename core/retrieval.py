@@ -0,0 +1,109 @@
+"""
+知识检索服务
+专家按 (问题, 领域, 条数, token预算) 从知识库检索背景知识：每次只查询一次全文索引，
+按相关度取前几条并在预算内拼接，结果按知识库版本缓存
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.knowledge_base import KnowledgeBase, get_knowledge_base
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算tokens（按每个字符一个token，与LLM客户端的准入估算一致）"""
+    return len(text)
+
+
+def pack_passages(passages: List[Dict[str, Any]], token_budget: int) -> List[Dict[str, Any]]:
+    """按排名依次放入预算；第一条就超出预算时截断，之后放不下的跳过"""
+    packed = []
+    remaining = token_budget
+    for passage in passages:
+        cost = estimate_tokens(passage["content"])
+        if cost <= remaining:
+            packed.append(passage)
+            remaining -= cost
+        elif not packed and remaining > 0:
+            packed.append({**passage, "content": passage["content"][:remaining]})
+            break
+    return packed
+
+
+class RetrievalService:
+    """知识检索服务
+
+    以 (知识库版本, 领域, 条数, 预算, 问题) 为键缓存检索结果；
+    知识库内容变化时版本号递增，旧的缓存结果自然失效。
+    """
+
+    def __init__(self, knowledge_base: KnowledgeBase, top_k: int = 3, token_budget: int = 300,
+                 max_entries: int = 512):
+        self.knowledge_base = knowledge_base
+        self.top_k = top_k
+        self.token_budget = token_budget
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, Optional[str], int, int, str], List[Dict[str, Any]]]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "empty": 0}
+
+    async def retrieve(self, query: str, domain: Optional[str] = None, k: Optional[int] = None,
+                       token_budget: Optional[int] = None) -> List[Dict[str, Any]]:
+        """检索与问题相关的知识条目，按相关度排序并在token预算内截取"""
+        k = k or self.top_k
+        token_budget = token_budget or self.token_budget
+        query = query.strip()
+        if not query:
+            return []
+
+        key = (self.knowledge_base.version, domain, k, token_budget, query)
+        passages = self._entries.get(key)
+        if passages is not None:
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return passages
+
+        self._stats["misses"] += 1
+        results = await self.knowledge_base.search_knowledge(query, category=domain, limit=k)
+        passages = pack_passages(results, token_budget)
+        if not passages:
+            self._stats["empty"] += 1
+
+        if self.max_entries > 0:
+            self._entries[key] = passages
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return passages
+
+    async def retrieve_text(self, query: str, domain: Optional[str] = None, k: Optional[int] = None,
+                            token_budget: Optional[int] = None) -> str:
+        """检索并拼接为背景知识文本，没有命中时返回空字符串"""
+        passages = await self.retrieve(query, domain, k, token_budget)
+        return "\n".join(passage["content"] for passage in passages)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取检索缓存统计"""
+        stats = dict(self._stats)
+        stats.update({
+            "entries": len(self._entries),
+            "top_k": self.top_k,
+            "token_budget": self.token_budget,
+            "knowledge_version": self.knowledge_base.version
+        })
+        return stats
+
+
+# 全局检索服务实例
+_retrieval_service = None
+
+def get_retrieval_service() -> RetrievalService:
+    """获取知识检索服务实例"""
+    global _retrieval_service
+    if _retrieval_service is None:
+        from config import Config
+        _retrieval_service = RetrievalService(
+            get_knowledge_base(),
+            top_k=Config.RETRIEVAL_TOP_K,
+            token_budget=Config.RETRIEVAL_TOKEN_BUDGET,
+            max_entries=Config.RETRIEVAL_CACHE_MAX_ENTRIES
+        )
+    return _retrieval_service
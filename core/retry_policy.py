@@ -0,0 +1,58 @@
+"""
+上游请求重试策略
+指数退避加随机抖动，优先遵守服务端的 Retry-After，并且不超过单次请求的总时限
+"""
+
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 响应头（秒数或HTTP日期），返回需要等待的秒数"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class RetryPolicy:
+    """重试策略
+
+    第 n 次重试（从0开始）前等待 [0, min(max_delay, base_delay * 2^n)] 之间的随机时长
+    （full jitter），服务端给出 Retry-After 时至少等待该时长；
+    重试次数用完或等待后会超过总时限时不再重试。
+    """
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5,
+                 max_delay: float = 8.0, deadline: float = 120.0):
+        self.max_retries = max(0, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次重试前的退避时长"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def next_delay(self, attempt: int, remaining: float, retry_after: Optional[float] = None) -> Optional[float]:
+        """返回下次重试前的等待秒数，不应再重试时返回 None
+
+        attempt 为已经重试的次数，remaining 为距离总时限的剩余秒数。
+        """
+        if attempt >= self.max_retries:
+            return None
+        delay = self.backoff(attempt)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        if delay >= remaining:
+            return None
+        return delay
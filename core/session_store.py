@@ -0,0 +1,141 @@
+"""
+会话记忆存储
+按会话隔离各专家的对话历史，内存中只保留最近活跃的会话
+"""
+
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+
+
+def resolve_session_id(data: Dict[str, Any], default: Optional[str] = None) -> str:
+    """请求的会话ID：依次使用 session_id、user_id、default，都没有时生成一个新的
+
+    接口层用它保证每轮对话都有会话ID，生成的ID随响应返回，客户端带上后可以延续同一会话。
+    """
+    return data.get("session_id") or data.get("user_id") or default or uuid.uuid4().hex
+
+
+class SessionHistoryStore:
+    """会话级对话历史存储
+
+    以 (session_id, agent_type) 为键，使用带过期时间的LRU缓存保存最近的对话轮次；
+    新的对话轮次交给 ConversationManager 延迟批量写入，
+    缓存未命中的会话从 ConversationManager 读取持久化的历史记录。
+    session_id 为空的对话既不缓存也不持久化，接口层通过 resolve_session_id() 保证请求都带有会话ID。
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: float = 1800,
+                 max_turns: int = 5, conversation_manager=None):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self.conversation_manager = conversation_manager
+
+        # 键 -> (最近访问时间, 消息列表)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, List[Dict[str, str]]]]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def attach_conversation_manager(self, conversation_manager):
+        """设置冷会话的持久化历史来源"""
+        self.conversation_manager = conversation_manager
+
+    async def get_history(self, session_id: Optional[str], agent_type: str) -> List[Dict[str, str]]:
+        """获取会话中某个专家的对话历史（按时间正序的消息列表）"""
+        if not session_id:
+            return []
+
+        key = (session_id, agent_type)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and now - entry[0] <= self.ttl_seconds:
+            self._stats["hits"] += 1
+            self._entries[key] = (now, entry[1])
+            self._entries.move_to_end(key)
+            return list(entry[1])
+
+        self._stats["misses"] += 1
+        messages = await self._load_persisted(session_id, agent_type)
+        self._put(key, messages, now)
+        return list(messages)
+
+    async def append(self, session_id: Optional[str], agent_type: str,
+                     user_message: str, assistant_message: str):
+        """追加一轮对话，并交给 ConversationManager 持久化（session_id 为空时不保存）"""
+        if not session_id:
+            return
+
+        if self.conversation_manager is not None:
+            self.conversation_manager.enqueue_conversation(
+                session_id, user_message, assistant_message, agent_type
+            )
+
+        key = (session_id, agent_type)
+        entry = self._entries.get(key)
+        if entry is None:
+            messages = await self._load_persisted(session_id, agent_type)
+        else:
+            messages = entry[1]
+
+        messages = messages + [
+            {"role": "user", "content": user_message},
+            {"role": "assistant", "content": assistant_message}
+        ]
+        self._put(key, messages[-self.max_turns * 2:], time.monotonic())
+
+    def clear(self, session_id: str):
+        """清除会话在内存中的全部历史"""
+        for key in [key for key in self._entries if key[0] == session_id]:
+            del self._entries[key]
+
+    def _put(self, key: Tuple[str, str], messages: List[Dict[str, str]], now: float):
+        """写入缓存并淘汰过期或超出容量的会话"""
+        self._entries[key] = (now, messages)
+        self._entries.move_to_end(key)
+
+        # 最久未访问的会话在最前面，过期的先淘汰
+        while self._entries:
+            oldest_key, (last_access, _) = next(iter(self._entries.items()))
+            if len(self._entries) > self.max_sessions or now - last_access > self.ttl_seconds:
+                del self._entries[oldest_key]
+                self._stats["evictions"] += 1
+            else:
+                break
+
+    async def _load_persisted(self, session_id: str, agent_type: str) -> List[Dict[str, str]]:
+        """从对话记录中恢复冷会话的历史"""
+        if self.conversation_manager is None:
+            return []
+
+        records = await self.conversation_manager.get_conversation_history(
+            session_id, limit=self.max_turns, agent_type=agent_type
+        )
+
+        messages = []
+        for record in reversed(records):  # 记录按时间倒序返回
+            messages.append({"role": "user", "content": record["user_message"]})
+            messages.append({"role": "assistant", "content": record["agent_response"]})
+        return messages
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计"""
+        stats = dict(self._stats)
+        stats["sessions"] = len(self._entries)
+        return stats
+
+
+# 全局会话存储实例
+_session_store = None
+
+def get_session_store() -> SessionHistoryStore:
+    """获取会话历史存储实例"""
+    global _session_store
+    if _session_store is None:
+        from config import Config
+        _session_store = SessionHistoryStore(
+            max_sessions=Config.SESSION_MAX_ENTRIES,
+            ttl_seconds=Config.SESSION_TTL_SECONDS,
+            max_turns=Config.SESSION_MAX_TURNS
+        )
+    return _session_store
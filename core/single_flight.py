@@ -0,0 +1,120 @@
+"""
+相同请求合并（single-flight）
+并发的相同请求只向上游发出一次，生成的内容广播给所有订阅者，晚加入的订阅者先收到已生成的部分
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def request_fingerprint(model: Optional[str], messages: List[Dict[str, str]],
+                        temperature: float, max_tokens: int, stream: bool) -> str:
+    """请求指纹：模型、消息、温度、最大长度和调用方式都相同才视为同一请求"""
+    raw = json.dumps([model, messages, temperature, max_tokens, stream],
+                     ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    """一个正在进行的上游请求及其已生成的内容"""
+
+    __slots__ = ("chunks", "done", "error", "subscribers", "task", "_changed")
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def notify(self):
+        """唤醒所有等待新内容的订阅者"""
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait(self):
+        await self._changed.wait()
+
+
+class SingleFlight:
+    """相同请求合并
+
+    stream(key, start) 在没有相同 key 的请求进行中时调用 start() 发出上游请求，
+    否则订阅已有的请求。上游输出先追加到广播缓冲区，每个订阅者按自己的进度读取，
+    因此晚加入的订阅者会先收到已生成的前缀。上游出错时所有订阅者都收到同一个异常；
+    所有订阅者都离开（如客户端断开）时取消上游请求。
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._flights: Dict[str, _Flight] = {}
+        self._stats = {"flights": 0, "coalesced": 0, "cancelled": 0}
+
+    async def stream(self, key: str, start: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """发出或加入请求，逐个产出内容片段"""
+        if not self.enabled:
+            async for chunk in start():
+                yield chunk
+            return
+
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._run(key, flight, start()))
+            self._stats["flights"] += 1
+        else:
+            self._stats["coalesced"] += 1
+
+        flight.subscribers += 1
+        index = 0
+        try:
+            while True:
+                while index < len(flight.chunks):
+                    yield flight.chunks[index]
+                    index += 1
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await flight.wait()
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # 没有订阅者了，取消上游请求；之后的相同请求重新发起
+                self._stats["cancelled"] += 1
+                flight.task.cancel()
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+    async def _run(self, key: str, flight: _Flight, stream: AsyncIterator[str]):
+        """消费上游输出并写入广播缓冲区"""
+        try:
+            async for chunk in stream:
+                flight.chunks.append(chunk)
+                flight.notify()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            flight.notify()
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取请求合并统计"""
+        stats = dict(self._stats)
+        stats.update({
+            "enabled": self.enabled,
+            "in_flight": len(self._flights),
+            "subscribers": sum(flight.subscribers for flight in self._flights.values())
+        })
+        return stats
@@ -0,0 +1,81 @@
+"""
+SSE（Server-Sent Events）增量解码器
+按字节缓存未完整的行，逐行解码，不会在多字节的中文字符中间截断，也不会反复拼接整个缓冲区
+"""
+
+from typing import AsyncIterator, List
+
+
+class SSEDecoder:
+    """增量SSE解码器
+
+    feed() 接收任意切分的字节块，返回其中已经完整的事件的 data 内容
+    （同一事件的多行 data 以换行连接）。事件以空行结束，行以 \\n 或 \\r\\n 结尾；
+    注释行和 data 以外的字段被忽略。
+
+    未完整的行以字节形式留在缓冲区，收到换行符后才解码；换行符（0x0A）不会出现在
+    多字节UTF-8字符内部，因此字符被切在两个字节块之间时也能正确解码。
+    """
+
+    __slots__ = ("_buffer", "_data")
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._data: List[str] = []
+
+    def feed(self, chunk: bytes) -> List[str]:
+        """输入一个字节块，返回完整事件的 data 列表"""
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            # 还没有完整的行，只缓存
+            self._buffer.extend(chunk)
+            return []
+
+        # 到最后一个换行符为止的数据都是完整的行，一次解码后切分；剩余部分留在缓冲区
+        view = memoryview(chunk)
+        if self._buffer:
+            self._buffer.extend(view[:end + 1])
+            text = self._buffer.decode("utf-8")
+            self._buffer.clear()
+        else:
+            text = str(view[:end + 1], "utf-8")
+        self._buffer.extend(view[end + 1:])
+
+        events: List[str] = []
+        lines = text.split("\n")
+        lines.pop()
+        for line in lines:
+            self._process_line(line, events)
+        return events
+
+    def flush(self) -> List[str]:
+        """流结束时处理剩余数据，返回最后一个没有以空行结束的事件"""
+        events: List[str] = []
+        if self._buffer:
+            self._process_line(self._buffer.decode("utf-8"), events)
+            self._buffer.clear()
+        if self._data:
+            events.append("\n".join(self._data))
+            self._data.clear()
+        return events
+
+    def _process_line(self, line: str, events: List[str]):
+        """解析一行（不含 \\n）：空行分发当前事件，data 字段追加到当前事件"""
+        if line.endswith("\r"):
+            line = line[:-1]
+        if not line:
+            if self._data:
+                events.append("\n".join(self._data))
+                self._data.clear()
+        elif line.startswith("data:"):
+            self._data.append(line[6:] if line[5:6] == " " else line[5:])
+
+
+async def iter_sse_data(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """从字节流中逐个产出SSE事件的 data 内容"""
+    decoder = SSEDecoder()
+    async for chunk in chunks:
+        for data in decoder.feed(chunk):
+            yield data
+    for data in decoder.flush():
+        yield data
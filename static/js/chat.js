@@ -75,6 +75,17 @@ class ChatInterface {
         return 'user_' + Math.random().toString(36).substr(2, 9);
     }
 
+    // 获取当前专家的会话ID（服务端按会话隔离对话记忆）
+    getSessionId(agentId, renew = false) {
+        const storageKey = `chat_session_${agentId}`;
+        let sessionId = renew ? null : sessionStorage.getItem(storageKey);
+        if (!sessionId) {
+            sessionId = 'session_' + Date.now().toString(36) + Math.random().toString(36).substr(2, 9);
+            sessionStorage.setItem(storageKey, sessionId);
+        }
+        return sessionId;
+    }
+
     // 选择专家
     selectAgent(agentId, element) {
         console.log('选择专家:', agentId);
@@ -291,6 +302,11 @@ class ChatInterface {
     // 流式发送消息
     async sendMessageStream(message) {
         let fullContent = '';
+        let hasReceivedContent = false;
+        let thinkingContainer = null;
+        let thinkingContent = null;
+        let typewriter = null;
+        const startTime = Date.now();
         
         try {
             const response = await this.sendToAgentStream(message);
@@ -312,8 +328,7 @@ class ChatInterface {
             } else {
                 // 专业模式：显示思考框
                 const agentInfo = this.getAgentInfo(this.currentAgent);
-                const thinkingContainer = document.createElement('div');
-                const startTime = Date.now();
+                thinkingContainer = document.createElement('div');
                 thinkingContainer.className = 'thinking-container';
                 thinkingContainer.innerHTML = `
                     <div class="thinking-header" onclick="this.parentElement.classList.toggle('expanded')">
@@ -330,6 +345,9 @@ class ChatInterface {
                 thinkingContent = thinkingContainer.querySelector('.thinking-content');
             }
             
+            // 服务端按句子或整段分帧发送，逐字显示的效果在前端完成
+            typewriter = this.createTypewriter(isCasualChat ? contentElement : thinkingContent);
+            
             // 读取流式响应
             const reader = response.body.getReader();
             const decoder = new TextDecoder();
@@ -354,8 +372,7 @@ class ChatInterface {
                                         // 移除加载动画
                                         contentElement.innerHTML = '';
                                     }
-                                    const textNode = document.createTextNode(data.content);
-                                    contentElement.appendChild(textNode);
+                                    typewriter.push(data.content);
                                     hasReceivedContent = true;
                                 } else {
                                     // 专业模式：在思考框中显示原始文本
@@ -364,7 +381,7 @@ class ChatInterface {
                                         thinkingContainer.classList.add('expanded');
                                         hasReceivedContent = true;
                                     }
-                                    thinkingContent.textContent = fullContent;
+                                    typewriter.push(data.content);
                                     
                                     // 更新思考时间
                                     const elapsed = ((Date.now() - startTime) / 1000).toFixed(1);
@@ -377,6 +394,7 @@ class ChatInterface {
                                 this.scrollToBottom();
                             } else if (data.type === 'done') {
                                 // 流式传输完成
+                                typewriter.stop();
                                 if (fullContent) {
                                     if (isCasualChat) {
                                         // 闲聊模式：流式传输完成后，重新渲染完整格式化内容
@@ -426,7 +444,8 @@ class ChatInterface {
             body: JSON.stringify({
                 agent_id: this.currentAgent,
                 message: message,
-                user_id: this.userId
+                user_id: this.userId,
+                session_id: this.getSessionId(this.currentAgent)
             })
         });
 
@@ -447,7 +466,8 @@ class ChatInterface {
             body: JSON.stringify({
                 agent_id: this.currentAgent,
                 message: message,
-                user_id: this.userId
+                user_id: this.userId,
+                session_id: this.getSessionId(this.currentAgent)
             })
         });
 
@@ -1006,6 +1026,40 @@ class ChatInterface {
         this.messageInput.style.height = Math.min(this.messageInput.scrollHeight, 200) + 'px';
     }
 
+    // 打字效果：收到的文本先进入队列，每帧显示一部分，积压越多显示越快
+    createTypewriter(element) {
+        let queue = '';
+        let running = false;
+        let stopped = false;
+        
+        const step = () => {
+            if (stopped || !queue) {
+                running = false;
+                return;
+            }
+            const count = Math.max(1, Math.ceil(queue.length / 20));
+            element.appendChild(document.createTextNode(queue.slice(0, count)));
+            queue = queue.slice(count);
+            this.scrollToBottom();
+            requestAnimationFrame(step);
+        };
+        
+        return {
+            push(text) {
+                if (stopped) return;
+                queue += text;
+                if (!running) {
+                    running = true;
+                    requestAnimationFrame(step);
+                }
+            },
+            stop() {
+                stopped = true;
+                queue = '';
+            }
+        };
+    }
+
     // 滚动到底部
     scrollToBottom() {
         setTimeout(() => {
@@ -1024,6 +1078,9 @@ class ChatInterface {
                 const storageKey = `chat_history_${this.currentAgent}`;
                 sessionStorage.removeItem(storageKey);
                 
+                // 开启新会话，服务端不再带入之前的对话记忆
+                this.getSessionId(this.currentAgent, true);
+                
                 // 显示当前专家的专属欢迎消息
                 const agentInfo = this.getAgentInfo(this.currentAgent);
                 this.addMessage('agent', agentInfo.welcome);
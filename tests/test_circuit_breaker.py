@@ -0,0 +1,81 @@
+"""
+熔断器测试：连续失败后打开，恢复时间后半开放行有限的探测请求，探测结果决定关闭或重新打开
+"""
+
+import pytest
+
+from core import circuit_breaker
+from core.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def open_breaker(**kwargs):
+    breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=30.0, **kwargs)
+    for _ in range(3):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, recovery_timeout=30.0)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # 成功清零连续失败次数
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert not breaker.is_available()
+    assert breaker.get_state()["rejected"] == 1
+
+
+def test_half_open_after_recovery_timeout(clock):
+    breaker = open_breaker()
+    clock[0] += 29.9
+    assert breaker.state == OPEN
+    clock[0] += 0.1
+    assert breaker.state == HALF_OPEN
+    assert breaker.is_available()
+
+
+def test_half_open_limits_probes(clock):
+    breaker = open_breaker(half_open_max_calls=2)
+    clock[0] += 30
+    assert breaker.allow_request()
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    assert not breaker.is_available()
+    # 被取消的探测只归还名额，不改变状态
+    breaker.release()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_half_open_probe_success_closes(clock):
+    breaker = open_breaker()
+    clock[0] += 30
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow_request() and breaker.allow_request()
+
+
+def test_half_open_probe_failure_reopens(clock):
+    breaker = open_breaker()
+    clock[0] += 30
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.get_state()["retry_in"] == 30.0
+    assert breaker.get_state()["opened"] == 2
+    clock[0] += 30
+    assert breaker.state == HALF_OPEN
@@ -0,0 +1,57 @@
+"""
+协同讨论预算规划测试
+"""
+
+from agents.guangfu_ambassador import (
+    INITIAL_RESPONSE_MAX_TOKENS, SUMMARY_MAX_TOKENS, GuangfuAmbassador
+)
+from config import Config
+
+OVERHEAD = INITIAL_RESPONSE_MAX_TOKENS + SUMMARY_MAX_TOKENS
+MIN_TOKENS = Config.COLLABORATION_MIN_EXPERT_TOKENS
+
+
+def plan(query, max_experts=3, max_total_tokens=4500):
+    return GuangfuAmbassador.plan_collaboration(None, query, max_experts, max_total_tokens)
+
+
+def test_zero_score_candidates_are_not_invited():
+    result = plan("粤剧的历史")
+    assert result["experts"] == ["cantonese_opera"]
+    assert result["skipped"] == []
+    assert result["expert_max_tokens"] == min(Config.MAX_TOKENS, 4500 - OVERHEAD)
+
+
+def test_default_lineup_when_no_expert_matched():
+    result = plan("介绍一下广府文化")
+    assert result["experts"] == ["cantonese_opera", "architecture", "culinary"]
+    assert all(item["reason"] == "max_experts" for item in result["skipped"])
+
+
+def test_budget_boundary():
+    query = "粤剧、骑楼和点心"
+    # 刚好够一位专家
+    result = plan(query, max_total_tokens=OVERHEAD + MIN_TOKENS)
+    assert result["experts"] == ["cantonese_opera"]
+    assert result["expert_max_tokens"] == MIN_TOKENS
+    assert result["planned_tokens"] == result["max_total_tokens"]
+    assert [item["reason"] for item in result["skipped"]] == ["token_budget", "token_budget"]
+
+    # 差一个token：不邀请专家，也不为专家预留token
+    result = plan(query, max_total_tokens=OVERHEAD + MIN_TOKENS - 1)
+    assert result["experts"] == []
+    assert result["expert_max_tokens"] == 0
+    assert result["planned_tokens"] <= result["max_total_tokens"]
+    assert len(result["skipped"]) == 3
+
+    # 预算比开场和总结还少
+    result = plan(query, max_total_tokens=100)
+    assert result["experts"] == []
+
+
+def test_planned_tokens_within_budget():
+    for total in range(OVERHEAD, 8000, 37):
+        result = plan("粤剧、骑楼、点心和广绣", max_experts=4, max_total_tokens=total)
+        if result["experts"]:
+            assert result["expert_max_tokens"] >= MIN_TOKENS
+            assert result["planned_tokens"] <= total
@@ -0,0 +1,103 @@
+"""
+对话记录延迟写入测试：批量写入、失败重试与放弃计数、关闭时写完剩余记录、删除会话时丢弃未写入的记录
+"""
+
+import asyncio
+import sqlite3
+
+from core.conversation_manager import ConversationManager
+
+
+def count_rows(db_path, session_id=None):
+    conn = sqlite3.connect(db_path)
+    try:
+        if session_id is None:
+            return conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+        return conn.execute("SELECT COUNT(*) FROM conversations WHERE session_id = ?", (session_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_batches_are_written_by_the_writer(tmp_path):
+    db_path = str(tmp_path / "conversations.db")
+
+    async def run():
+        manager = ConversationManager(db_path, flush_interval_ms=10, flush_batch_size=100)
+        for i in range(5):
+            manager.enqueue_conversation("s1", f"问{i}", f"答{i}", "culinary")
+        await asyncio.sleep(0.1)
+        history = await manager.get_conversation_history("s1", limit=10)
+        stats = manager.get_write_stats()
+        await manager.close()
+        return history, stats
+
+    history, stats = asyncio.run(run())
+    assert len(history) == 5
+    assert stats["written"] == 5 and stats["pending"] == 0 and stats["batches"] >= 1
+
+
+def test_failed_batch_is_retried_then_given_up(tmp_path):
+    db_path = str(tmp_path / "conversations.db")
+
+    async def run():
+        manager = ConversationManager(db_path, flush_max_retries=2)
+        original = manager._write_batch
+        failures = [3]
+
+        def flaky(conn, rows):
+            if failures[0] > 0:
+                failures[0] -= 1
+                raise sqlite3.OperationalError("database is locked")
+            return original(conn, rows)
+
+        manager._write_batch = flaky
+        manager.enqueue_conversation("s1", "问", "答", "culinary")
+        # 停掉后台写入任务，由测试逐次调用 flush()
+        manager._writer_task.cancel()
+        await asyncio.gather(manager._writer_task, return_exceptions=True)
+
+        results = [await manager.flush() for _ in range(3)]
+        given_up = manager.get_write_stats()
+
+        manager.enqueue_conversation("s1", "问2", "答2", "culinary")
+        ok = await manager.flush()
+        stats = manager.get_write_stats()
+        await manager.close()
+        return results, given_up, ok, stats
+
+    results, given_up, ok, stats = asyncio.run(run())
+    # 前两次失败放回队首重试，第三次失败超过重试次数才计为放弃
+    assert results == [False, False, False]
+    assert given_up["retried"] == 2 and given_up["failed"] == 1 and given_up["pending"] == 0
+    assert ok and stats["written"] == 1
+    assert count_rows(db_path) == 1
+
+
+def test_close_writes_pending_rows(tmp_path):
+    db_path = str(tmp_path / "conversations.db")
+
+    async def run():
+        manager = ConversationManager(db_path, flush_interval_ms=10000, flush_batch_size=100)
+        for i in range(3):
+            manager.enqueue_conversation("s1", f"问{i}", f"答{i}", "culinary")
+        await manager.close()
+
+    asyncio.run(run())
+    assert count_rows(db_path) == 3
+
+
+def test_delete_session_drops_pending_rows(tmp_path):
+    db_path = str(tmp_path / "conversations.db")
+
+    async def run():
+        manager = ConversationManager(db_path, flush_interval_ms=10000, flush_batch_size=100)
+        manager.enqueue_conversation("s1", "问", "答", "culinary")
+        await manager.flush()
+        manager.enqueue_conversation("s1", "问2", "答2", "culinary")
+        manager.enqueue_conversation("s2", "问", "答", "culinary")
+        assert await manager.delete_session("s1")
+        await manager.close()
+
+    asyncio.run(run())
+    assert count_rows(db_path, "s1") == 0
+    assert count_rows(db_path, "s2") == 1
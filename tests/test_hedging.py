@@ -0,0 +1,100 @@
+"""
+对冲请求测试：慢的主请求被对冲，主请求在对冲前失败时由路由依次切换后端，不占用对冲名额
+"""
+
+import asyncio
+
+import pytest
+
+from core.hedging import HedgePolicy, hedged_stream
+from core.llm_client import LLMConnectionError
+from core.provider_router import ProviderBackend, ProviderRouter
+
+
+def make_policy(max_ratio=1.0, delay=0.05):
+    policy = HedgePolicy(enabled=True, max_ratio=max_ratio, min_samples=1, min_delay=delay)
+    policy.record_ttft(delay)
+    return policy
+
+
+async def reply(text, delay=0.0, error=None):
+    await asyncio.sleep(delay)
+    if error is not None:
+        raise error
+    yield text
+
+
+async def collect(stream):
+    return [item async for item in stream]
+
+
+def test_slow_primary_is_hedged():
+    policy = make_policy()
+    result = asyncio.run(collect(hedged_stream(
+        lambda: reply("primary", delay=1.0), lambda: reply("hedge"), policy
+    )))
+    assert result == ["hedge"]
+    stats = policy.get_stats()
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+
+
+def test_hedge_respects_max_ratio():
+    policy = make_policy(max_ratio=0.0)
+    result = asyncio.run(collect(hedged_stream(
+        lambda: reply("primary", delay=0.1), lambda: reply("hedge"), policy
+    )))
+    assert result == ["primary"]
+    assert policy.get_stats()["hedged"] == 0 and policy.get_stats()["capped"] == 1
+
+
+def test_primary_failure_before_hedge_is_raised_without_hedging():
+    policy = make_policy(delay=1.0)
+    launched = []
+
+    def start_hedge():
+        launched.append(True)
+        return reply("hedge")
+
+    with pytest.raises(LLMConnectionError):
+        asyncio.run(collect(hedged_stream(
+            lambda: reply("", error=LLMConnectionError("down")), start_hedge, policy
+        )))
+    assert launched == []
+    assert policy.get_stats()["hedged"] == 0
+
+
+class FakeClient:
+    def __init__(self, text=None, error=None):
+        self.text = text
+        self.error = error
+        self.calls = 0
+
+    def is_available(self):
+        return True
+
+    def get_pool_stats(self):
+        return {}
+
+    async def chat_completion(self, **kwargs):
+        self.calls += 1
+        async for item in reply(self.text, error=self.error):
+            yield item
+
+
+def test_router_fails_over_sequentially_after_primary_error():
+    failing = FakeClient(error=LLMConnectionError("down"))
+    healthy = FakeClient(text="ok")
+    # 首选后端按得分加权随机选择，只给失败的后端权重使其固定为首选
+    backends = [
+        ProviderBackend("a", failing, "m", weight=1.0),
+        ProviderBackend("b", healthy, "m", weight=0.0),
+        ProviderBackend("c", FakeClient(text="unused"), "m", weight=0.0),
+    ]
+    policy = make_policy(delay=1.0)
+    router = ProviderRouter(backends, hedge_policy=policy)
+
+    result = asyncio.run(collect(router.chat_completion([{"role": "user", "content": "hi"}], stream=True, hedge=True)))
+    assert result == ["ok"]
+    assert failing.calls == 1 and healthy.calls == 1
+    assert backends[1].get_stats()["failovers"] == 1
+    assert policy.get_stats()["hedged"] == 0
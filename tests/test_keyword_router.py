@@ -0,0 +1,39 @@
+"""
+关键词路由的专家排序测试
+"""
+
+from utils.keyword_router import DEFAULT_EXPERT_ORDER, AhoCorasick, get_keyword_router
+
+
+def test_general_words_do_not_add_zero_score_experts():
+    router = get_keyword_router()
+    assert router.candidate_experts("粤剧的历史") == [("cantonese_opera", 3.0)]
+    assert router.candidate_experts("茶文化有什么讲究") == [("tea_culture", 3.0)]
+
+
+def test_ranking_by_score_then_default_order():
+    router = get_keyword_router()
+    # 粤剧 3.0 > 建筑 2.0；美食、小吃同属美食专家，得分累加
+    assert router.candidate_experts("粤剧和骑楼建筑") == [("architecture", 5.0), ("cantonese_opera", 3.0)]
+    assert router.candidate_experts("美食小吃和粤剧") == [("culinary", 4.0), ("cantonese_opera", 3.0)]
+    # 得分相同时按默认顺序
+    assert router.select_experts("园林里的戏曲", 2) == ["cantonese_opera", "architecture"]
+
+
+def test_no_domain_match_falls_back_to_default_order():
+    router = get_keyword_router()
+    for query in ["介绍一下广府文化", "今天天气怎么样", ""]:
+        assert router.candidate_experts(query) == [(expert, 0.0) for expert in DEFAULT_EXPERT_ORDER]
+    assert router.select_experts("广府的历史", 3) == DEFAULT_EXPERT_ORDER[:3]
+
+
+def test_keyword_counted_once_and_overlaps_matched():
+    router = get_keyword_router()
+    # 重复出现只计一次；“茶文化”内部的“文化”不影响专家得分
+    assert router.scores("粤剧粤剧粤剧")["expert:cantonese_opera"] == 3.0
+    assert {"茶文化", "文化"} <= router.matches("茶文化")
+
+
+def test_aho_corasick_overlapping_matches():
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+    assert sorted(automaton.iter_matches("ushers")) == [(3, "he"), (3, "she"), (5, "hers")]
@@ -0,0 +1,51 @@
+"""
+全文索引同步测试：其他连接直接读写 knowledge_items 时，不需要自定义函数，索引在检索前和重启时同步
+"""
+
+import asyncio
+import sqlite3
+
+from core.knowledge_base import KnowledgeBase
+
+
+def titles(kb, query):
+    return [item["title"] for item in asyncio.run(kb.search_knowledge(query, limit=5))]
+
+
+def test_external_writes_are_indexed(tmp_path):
+    db_path = str(tmp_path / "kb.db")
+    kb = KnowledgeBase(db_path)
+    assert kb.fts_enabled
+
+    # 普通连接没有注册任何函数，增删改都不应报错
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO knowledge_items (title, content, category, tags) VALUES ('醒狮', '醒狮采青', '测试', '')")
+    conn.commit()
+    assert titles(kb, "采青") == ["醒狮"]
+
+    conn.execute("UPDATE knowledge_items SET content = '麒麟舞' WHERE title = '醒狮'")
+    conn.commit()
+    assert titles(kb, "麒麟") == ["醒狮"]
+    assert titles(kb, "采青") == []
+
+    conn.execute("DELETE FROM knowledge_items WHERE title = '醒狮'")
+    conn.commit()
+    assert titles(kb, "麒麟") == []
+    kb.close()
+
+    # 关闭期间的写入在下次启动时同步
+    conn.execute("INSERT INTO knowledge_items (title, content, category, tags) VALUES ('龙舟', '扒龙舟趁景', '测试', '')")
+    conn.commit()
+    conn.close()
+    kb = KnowledgeBase(db_path)
+    assert titles(kb, "趁景") == ["龙舟"]
+    kb.close()
+
+
+def test_add_knowledge_updates_index(tmp_path):
+    kb = KnowledgeBase(str(tmp_path / "kb.db"))
+    asyncio.run(kb.add_knowledge("凉茶", "岭南凉茶清热", "测试"))
+    asyncio.run(kb.add_knowledge("凉茶", "廿四味", "测试"))
+    assert titles(kb, "廿四") == ["凉茶"]
+    assert titles(kb, "清热") == []
+    kb.close()
@@ -0,0 +1,32 @@
+"""
+MarkdownStreamCleaner 的切分无关性测试：任意切分片段的输出都与 _clean_markdown 一次处理整段文本相同
+"""
+
+import random
+
+from agents.guangfu_ambassador import GuangfuAmbassador, MarkdownStreamCleaner
+
+
+def clean_markdown(text: str) -> str:
+    return GuangfuAmbassador._clean_markdown(None, text)
+
+
+def clean_stream(parts):
+    cleaner = MarkdownStreamCleaner()
+    return "".join(cleaner.feed(part) for part in parts) + cleaner.flush()
+
+
+def test_known_split_points():
+    assert clean_stream(["-- ", " "]) == clean_markdown("--  ") == "-"
+    assert clean_stream(["_-", " _"]) == clean_markdown("_- _") == "__"
+    assert clean_stream(["~", "~~", "~"]) == clean_markdown("~~~~") == ""
+
+
+def test_split_invariance():
+    rng = random.Random(2024)
+    alphabet = "_~-+> *#`\n文a"
+    for _ in range(20000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 16)))
+        cuts = sorted(rng.sample(range(len(text) + 1), rng.randint(0, min(5, len(text) + 1))))
+        parts = [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+        assert clean_stream(parts) == clean_markdown(text), (text, parts)
@@ -0,0 +1,50 @@
+"""
+大模型服务路由测试：本地拒绝不计入后端错误率，后端故障照常计入
+"""
+
+import asyncio
+
+from core.llm_client import LLMCircuitOpenError, LLMConnectionError, LLMQueueTimeoutError
+from core.provider_router import ProviderBackend, ProviderRouter
+
+
+class FailingClient:
+    def __init__(self, error):
+        self.error = error
+
+    def is_available(self):
+        return True
+
+    async def chat_completion(self, **kwargs):
+        raise self.error
+        yield
+
+
+class OkClient(FailingClient):
+    async def chat_completion(self, **kwargs):
+        yield "ok"
+
+
+def run_once(error):
+    failing = ProviderBackend("a", FailingClient(error), "m", weight=1.0)
+    fallback = ProviderBackend("b", OkClient(None), "m", weight=0.0)
+    router = ProviderRouter([failing, fallback])
+
+    async def collect():
+        return [item async for item in router.chat_completion([{"role": "user", "content": "hi"}], stream=True)]
+
+    assert asyncio.run(collect()) == ["ok"]
+    return failing
+
+
+def test_local_rejections_do_not_raise_error_rate():
+    for error in (LLMCircuitOpenError("open"), LLMQueueTimeoutError("queue")):
+        backend = run_once(error)
+        assert backend.error_rate == 0.0
+        assert backend._stats["failures"] == 0
+
+
+def test_backend_failures_raise_error_rate():
+    backend = run_once(LLMConnectionError("reset"))
+    assert backend.error_rate > 0.0
+    assert backend._stats["failures"] == 1
@@ -0,0 +1,72 @@
+"""
+准入控制测试：并发上限、按优先级放行、排队超时和每分钟请求数限制
+"""
+
+import asyncio
+
+import pytest
+
+from core.rate_limiter import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, RateLimiter, TokenBucket
+
+
+def test_concurrency_limit_and_priority_order():
+    async def run():
+        limiter = RateLimiter(max_concurrency=1, aging_seconds=0)
+        order = []
+        first = await limiter.acquire()
+
+        async def request(name, priority):
+            async with limiter.admit(priority=priority):
+                order.append(name)
+
+        tasks = [
+            asyncio.create_task(request("background", PRIORITY_BACKGROUND)),
+            asyncio.create_task(request("interactive-1", PRIORITY_INTERACTIVE)),
+            asyncio.create_task(request("interactive-2", PRIORITY_INTERACTIVE)),
+        ]
+        await asyncio.sleep(0)
+        assert limiter.get_stats()["queue_depth"] == 3
+        limiter.release(first)
+        await asyncio.gather(*tasks)
+        return order, limiter.get_stats()
+
+    order, stats = asyncio.run(run())
+    assert order == ["interactive-1", "interactive-2", "background"]
+    assert stats["active"] == 0 and stats["admitted"] == 4
+
+
+def test_queue_timeout():
+    async def run():
+        limiter = RateLimiter(max_concurrency=1, queue_timeout=0.05)
+        await limiter.acquire()
+        with pytest.raises(asyncio.TimeoutError):
+            await limiter.acquire()
+        return limiter.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats["timeouts"] == 1 and stats["queue_depth"] == 0
+
+
+def test_requests_per_minute_throttles():
+    async def run():
+        limiter = RateLimiter(max_concurrency=10, requests_per_minute=2, queue_timeout=0.1)
+        async with limiter.admit():
+            pass
+        async with limiter.admit():
+            pass
+        # 第三个请求要等约30秒才有额度，在排队时限内拿不到
+        with pytest.raises(asyncio.TimeoutError):
+            await limiter.acquire()
+        return limiter.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats["admitted"] == 2 and stats["throttled"] >= 1
+
+
+def test_token_bucket_refund():
+    bucket = TokenBucket(per_minute=600)
+    now = bucket.updated
+    bucket.consume(600)
+    assert bucket.delay_for(60, now) == pytest.approx(6.0)
+    bucket.refund(100)
+    assert bucket.delay_for(60, now) == 0.0
@@ -0,0 +1,50 @@
+"""
+会话记忆测试：有会话ID的对话轮次交给 ConversationManager 持久化，接口层为缺少会话ID的请求生成ID
+"""
+
+import asyncio
+
+from core.session_store import SessionHistoryStore, resolve_session_id
+
+
+class FakeConversationManager:
+    def __init__(self):
+        self.enqueued = []
+
+    def enqueue_conversation(self, session_id, user_message, agent_response, agent_type):
+        self.enqueued.append((session_id, user_message, agent_response, agent_type))
+
+    async def get_conversation_history(self, session_id, limit=20, agent_type=None):
+        return []
+
+
+def test_resolve_session_id():
+    assert resolve_session_id({"session_id": "s1", "user_id": "u1"}) == "s1"
+    assert resolve_session_id({"user_id": "u1"}) == "u1"
+    assert resolve_session_id({}, "connection") == "connection"
+    generated = resolve_session_id({"session_id": ""})
+    assert generated and generated != resolve_session_id({})
+
+
+def test_turns_with_session_id_are_persisted():
+    manager = FakeConversationManager()
+    store = SessionHistoryStore(max_sessions=1, conversation_manager=manager)
+
+    async def run():
+        await store.append("s1", "culinary", "问", "答")
+        # 容量为1，s1 被淘汰后仍可从持久化记录恢复
+        await store.append("s2", "culinary", "问2", "答2")
+        return await store.get_history("s2", "culinary")
+
+    history = asyncio.run(run())
+    assert manager.enqueued == [("s1", "问", "答", "culinary"), ("s2", "问2", "答2", "culinary")]
+    assert history[-1] == {"role": "assistant", "content": "答2"}
+    assert store.get_stats()["evictions"] == 1
+
+
+def test_turns_without_session_id_are_not_saved():
+    manager = FakeConversationManager()
+    store = SessionHistoryStore(conversation_manager=manager)
+    asyncio.run(store.append(None, "culinary", "问", "答"))
+    assert manager.enqueued == []
+    assert asyncio.run(store.get_history(None, "culinary")) == []
@@ -0,0 +1,106 @@
+"""
+相同请求合并测试：并发的相同请求只发一次上游请求，晚加入的订阅者先收到已生成的部分
+"""
+
+import asyncio
+
+import pytest
+
+from core.single_flight import SingleFlight, request_fingerprint
+
+
+def test_fingerprint():
+    messages = [{"role": "user", "content": "粤剧"}]
+    key = request_fingerprint("m", messages, 0.7, 100, True)
+    assert key == request_fingerprint("m", [dict(messages[0])], 0.7, 100, True)
+    assert key != request_fingerprint("m", messages, 0.7, 100, False)
+    assert key != request_fingerprint("m", messages, 0.8, 100, True)
+
+
+def test_concurrent_requests_share_one_upstream():
+    async def run():
+        flights = SingleFlight()
+        calls = []
+        release = asyncio.Event()
+
+        async def upstream():
+            calls.append(1)
+            yield "a"
+            await release.wait()
+            yield "b"
+
+        async def collect():
+            return [chunk async for chunk in flights.stream("k", upstream)]
+
+        first = asyncio.create_task(collect())
+        await asyncio.sleep(0.01)
+        # 晚加入的订阅者：上游已经产出了 "a"
+        second = asyncio.create_task(collect())
+        await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(first, second)
+        return calls, results, flights.get_stats()
+
+    calls, results, stats = asyncio.run(run())
+    assert calls == [1]
+    assert results == [["a", "b"], ["a", "b"]]
+    assert stats["flights"] == 1 and stats["coalesced"] == 1 and stats["in_flight"] == 0
+
+
+def test_error_reaches_every_subscriber():
+    async def run():
+        flights = SingleFlight()
+
+        async def upstream():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream failed")
+            yield
+
+        async def collect():
+            return [chunk async for chunk in flights.stream("k", upstream)]
+
+        return await asyncio.gather(collect(), collect(), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_upstream_cancelled_when_all_subscribers_leave():
+    async def run():
+        flights = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def upstream():
+            try:
+                yield "a"
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        stream = flights.stream("k", upstream)
+        assert await stream.__anext__() == "a"
+        await stream.aclose()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        return flights.get_stats()
+
+    stats = asyncio.run(run())
+    assert stats["cancelled"] == 1 and stats["in_flight"] == 0
+
+
+def test_disabled_does_not_coalesce():
+    async def run():
+        flights = SingleFlight(enabled=False)
+        calls = []
+
+        async def upstream():
+            calls.append(1)
+            yield "a"
+
+        async def collect():
+            return [chunk async for chunk in flights.stream("k", upstream)]
+
+        await asyncio.gather(collect(), collect())
+        return calls
+
+    assert asyncio.run(run()) == [1, 1]
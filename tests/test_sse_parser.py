@@ -0,0 +1,59 @@
+"""
+SSE解码器测试：字节流任意切分（包括切在多字节中文字符中间）时解码结果不变
+"""
+
+import asyncio
+import random
+
+from core.sse_parser import SSEDecoder, iter_sse_data
+
+RAW = (
+    "data: 你好\r\n\r\n"
+    ": 注释行\n"
+    "data:a\n"
+    "data: b\n"
+    "\n"
+    "event: message\n"
+    "id: 7\n"
+    "data: 粤剧 {\"delta\": \"唱腔\"}\n"
+    "\n"
+    "data: [DONE]\n\n"
+    "data: 没有空行结尾"
+).encode("utf-8")
+
+EXPECTED = ["你好", "a\nb", "粤剧 {\"delta\": \"唱腔\"}", "[DONE]", "没有空行结尾"]
+
+
+def decode(chunks):
+    decoder = SSEDecoder()
+    events = []
+    for chunk in chunks:
+        events.extend(decoder.feed(chunk))
+    return events + decoder.flush()
+
+
+def test_decode_whole_stream():
+    assert decode([RAW]) == EXPECTED
+
+
+def test_split_invariance():
+    rng = random.Random(2024)
+    for _ in range(5000):
+        cuts = sorted(rng.sample(range(1, len(RAW)), rng.randint(0, 12)))
+        chunks = [RAW[i:j] for i, j in zip([0] + cuts, cuts + [len(RAW)])]
+        assert decode(chunks) == EXPECTED, chunks
+
+
+def test_byte_by_byte():
+    assert decode([RAW[i:i + 1] for i in range(len(RAW))]) == EXPECTED
+
+
+def test_iter_sse_data():
+    async def chunks():
+        for i in range(0, len(RAW), 5):
+            yield RAW[i:i + 5]
+
+    async def collect():
+        return [data async for data in iter_sse_data(chunks())]
+
+    assert asyncio.run(collect()) == EXPECTED
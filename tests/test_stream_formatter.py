@@ -0,0 +1,48 @@
+"""
+增量格式化测试：排版结果与片段的切分方式无关，且与一次输入整段文本相同
+"""
+
+import random
+
+from utils.stream_formatter import IncrementalFormatter, StreamFormatters
+
+
+def format_whole(text):
+    formatter = IncrementalFormatter()
+    return formatter.feed(text) + formatter.flush()
+
+
+def format_parts(parts):
+    formatter = IncrementalFormatter()
+    return "".join(formatter.feed(part) for part in parts) + formatter.flush()
+
+
+def test_format_rules():
+    text = "# 标题\n**粗体** 和 *斜体* `代码`\n- 列表\n1. 第一步\n注意：小心...\n上午：喝茶---"
+    assert format_whole(text) == (
+        "■ 标题\n【粗体】 和 《斜体》 「代码」\n• 列表\n📋 步骤1：第一步\n⚠️ 注意：小心…\n🕐 上午：喝茶——"
+    )
+
+
+def test_unclosed_emphasis_is_kept_as_text():
+    assert format_whole("**没有闭合\n下一行") == "没有闭合\n下一行"
+
+
+def test_split_invariance():
+    rng = random.Random(7)
+    pieces = ["*", "**", "`", "-", "---", ".", "...", "注意：", "提示:", "重要", "# ", "## ", "> ",
+              "- ", "* ", "1. ", "12.", "上午：", "晚上", "\n", "文字", "a", " "]
+    for _ in range(20000):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 10)))
+        cuts = sorted(rng.sample(range(len(text) + 1), rng.randint(0, min(6, len(text) + 1))))
+        parts = [text[i:j] for i, j in zip([0] + cuts, cuts + [len(text)])]
+        assert format_parts(parts) == format_whole(text), (text, parts)
+
+
+def test_stream_formatters_keep_speakers_apart():
+    formatters = StreamFormatters("text")
+    outputs = [formatters.feed("a", "**粗"), formatters.feed("b", "- 列表"),
+               formatters.feed("a", "体**"), formatters.flush("a"), formatters.flush("b")]
+    # 发言人 a 未闭合的粗体不影响 b 的行首列表
+    assert outputs == ["", "• 列表", "", "【粗体】", ""]
+    assert StreamFormatters("raw").feed("a", "**原样**") == "**原样**"
@@ -0,0 +1,59 @@
+"""
+流式响应断线保护测试：有界队列把慢客户端的背压传递到上游
+"""
+
+import asyncio
+
+from utils.stream_guard import StreamGuard
+
+
+class FakeRequest:
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self):
+        return self.disconnected
+
+
+def test_slow_client_applies_backpressure():
+    async def run():
+        produced = 0
+
+        async def upstream():
+            nonlocal produced
+            for i in range(100):
+                produced += 1
+                yield i
+
+        guard = StreamGuard(poll_interval=0.01, queue_size=4)
+        received = []
+        async for item in guard.guard(FakeRequest(), upstream()):
+            received.append(item)
+            # 上游最多领先：队列容量 + 正在等待放入的一段
+            assert produced - len(received) <= 5
+            await asyncio.sleep(0.001)
+        return received
+
+    assert asyncio.run(run()) == list(range(100))
+
+
+def test_disconnect_cancels_upstream_with_full_queue():
+    async def run():
+        async def upstream():
+            i = 0
+            while True:
+                i += 1
+                yield i
+
+        guard = StreamGuard(poll_interval=0.01, queue_size=2)
+        request = FakeRequest()
+        count = 0
+        async for _ in guard.guard(request, upstream()):
+            count += 1
+            if count == 3:
+                request.disconnected = True
+            await asyncio.sleep(0.01)
+        return guard.get_stats()
+
+    stats = asyncio.run(asyncio.wait_for(run(), 5))
+    assert stats["cancelled"] == 1 and stats["active"] == 0
@@ -4,38 +4,16 @@
 """
 
 import re
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from utils.keyword_router import get_keyword_router
 
 class ConversationContextAnalyzer:
     """对话情境分析器"""
     
     def __init__(self):
-        # 闲聊关键词和模式
-        self.casual_patterns = {
-            'greetings': ['你好', '您好', '嗨', '哈喽', '早上好', '下午好', '晚上好', '晚安'],
-            'simple_questions': ['怎么样', '如何', '好吗', '是吗', '对吧', '呢'],
-            'emotions': ['哈哈', '嘿嘿', '呵呵', '哇', '哎呀', '真的', '太好了', '不错'],
-            'casual_responses': ['嗯嗯', '是啊', '对对', '好的', '明白', '知道了', '谢谢'],
-            'simple_praise': ['厉害', '棒', '好', '不错', '赞', '牛', '强'],
-            'personal_sharing': ['我觉得', '我认为', '我想', '我喜欢', '我也是']
-        }
-        
-        # 专业询问关键词和模式
-        self.professional_patterns = {
-            'detailed_inquiry': ['详细', '具体', '怎么做', '如何制作', '步骤', '方法', '技巧', '要点'],
-            'knowledge_seeking': ['介绍', '讲解', '说说', '告诉我', '解释', '什么是', '为什么'],
-            'comparison': ['比较', '区别', '不同', '相比', '对比', '哪个好', '推荐'],
-            'history_culture': ['历史', '由来', '起源', '发展', '传统', '文化', '背景', '意义'],
-            'technical_terms': ['工艺', '技法', '材料', '结构', '特色', '特点', '原理']
-        }
-        
-        # 各专家领域的专业关键词
-        self.expert_keywords = {
-            'culinary': ['制作', '食材', '烹饪', '菜谱', '配料', '调味', '火候', '刀工'],
-            'cantonese_opera': ['唱腔', '表演', '剧目', '行当', '脸谱', '身段', '念白', '做工'],
-            'architecture': ['建筑', '结构', '材料', '工艺', '设计', '布局', '装饰', '风格'],
-            'festival': ['习俗', '仪式', '庆典', '活动', '寓意', '传说', '节日', '民俗']
-        }
+        # 闲聊、专业询问和各专家领域的关键词及权重统一登记在关键词注册表中
+        self.router = get_keyword_router()
     
     def analyze_context(self, user_input: str, expert_type: str = None) -> Dict[str, any]:
         """
@@ -50,12 +28,15 @@ class ConversationContextAnalyzer:
         """
         user_input = user_input.strip()
         
+        # 一次扫描得到全部关键词得分
+        keyword_scores = self.router.scores(user_input)
+        
         # 基础分析
         analysis = {
             'input_length': len(user_input),
             'is_question': self._is_question(user_input),
-            'casual_score': self._calculate_casual_score(user_input),
-            'professional_score': self._calculate_professional_score(user_input, expert_type),
+            'casual_score': self._calculate_casual_score(user_input, keyword_scores),
+            'professional_score': self._calculate_professional_score(user_input, expert_type, keyword_scores),
             'context_type': 'casual',  # 默认为闲聊
             'confidence': 0.0,
             'reasoning': []
@@ -63,7 +44,7 @@ class ConversationContextAnalyzer:
         
         # 判断对话类型
         context_type, confidence, reasoning = self._determine_context_type(
-            user_input, analysis['casual_score'], analysis['professional_score'], expert_type
+            user_input, analysis['casual_score'], analysis['professional_score'], expert_type, keyword_scores
         )
         
         analysis.update({
@@ -79,21 +60,13 @@ class ConversationContextAnalyzer:
         question_markers = ['？', '?', '吗', '呢', '吧', '如何', '怎么', '什么', '哪个', '为什么']
         return any(marker in text for marker in question_markers)
     
-    def _calculate_casual_score(self, text: str) -> float:
+    def _calculate_casual_score(self, text: str, keyword_scores: Optional[Dict[str, float]] = None) -> float:
         """计算闲聊分数"""
-        score = 0.0
-        total_patterns = 0
-        
-        for category, patterns in self.casual_patterns.items():
-            for pattern in patterns:
-                if pattern in text:
-                    if category == 'greetings':
-                        score += 3.0  # 问候语权重更高
-                    elif category == 'emotions':
-                        score += 2.0  # 情感表达权重较高
-                    else:
-                        score += 1.0
-                total_patterns += 1
+        if keyword_scores is None:
+            keyword_scores = self.router.scores(text)
+        
+        # 问候语、情感表达权重更高，见关键词注册表
+        score = sum(value for label, value in keyword_scores.items() if label.startswith('casual:'))
         
         # 短文本倾向于闲聊
         if len(text) <= 10:
@@ -106,26 +79,18 @@ class ConversationContextAnalyzer:
         
         return min(score, 10.0)  # 限制最大分数
     
-    def _calculate_professional_score(self, text: str, expert_type: str = None) -> float:
+    def _calculate_professional_score(self, text: str, expert_type: str = None,
+                                      keyword_scores: Optional[Dict[str, float]] = None) -> float:
         """计算专业询问分数"""
-        score = 0.0
-        
-        # 通用专业模式匹配
-        for category, patterns in self.professional_patterns.items():
-            for pattern in patterns:
-                if pattern in text:
-                    if category == 'detailed_inquiry':
-                        score += 3.0  # 详细询问权重最高
-                    elif category == 'knowledge_seeking':
-                        score += 2.5  # 知识寻求权重较高
-                    else:
-                        score += 2.0
+        if keyword_scores is None:
+            keyword_scores = self.router.scores(text)
+        
+        # 通用专业模式匹配（详细询问权重最高，其次是知识寻求）
+        score = sum(value for label, value in keyword_scores.items() if label.startswith('professional:'))
         
         # 专家领域关键词匹配
-        if expert_type and expert_type in self.expert_keywords:
-            for keyword in self.expert_keywords[expert_type]:
-                if keyword in text:
-                    score += 2.0
+        if expert_type:
+            score += keyword_scores.get(f'domain:{expert_type}', 0.0)
         
         # 长文本倾向于专业询问
         if len(text) > 20:
@@ -136,12 +101,15 @@ class ConversationContextAnalyzer:
         return min(score, 10.0)  # 限制最大分数
     
     def _determine_context_type(self, text: str, casual_score: float, 
-                               professional_score: float, expert_type: str = None) -> Tuple[str, float, List[str]]:
+                               professional_score: float, expert_type: str = None,
+                               keyword_scores: Optional[Dict[str, float]] = None) -> Tuple[str, float, List[str]]:
         """确定对话类型"""
         reasoning = []
+        if keyword_scores is None:
+            keyword_scores = self.router.scores(text)
         
         # 特殊情况判断
-        if any(greeting in text for greeting in self.casual_patterns['greetings']):
+        if 'casual:greetings' in keyword_scores:
             reasoning.append("包含问候语")
             if len(text) <= 15:  # 简短问候
                 return 'casual', 0.9, reasoning + ["简短问候，判定为闲聊"]
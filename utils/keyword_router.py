@@ -0,0 +1,185 @@
+"""
+关键词路由工具
+用一个 Aho-Corasick 多模式自动机一次扫描问题文本，得到各专家和各情境类别的加权得分
+"""
+
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# 关键词注册表：标签 -> {关键词: 权重}
+# expert:* 用于选择专家，
+# casual:* / professional:* / domain:* 用于判断对话情境
+KEYWORD_REGISTRY: Dict[str, Dict[str, float]] = {
+    # 专家领域（专有名词权重高，泛化词权重低）
+    "expert:cantonese_opera": {
+        "粤剧": 3.0, "戏曲": 2.0, "唱腔": 2.0, "行当": 2.0, "脸谱": 2.0, "表演": 1.0
+    },
+    "expert:architecture": {
+        "骑楼": 3.0, "建筑": 2.0, "园林": 2.0, "民居": 2.0, "祠堂": 2.0, "庙宇": 2.0
+    },
+    "expert:culinary": {
+        "美食": 2.0, "菜系": 2.0, "小吃": 2.0, "点心": 2.0, "茶楼": 2.0
+    },
+    "expert:festival": {
+        "节庆": 2.0, "民俗": 2.0, "习俗": 2.0, "庆典": 2.0, "仪式": 1.5, "传统": 0.5
+    },
+    "expert:tea_culture": {
+        "茶文化": 3.0, "工夫茶": 3.0, "茶艺": 2.0, "茶道": 2.0, "茶叶": 2.0, "品茶": 2.0,
+        "乌龙茶": 2.0, "单丛": 2.0, "普洱": 2.0, "铁观音": 2.0, "龙井": 2.0,
+        "绿茶": 2.0, "红茶": 2.0, "水仙": 1.0
+    },
+    "expert:craft": {
+        "广绣": 3.0, "广彩": 3.0, "牙雕": 3.0, "木雕": 2.0, "石雕": 2.0, "雕刻": 2.0,
+        "工艺": 1.5, "技艺": 1.0, "绣": 1.0
+    },
+    "expert:literature": {
+        "诗词鉴赏": 3.0, "诗词": 2.0, "诗歌": 2.0, "诗句": 2.0, "古文": 2.0,
+        "文学": 2.0, "古典": 1.0
+    },
+    "expert:tcm": {
+        "中医": 3.0, "中药": 2.0, "药材": 2.0, "经络": 2.0, "穴位": 2.0,
+        "气血": 2.0, "食疗": 2.0, "养生": 1.5
+    },
+
+    # 闲聊情境
+    "casual:greetings": {k: 3.0 for k in ["你好", "您好", "嗨", "哈喽", "早上好", "下午好", "晚上好", "晚安"]},
+    "casual:simple_questions": {k: 1.0 for k in ["怎么样", "如何", "好吗", "是吗", "对吧", "呢"]},
+    "casual:emotions": {k: 2.0 for k in ["哈哈", "嘿嘿", "呵呵", "哇", "哎呀", "真的", "太好了", "不错"]},
+    "casual:casual_responses": {k: 1.0 for k in ["嗯嗯", "是啊", "对对", "好的", "明白", "知道了", "谢谢"]},
+    "casual:simple_praise": {k: 1.0 for k in ["厉害", "棒", "好", "不错", "赞", "牛", "强"]},
+    "casual:personal_sharing": {k: 1.0 for k in ["我觉得", "我认为", "我想", "我喜欢", "我也是"]},
+
+    # 专业询问情境
+    "professional:detailed_inquiry": {k: 3.0 for k in ["详细", "具体", "怎么做", "如何制作", "步骤", "方法", "技巧", "要点"]},
+    "professional:knowledge_seeking": {k: 2.5 for k in ["介绍", "讲解", "说说", "告诉我", "解释", "什么是", "为什么"]},
+    "professional:comparison": {k: 2.0 for k in ["比较", "区别", "不同", "相比", "对比", "哪个好", "推荐"]},
+    "professional:history_culture": {k: 2.0 for k in ["历史", "由来", "起源", "发展", "传统", "文化", "背景", "意义"]},
+    "professional:technical_terms": {k: 2.0 for k in ["工艺", "技法", "材料", "结构", "特色", "特点", "原理"]},
+
+    # 各专家领域的专业用语（判断情境时使用）
+    "domain:culinary": {k: 2.0 for k in ["制作", "食材", "烹饪", "菜谱", "配料", "调味", "火候", "刀工"]},
+    "domain:cantonese_opera": {k: 2.0 for k in ["唱腔", "表演", "剧目", "行当", "脸谱", "身段", "念白", "做工"]},
+    "domain:architecture": {k: 2.0 for k in ["建筑", "结构", "材料", "工艺", "设计", "布局", "装饰", "风格"]},
+    "domain:festival": {k: 2.0 for k in ["习俗", "仪式", "庆典", "活动", "寓意", "传说", "节日", "民俗"]},
+}
+
+# 没有命中任何专家（综合性问题）时按此顺序邀请
+DEFAULT_EXPERT_ORDER = [
+    "cantonese_opera", "architecture", "culinary", "festival",
+    "tea_culture", "craft", "literature", "tcm"
+]
+
+
+class AhoCorasick:
+    """Aho-Corasick 多模式匹配自动机"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        if pattern not in self._output[state]:
+            self._output[state].append(pattern)
+
+    def _build(self):
+        """按广度优先计算失败指针，并把后缀模式合并到输出"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """产出 (结束位置, 模式)，包括相互重叠的匹配"""
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern in self._output[state]:
+                yield index, pattern
+
+
+class KeywordRouter:
+    """基于关键词注册表的路由器
+
+    每个关键词在一段文本中只计一次（与 `keyword in text` 的判断一致），
+    同一关键词可以同时属于多个标签。
+    """
+
+    def __init__(self, registry: Dict[str, Dict[str, float]]):
+        self.registry = registry
+        self._labels: Dict[str, List[Tuple[str, float]]] = {}
+        for label, keywords in registry.items():
+            for keyword, weight in keywords.items():
+                self._labels.setdefault(keyword, []).append((label, weight))
+        self._automaton = AhoCorasick(self._labels.keys())
+
+    def matches(self, text: str) -> Set[str]:
+        """返回文本中出现的全部关键词"""
+        return {pattern for _, pattern in self._automaton.iter_matches(text or "")}
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """一次扫描得到各标签的加权得分（只包含命中的标签）"""
+        scores: Dict[str, float] = {}
+        for keyword in self.matches(text):
+            for label, weight in self._labels[keyword]:
+                scores[label] = scores.get(label, 0.0) + weight
+        return scores
+
+    def rank_experts(self, text: str, scores: Optional[Dict[str, float]] = None) -> List[Tuple[str, float]]:
+        """按得分从高到低返回命中的专家，得分相同时按默认顺序"""
+        if scores is None:
+            scores = self.scores(text)
+        ranked = [
+            (label.split(":", 1)[1], score)
+            for label, score in scores.items() if label.startswith("expert:")
+        ]
+        order = {expert: index for index, expert in enumerate(DEFAULT_EXPERT_ORDER)}
+        ranked.sort(key=lambda item: (-item[1], order.get(item[0], len(order))))
+        return ranked
+
+    def candidate_experts(self, text: str) -> List[Tuple[str, float]]:
+        """按相关度排列的候选专家
+
+        命中的专家按得分排序；没有命中任何专家时（如泛泛的综合性问题），
+        按默认顺序返回全部专家（得分为0）。综合性关键词（如“历史”“文化”）
+        只在没有命中专家时起作用，不会给已明确领域的问题补充无关专家。
+        """
+        candidates = self.rank_experts(text)
+        if not candidates:
+            candidates = [(expert, 0.0) for expert in DEFAULT_EXPERT_ORDER]
+        return candidates
+
+    def select_experts(self, text: str, top_k: int) -> List[str]:
+        """选择最多 top_k 位专家"""
+        return [expert for expert, _ in self.candidate_experts(text)[:top_k]]
+
+
+# 自动机只在模块加载时构建一次
+_keyword_router = KeywordRouter(KEYWORD_REGISTRY)
+
+def get_keyword_router() -> KeywordRouter:
+    """获取全局关键词路由器"""
+    return _keyword_router
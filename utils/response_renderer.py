@@ -0,0 +1,73 @@
+"""
+回复渲染
+对话记录只保存原始文本和格式版本，调用方需要时再按指定格式渲染，渲染结果放在LRU缓存中
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from utils.text_formatter import FORMAT_VERSION, format_agent_response, text_formatter
+
+# 支持的渲染格式：原始文本、专家卡片HTML、排版后的纯文本
+RENDER_FORMATS = ("raw", "html", "text")
+
+
+class ResponseRenderer:
+    """回复渲染器
+
+    以 (格式版本, 格式, 专家类型, 原始文本) 为键缓存渲染结果；
+    格式化规则升级时修改 FORMAT_VERSION，旧的缓存结果自然失效。
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, str, Optional[str], str], str]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def render(self, text: str, agent_type: Optional[str] = None, fmt: str = "html") -> str:
+        """按指定格式渲染回复；fmt 为 raw 或文本为空时直接返回原文"""
+        if fmt not in RENDER_FORMATS:
+            raise ValueError(f"不支持的渲染格式: {fmt}")
+        if fmt == "raw" or not text:
+            return text
+
+        key = (FORMAT_VERSION, fmt, agent_type, text)
+        rendered = self._entries.get(key)
+        if rendered is not None:
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return rendered
+
+        self._stats["misses"] += 1
+        if fmt == "html":
+            rendered = format_agent_response(text, agent_type)
+        else:
+            rendered = text_formatter.format_text(text)
+
+        if self.max_entries > 0:
+            self._entries[key] = rendered
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return rendered
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取渲染缓存统计"""
+        stats = dict(self._stats)
+        stats.update({"entries": len(self._entries), "format_version": FORMAT_VERSION})
+        return stats
+
+
+# 全局渲染器实例
+_response_renderer = None
+
+def get_response_renderer() -> ResponseRenderer:
+    """获取回复渲染器实例"""
+    global _response_renderer
+    if _response_renderer is None:
+        from config import Config
+        _response_renderer = ResponseRenderer(max_entries=Config.RENDER_CACHE_MAX_ENTRIES)
+    return _response_renderer
+
+def render_response(text: str, agent_type: Optional[str] = None, fmt: str = "html") -> str:
+    """按指定格式渲染回复（带缓存）"""
+    return get_response_renderer().render(text, agent_type, fmt)
@@ -0,0 +1,251 @@
+"""
+流式增量格式化
+在大模型的增量片段到达时逐段排版，只扣住还无法确定格式的最短后缀（未闭合的 **、
+行首可能是列表或标题的标记、可能组成省略号的点等），每个字符只处理一次
+"""
+
+import re
+from typing import Dict, List, Optional
+
+# 流式接口支持的输出格式：原始片段、排版后的文本
+STREAM_FORMATS = ("raw", "text")
+
+# 行首的时间点（如"上午："）
+_TIME_MARKERS = ('上午', '下午', '早晨', '中午', '傍晚', '晚上', '夜晚')
+_TIME_MARKER_PREFIXES = frozenset(marker[:length] for marker in _TIME_MARKERS for length in (1, 2))
+_NOTICES = {'注意': '⚠️ 注意：', '提示': '💡 提示：', '重要': '⭐ 重要：'}
+_NOTICE_FIRST_CHARS = frozenset(word[0] for word in _NOTICES)
+
+# 强调标记及其替换
+_SPAN_MARKS = {'**': ('【', '】'), '*': ('《', '》'), '`': ('「', '」')}
+
+# 行中不需要特殊处理的连续字符，整段输出
+_PLAIN_RUN = re.compile(r'[^*`\-.注提重\n]+')
+
+
+class IncrementalFormatter:
+    """增量格式化器
+
+    规则与 TextFormatter 的行内规则一致，但以行为范围：
+    - 行首：# 标题 -> ■，- / * 列表 -> •，"1. " -> 📋 步骤1：，> 引用 -> 💬，"上午：" -> 🕐 上午：
+    - 行内：**粗体** -> 【】，*斜体* -> 《》，`代码` -> 「」，多余的星号去掉，
+      --- -> ——，... -> …，"注意：" 等提示词加图标
+    - 强调标记到行尾仍未闭合时按原文输出（去掉星号）
+
+    feed() 返回本次可以确定的排版结果，flush() 在流结束时输出剩余内容。
+    """
+
+    def __init__(self):
+        self._pending = ""          # 尚未确定格式的后缀
+        self._line_start = True
+        self._skip_spaces = False   # 行首标记和提示词后面的空格
+        self._swallow = ""          # 已折叠为 —— / … 的符号，后续相同字符丢弃
+        self._span: Optional[str] = None
+        self._span_parts: List[str] = []
+
+    def feed(self, delta: str) -> str:
+        """输入一个增量片段，返回可以输出的排版结果"""
+        if not delta:
+            return ""
+        out: List[str] = []
+        self._run(self._pending + delta, out, final=False)
+        return "".join(out)
+
+    def flush(self) -> str:
+        """流结束，输出所有剩余内容"""
+        out: List[str] = []
+        if self._pending:
+            self._run(self._pending, out, final=True)
+        self._end_line(out)
+        return "".join(out)
+
+    def _write(self, out: List[str], text: str):
+        (self._span_parts if self._span else out).append(text)
+
+    def _run(self, text: str, out: List[str], final: bool):
+        self._pending = ""
+        i, n = 0, len(text)
+        while i < n:
+            c = text[i]
+            if self._skip_spaces:
+                if c == ' ' or c == '\t':
+                    i += 1
+                    continue
+                self._skip_spaces = False
+            if self._swallow:
+                if c == self._swallow:
+                    i += 1
+                    continue
+                self._swallow = ""
+
+            if self._line_start:
+                if c == '\n':
+                    out.append(c)
+                    i += 1
+                    continue
+                j = self._line_marker(text, i, out, final)
+                if j is None:
+                    # 行首标记还不能确定，等待后续片段
+                    self._pending = text[i:]
+                    return
+                self._line_start = False
+                if j > i:
+                    i = j
+                    continue
+
+            if c == '\n':
+                self._end_line(out)
+                out.append(c)
+                self._line_start = True
+                i += 1
+            elif c == '*':
+                j = i
+                while j < n and text[j] == '*':
+                    j += 1
+                if j == n and not final:
+                    self._pending = text[i:]
+                    return
+                self._star_run(j - i, out)
+                i = j
+            elif c == '`':
+                if self._span == '`':
+                    self._close_span(out)
+                elif self._span is None:
+                    self._span = '`'
+                else:
+                    self._write(out, c)
+                i += 1
+            elif c == '-' or c == '.':
+                j = i
+                while j < n and text[j] == c:
+                    j += 1
+                if j - i >= 3:
+                    self._write(out, '——' if c == '-' else '…')
+                    self._swallow = c
+                elif j == n and not final:
+                    self._pending = text[i:]
+                    return
+                else:
+                    self._write(out, text[i:j])
+                i = j
+            elif c in _NOTICE_FIRST_CHARS:
+                word = text[i:i + 2]
+                if word in _NOTICES and i + 2 < n:
+                    if text[i + 2] in '：:':
+                        self._write(out, _NOTICES[word])
+                        self._skip_spaces = True
+                        i += 3
+                    else:
+                        self._write(out, word)
+                        i += 2
+                elif i + len(word) == n and not final and (word in _NOTICES or len(word) == 1):
+                    self._pending = text[i:]
+                    return
+                else:
+                    self._write(out, c)
+                    i += 1
+            else:
+                match = _PLAIN_RUN.match(text, i)
+                self._write(out, match.group())
+                i = match.end()
+
+    def _line_marker(self, text: str, i: int, out: List[str], final: bool) -> Optional[int]:
+        """处理行首标记，返回标记之后的位置；没有标记时返回 i，还不能确定时返回 None"""
+        n = len(text)
+        c = text[i]
+        if c == '#':
+            j = i
+            while j < n and text[j] == '#':
+                j += 1
+            if j == n:
+                return i if final else None
+            if j - i <= 6 and text[j] != '\n':
+                out.append('■ ')
+                self._skip_spaces = True
+                return j
+            return i
+        if c == '>':
+            out.append('💬 ')
+            self._skip_spaces = True
+            return i + 1
+        if c == '-' or c == '*':
+            if i + 1 == n:
+                return i if final else None
+            if text[i + 1] in ' \t':
+                out.append('• ')
+                self._skip_spaces = True
+                return i + 2
+            return i
+        if '0' <= c <= '9':
+            j = i
+            while j < n and '0' <= text[j] <= '9':
+                j += 1
+            if j + 1 >= n:
+                if j == n or text[j] == '.':
+                    return i if final else None
+                return i
+            if text[j] == '.' and text[j + 1] in ' \t':
+                out.append(f'📋 步骤{text[i:j]}：')
+                self._skip_spaces = True
+                return j + 2
+            return i
+        if c in '上下早中傍晚夜':
+            head = text[i:i + 3]
+            if len(head) == 3 and head[:2] in _TIME_MARKERS and head[2] in '：:':
+                out.append(f'🕐 {head[:2]}：')
+                self._skip_spaces = True
+                return i + 3
+            if len(head) < 3 and not final and head in _TIME_MARKER_PREFIXES:
+                return None
+        return i
+
+    def _star_run(self, count: int, out: List[str]):
+        """处理一串星号：打开或闭合粗体、斜体，多余的星号去掉"""
+        if self._span == '`':
+            self._write(out, '*' * count)
+        elif self._span == '*':
+            self._close_span(out)
+        elif self._span == '**':
+            if count >= 2:
+                self._close_span(out)
+        elif count <= 2:
+            self._span = '*' * count
+
+    def _close_span(self, out: List[str]):
+        opening, closing = _SPAN_MARKS[self._span]
+        content = "".join(self._span_parts)
+        self._span = None
+        self._span_parts = []
+        if content:
+            out.append(opening + content + closing)
+
+    def _end_line(self, out: List[str]):
+        """行结束：未闭合的强调标记按原文输出（星号去掉）"""
+        if self._span is None:
+            return
+        prefix = '`' if self._span == '`' else ''
+        content = "".join(self._span_parts)
+        self._span = None
+        self._span_parts = []
+        out.append(prefix + content)
+
+
+class StreamFormatters:
+    """按发言人分别维护增量格式化器，用于多位专家交替输出的流；fmt 为 raw 时原样返回"""
+
+    def __init__(self, fmt: str = "raw"):
+        self.fmt = fmt if fmt in STREAM_FORMATS else "raw"
+        self._formatters: Dict[str, IncrementalFormatter] = {}
+
+    def feed(self, key: str, chunk: str) -> str:
+        if self.fmt == "raw":
+            return chunk
+        formatter = self._formatters.get(key)
+        if formatter is None:
+            formatter = self._formatters[key] = IncrementalFormatter()
+        return formatter.feed(chunk)
+
+    def flush(self, key: str) -> str:
+        """某位发言人的输出结束，返回剩余内容"""
+        formatter = self._formatters.pop(key, None)
+        return formatter.flush() if formatter is not None else ""
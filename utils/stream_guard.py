@@ -0,0 +1,104 @@
+"""
+流式响应断线保护
+客户端断开SSE连接后立即取消上游的大模型请求和并发的专家任务，不再继续消耗tokens和连接
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict
+
+from fastapi import Request
+
+logger = logging.getLogger(__name__)
+
+# 上游流结束的标记
+_STREAM_END = object()
+
+
+class StreamGuard:
+    """流式响应断线保护
+
+    上游生成器在独立任务中运行，输出经有界队列转交给响应，队列满时上游等待，
+    客户端读得慢时不会无限缓存；同时定期检查 request.is_disconnected()。
+    发现断线，或者响应本身被关闭（发送失败、服务器取消）时，取消上游任务，
+    取消会一直传递到大模型请求和专家任务。
+    """
+
+    def __init__(self, poll_interval: float = 0.5, queue_size: int = 64):
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self._stats = {"started": 0, "completed": 0, "cancelled": 0, "failed": 0, "active": 0}
+
+    async def _pump(self, stream: AsyncIterator[Any], queue: asyncio.Queue):
+        """把上游的输出搬运到队列，队列满时等待响应取走"""
+        try:
+            async for item in stream:
+                await queue.put(item)
+            await queue.put(_STREAM_END)
+        except (asyncio.CancelledError, Exception):
+            # 出错或被取消时不能再等待：队列满则丢弃最早的一段，保证响应能收到结束标记
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(_STREAM_END)
+            raise
+
+    async def _watch(self, request: Request, producer: asyncio.Task) -> bool:
+        """检测客户端断线，断线时取消上游任务"""
+        while not producer.done():
+            if await request.is_disconnected():
+                producer.cancel()
+                return True
+            await asyncio.sleep(self.poll_interval)
+        return False
+
+    async def guard(self, request: Request, stream: AsyncIterator[Any], name: str = "stream") -> AsyncIterator[Any]:
+        """包装流式响应的生成器"""
+        self._stats["started"] += 1
+        self._stats["active"] += 1
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        producer = asyncio.create_task(self._pump(stream, queue))
+        watcher = asyncio.create_task(self._watch(request, producer))
+        outcome = "cancelled"
+        try:
+            while True:
+                item = await queue.get()
+                if item is _STREAM_END:
+                    break
+                yield item
+
+            if not producer.cancelled():
+                error = producer.exception()
+                if error is not None:
+                    outcome = "failed"
+                    raise error
+                outcome = "completed"
+        finally:
+            watcher.cancel()
+            if not producer.done():
+                producer.cancel()
+            await asyncio.gather(producer, watcher, return_exceptions=True)
+
+            self._stats["active"] -= 1
+            self._stats[outcome] += 1
+            if outcome == "cancelled":
+                logger.info(f"客户端已断开，取消流式响应: {name}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取流式响应统计"""
+        stats = dict(self._stats)
+        stats["poll_interval"] = self.poll_interval
+        stats["queue_size"] = self.queue_size
+        return stats
+
+
+# 全局断线保护实例
+_stream_guard = None
+
+def get_stream_guard() -> StreamGuard:
+    """获取流式响应断线保护实例"""
+    global _stream_guard
+    if _stream_guard is None:
+        from config import Config
+        _stream_guard = StreamGuard(poll_interval=Config.STREAM_DISCONNECT_POLL_MS / 1000,
+                                    queue_size=Config.STREAM_GUARD_QUEUE_SIZE)
+    return _stream_guard
@@ -0,0 +1,91 @@
+"""
+流式输出多路复用工具
+并发运行多个专家的流式回复，按专家顺序或交错方式合并输出
+"""
+
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 单个流结束的标记
+_STREAM_END = object()
+
+
+class StreamMultiplexer:
+    """流式输出多路复用器
+
+    所有流在 start() 时同时启动，各自的输出先缓存在队列中，
+    再由 events() 以 (key, event, chunk) 的形式产出，event 取值为
+    "start"、"chunk"、"done"。
+
+    - ordered=True：按传入顺序逐个输出，后面的流在等待期间继续生成并缓存
+    - ordered=False：谁先生成谁先输出，每个片段都带有所属的 key
+    """
+
+    def __init__(self, streams: Dict[str, AsyncIterator[str]], ordered: bool = True):
+        self.streams = streams
+        self.ordered = ordered
+        self.keys: List[str] = list(streams.keys())
+        self._shared_queue: asyncio.Queue = asyncio.Queue()
+        self._queues: Dict[str, asyncio.Queue] = {key: asyncio.Queue() for key in self.keys}
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        """同时启动所有流"""
+        if self._tasks:
+            return
+        for key, stream in self.streams.items():
+            queue = self._queues[key] if self.ordered else self._shared_queue
+            self._tasks.append(asyncio.create_task(self._pump(key, stream, queue)))
+
+    async def _pump(self, key: str, stream: AsyncIterator[str], queue: asyncio.Queue):
+        """把单个流的输出搬运到队列"""
+        try:
+            async for chunk in stream:
+                await queue.put((key, chunk))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"流式输出 {key} 失败: {e}")
+        finally:
+            queue.put_nowait((key, _STREAM_END))
+
+    async def events(self) -> AsyncIterator[Tuple[str, str, Optional[str]]]:
+        """产出合并后的事件流"""
+        self.start()
+        try:
+            if self.ordered:
+                for key in self.keys:
+                    yield key, "start", None
+                    queue = self._queues[key]
+                    while True:
+                        _, chunk = await queue.get()
+                        if chunk is _STREAM_END:
+                            break
+                        yield key, "chunk", chunk
+                    yield key, "done", None
+            else:
+                started = set()
+                remaining = len(self.keys)
+                while remaining:
+                    key, chunk = await self._shared_queue.get()
+                    if key not in started:
+                        started.add(key)
+                        yield key, "start", None
+                    if chunk is _STREAM_END:
+                        remaining -= 1
+                        yield key, "done", None
+                    else:
+                        yield key, "chunk", chunk
+        finally:
+            await self.aclose()
+
+    async def aclose(self):
+        """取消所有仍在运行的流"""
+        pending = [task for task in self._tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -1,11 +1,188 @@
 """
 文本格式化工具
 用于处理大模型输出的特殊符号和格式，美化文本排版
+
+所有正则在模块加载时编译；format_text 按阶段依次处理，能够合并的规则合并为一次扫描，
+文本中不含所需字符的规则直接跳过
 """
 
 import re
 from typing import Dict, List, Tuple
 
+# 格式化规则的版本，规则变化导致输出不同时加1（对话记录和渲染缓存据此区分）
+FORMAT_VERSION = 1
+
+
+# emoji分点格式
+_EMOJI_FORMAT_PATTERN = re.compile(r'## 📌|[🔷🔶🔹💡]\s*\*\*.*?\*\*')
+_EMOJI_TITLE_PATTERN = re.compile(r'## 📌\s*(.*?)$', re.MULTILINE)
+_EMOJI_POINT_RULES = (
+    (re.compile(r'🔷\s*\*\*(.*?)\*\*\s*\n(.*?)(?=\n\n|🔶|🔹|💡|---|$)', re.DOTALL),
+     r'<div class="emoji-point blue"><strong>🔷 \1</strong><div class="content">\2</div></div>'),
+    (re.compile(r'🔶\s*\*\*(.*?)\*\*\s*\n(.*?)(?=\n\n|🔷|🔹|💡|---|$)', re.DOTALL),
+     r'<div class="emoji-point orange"><strong>🔶 \1</strong><div class="content">\2</div></div>'),
+    (re.compile(r'🔹\s*\*\*(.*?)\*\*\s*\n(.*?)(?=\n\n|🔷|🔶|💡|---|$)', re.DOTALL),
+     r'<div class="emoji-point light-blue"><strong>🔹 \1</strong><div class="content">\2</div></div>'),
+    (re.compile(r'💡\s*\*\*(.*?)\*\*\s*\n(.*?)(?=\n\n|---|$)', re.DOTALL),
+     r'<div class="emoji-summary"><strong>💡 \1</strong><div class="content">\2</div></div>'),
+)
+
+# 时间线指示词（包含了所有时间段）
+_TIMELINE_INDICATORS = (
+    '一日游', '行程', '时间安排', '游览路线',
+    '早晨', '上午', '中午', '下午', '傍晚', '夜晚',
+    '清晨', '深夜', '时光', '时段'
+)
+
+# 章节标题：Markdown标题、粗体标题、第X站/步/章/节、Emoji开头、数字编号、中文数字编号
+_SECTION_TITLE_PATTERN = re.compile(
+    r'#{1,6}\s+'
+    r'|\*\*.*\*\*$'
+    r'|第[一二三四五六七八九十\d]+[站步章节]'
+    r'|[🎯🌟📍🔷🔶🔹💡⭐✨🎊🎉🎭🏮🍽️🏗️]'
+    r'|\d+[\.、]\s*'
+    r'|[一二三四五六七八九十][、．]\s*'
+)
+
+
+def _keyword_pattern(keywords) -> "re.Pattern":
+    """把关键词列表编译为一个正则，一次扫描判断是否包含其中任意一个"""
+    return re.compile('|'.join(re.escape(keyword) for keyword in keywords))
+
+
+_SECTION_TITLE_KEYWORDS = _keyword_pattern([
+    '推荐', '介绍', '特色', '亮点', '重点', '要点',
+    '路线', '行程', '安排', '计划', '攻略',
+    '美食', '小吃', '茶点', '甜品', '菜品',
+    '表演', '节目', '活动', '庆典', '仪式',
+    '建筑', '景点', '地点', '场所', '位置',
+    '工艺', '技法', '制作', '步骤', '方法',
+    '历史', '文化', '传统', '故事', '背景',
+    '总结', '小贴士', '注意事项', '温馨提示'
+])
+_TITLE_HEADING_PATTERN = re.compile(r'^#{1,6}\s+')
+_TITLE_BOLD_PATTERN = re.compile(r'^\*\*(.*)\*\*$')
+_TITLE_NUMBER_PATTERN = re.compile(r'^\d+[\.、]\s*')
+_TITLE_CN_NUMBER_PATTERN = re.compile(r'^[一二三四五六七八九十][、．]\s*')
+
+# 章节图标
+_SECTION_ICONS = {
+    # 位置相关
+    '站': '📍', '地点': '📍', '位置': '📍', '场所': '🏛️',
+    # 美食相关
+    '美食': '🍽️', '小吃': '🥟', '茶点': '🍵', '甜品': '🧁', '菜品': '🍜',
+    # 活动相关
+    '表演': '🎭', '节目': '🎪', '活动': '🎊', '庆典': '🎉', '仪式': '🙏',
+    # 建筑相关
+    '建筑': '🏗️', '景点': '🏛️', '园林': '🌸', '街道': '🛤️',
+    # 工艺相关
+    '工艺': '🎨', '技法': '🔨', '制作': '👨‍🍳', '步骤': '📋',
+    # 文化相关
+    '历史': '📜', '文化': '📚', '传统': '🏮', '故事': '📖',
+    # 其他
+    '推荐': '⭐', '特色': '✨', '亮点': '🌟', '总结': '💡',
+    '贴士': '💭', '提示': '⚠️', '注意': '❗'
+}
+_EXPERT_DEFAULT_ICONS = {
+    "culinary": "🍽️",
+    "cantonese_opera": "🎭",
+    "festival": "🎊",
+    "architecture": "🏗️"
+}
+
+# 章节内容中需要加样式的行
+_HIGHLIGHT_KEYWORDS = _keyword_pattern(['重要', '关键', '必须', '一定要', '特别'])
+_TIP_KEYWORDS = _keyword_pattern(['建议', '提示', '小贴士', '注意', '温馨提示'])
+_QUOTE_KEYWORDS = _keyword_pattern(['古语', '俗话', '传说', '典故', '诗词'])
+
+# 专家信息
+_EXPERT_INFO = {
+    "culinary": {"name": "味师傅", "icon": "👨‍🍳", "title": "广府美食文化"},
+    "cantonese_opera": {"name": "梅韵师傅", "icon": "🎭", "title": "粤剧艺术传承"},
+    "festival": {"name": "庆师傅", "icon": "🎊", "title": "节庆民俗文化"},
+    "architecture": {"name": "匠师傅", "icon": "🏗️", "title": "建筑工艺传统"},
+    "general": {"name": "文化师傅", "icon": "🏮", "title": "广府文化"}
+}
+
+# Markdown（标题按 #### 到 # 的顺序处理）
+_HEADING_PATTERNS = tuple(
+    re.compile(r'^' + '#' * level + r'\s*(.+)$', re.MULTILINE) for level in range(4, 0, -1)
+)
+_BOLD_PATTERN = re.compile(r'\*\*([^*]+)\*\*')
+_ITALIC_PATTERN = re.compile(r'\*([^*]+)\*')
+_CODE_PATTERN = re.compile(r'`([^`]+)`')
+
+# 特殊符号：破折号和省略号的字符互不相交，合并为一次扫描
+_DASH_ELLIPSIS_PATTERN = re.compile(r'-{3,}|\.{3,}')
+
+# 段落
+_EXTRA_NEWLINES_PATTERN = re.compile(r'\n{3,}')
+_SENTENCE_BREAK_PATTERN = re.compile(r'([。！？])(?!\n)([^。！？\n🎭🎵⭐📚🏛️🏮🎨📜🍽️🍵👨‍🍳🥬😋🎊🎉📖📋])')
+_DAY_TITLE_PATTERN = re.compile(r'(Day\s*\d+[：:][^。！？\n]*[。！？]?)(?!\n)')
+_CN_DAY_TITLE_PATTERN = re.compile(r'(第[一二三四五六七八九十\d]+天[：:][^。！？\n]*[。！？]?)(?!\n)')
+_DIVIDER_PATTERN = re.compile(r'(?<!\n)\n?---\n?(?!\n)')
+_NUMBERED_ITEM_PATTERN = re.compile(r'(?<!\n)(?<!步骤)(\d+\.\s)')
+_STEP_PREFIX_PATTERN = re.compile(r'(?<!\n)(📋\s*步骤|👨‍🍳\s*步骤)')
+_NO_INDENT_PATTERN = re.compile(r'^[■●◆▶\-\*\d+\.]|^[🎭🎵⭐📚🏛️🏮🎨📜🍽️🍵👨‍🍳🥬😋🎊🎉📖📋]|^---')
+
+# 列表
+_BULLET_PATTERN = re.compile(r'^[\-\*]\s*(.+)$', re.MULTILINE)
+_STANDARD_LIST_PATTERN = re.compile(r'^(\d+)\.\s*(.+?)(?=\n\s*\n\s*\d+\.\s*|\n\s*\n\s*$|\Z)', re.MULTILINE | re.DOTALL)
+_CONTINUOUS_LIST_PATTERN = re.compile(r'(\d+)\.\s*([^0-9\n]+?)(?=\s*\d+\.\s*|$)')
+_NUMBERED_LINE_PATTERN = re.compile(r'^(\d+)\.\s*(.+)$', re.MULTILINE)
+_COOKING_STEP_PATTERNS = tuple(
+    (keyword, re.compile(f'📋 步骤(\\d+)：([^\\n]*{keyword}[^\\n]*)'))
+    for keyword in (
+        '烤', '炒', '煮', '蒸', '炖', '焖', '煎', '炸', '腌', '调', '拌',
+        '切', '洗', '选', '放', '加', '倒', '刷', '预热', '热锅', '下油',
+        '爆香', '翻炒', '起锅', '焯水', '过油', '勾芡', '收汁', '装盘',
+        '撒', '淋', '浇', '蘸', '搅拌', '揉', '醒面', '发酵', '烘烤'
+    )
+)
+_TIME_POINT_PATTERN = re.compile(r'^([上下]午|早晨|中午|傍晚|晚上|夜晚)[：:]\s*', re.MULTILINE)
+_DAY_HEADER_PATTERN = re.compile(r'^(Day\s*\d+)[：:]', re.MULTILINE)
+_CN_DAY_HEADER_PATTERN = re.compile(r'^(第[一二三四五六七八九十\d]+天)[：:]', re.MULTILINE)
+_STEP_SPACING_PATTERN = re.compile(r'(📋|👨‍🍳)\s*步骤(\d+)：')
+_STEP_LEADING_NEWLINES_PATTERN = re.compile(r'^(\n)+(📋|👨‍🍳)', re.MULTILINE)
+
+# 引用和强调：三个提示词互不重叠，合并为一次扫描
+_QUOTE_BLOCK_PATTERN = re.compile(r'^>\s*(.+)$', re.MULTILINE)
+_NOTICE_PATTERN = re.compile(r'(注意|提示|重要)[:：]\s*')
+_NOTICE_ICONS = {'注意': '⚠️ 注意：', '提示': '💡 提示：', '重要': '⭐ 重要：'}
+
+# 各专家的装饰规则：(关键词正则, 替换), 以及在装饰前换段的正则
+_DECORATIONS = {
+    "cantonese_opera": (
+        ((re.compile(r'(粤剧|戏曲)'), r'🎭 \1'),
+         (re.compile(r'(唱腔|表演|演出)'), r'🎵 \1'),
+         (re.compile(r'(名角|演员|艺术家)'), r'⭐ \1'),
+         (re.compile(r'(剧目|经典|传统)'), r'📚 \1')),
+        re.compile(r'([。！？])\s*(🎭|🎵|⭐|📚)')
+    ),
+    "architecture": (
+        ((re.compile(r'(建筑|骑楼|楼房)'), r'🏛️ \1'),
+         (re.compile(r'(园林|庭院|花园)'), r'🏮 \1'),
+         (re.compile(r'(雕刻|装饰|工艺)'), r'🎨 \1'),
+         (re.compile(r'(历史|文化|传承)'), r'📜 \1')),
+        re.compile(r'([。！？])\s*(🏛️|🏮|🎨|📜)')
+    ),
+    "culinary": (
+        ((re.compile(r'(美食|菜品|佳肴)'), r'🍽️ \1'),
+         (re.compile(r'(茶楼|点心|小食)'), r'🍵 \1'),
+         (re.compile(r'(烹饪|制作|技艺)'), r'👨‍🍳 \1'),
+         (re.compile(r'(食材|原料|配菜)'), r'🥬 \1'),
+         (re.compile(r'(口感|味道|香味)'), r'😋 \1')),
+        re.compile(r'([。！？])\s*(🍽️|🍵|👨‍🍳|🥬|😋)')
+    ),
+    "festival": (
+        ((re.compile(r'(节庆|民俗|庆典)'), r'🎊 \1'),
+         (re.compile(r'(传统|习俗|风俗)'), r'🏮 \1'),
+         (re.compile(r'(活动|仪式|庆祝)'), r'🎉 \1'),
+         (re.compile(r'(文化|历史|意义)'), r'📖 \1')),
+        re.compile(r'([。！？])\s*(🎊|🏮|🎉|📖)')
+    ),
+}
+
 
 class TextFormatter:
     """文本格式化器"""
@@ -135,6 +312,15 @@ class TextFormatter:
         
         # 段落分隔符
         self.paragraph_separators = ['\n\n', '\n\n\n']
+        # format_text 的处理阶段，按顺序执行
+        self.pipeline = (
+            self._process_markdown,         # 1. 处理Markdown格式
+            self._process_special_symbols,  # 2. 处理特殊符号
+            self._optimize_paragraphs,      # 3. 优化段落结构
+            self._process_lists,            # 4. 处理列表格式
+            self._beautify_emphasis,        # 5. 美化引用和强调
+            self._clean_whitespace,         # 6. 清理多余空白
+        )
         
     def format_text(self, text: str) -> str:
         """
@@ -157,62 +343,22 @@ class TextFormatter:
         if self._is_timeline_content(text):
             return self._format_timeline(text)
         
-    def _is_timeline_content(self, text: str) -> bool:
-        formatted_text = self._process_markdown(text)
-        
-        # 2. 处理特殊符号
-        formatted_text = self._process_special_symbols(formatted_text)
-        
-        # 3. 优化段落结构
-        formatted_text = self._optimize_paragraphs(formatted_text)
-        
-        # 4. 处理列表格式
-        formatted_text = self._process_lists(formatted_text)
-        
-        # 5. 美化引用和强调
-        formatted_text = self._beautify_emphasis(formatted_text)
-        
-        # 6. 清理多余空白
-        formatted_text = self._clean_whitespace(formatted_text)
-        
-        return formatted_text
+        for stage in self.pipeline:
+            text = stage(text)
+        return text
     
     def _is_emoji_format(self, text: str) -> bool:
         """检测是否为emoji分点格式内容"""
-        emoji_patterns = [
-            r'## 📌',
-            r'🔷\s*\*\*.*?\*\*',
-            r'🔶\s*\*\*.*?\*\*',
-            r'🔹\s*\*\*.*?\*\*',
-            r'💡\s*\*\*.*?\*\*'
-        ]
-        
-        return any(re.search(pattern, text) for pattern in emoji_patterns)
+        return _EMOJI_FORMAT_PATTERN.search(text) is not None
     
     def _format_emoji_content(self, text: str) -> str:
         """格式化emoji分点内容"""
-        html = text
-        
         # 处理主标题
-        html = re.sub(r'## 📌\s*(.*?)$', r'<div class="emoji-format"><h2>\1</h2>', html, flags=re.MULTILINE)
+        html = _EMOJI_TITLE_PATTERN.sub(r'<div class="emoji-format"><h2>\1</h2>', text)
         
-        # 处理分点内容
-        html = re.sub(r'🔷\s*\*\*(.*?)\*\*\s*\n(.*?)(?=\n\n|🔶|🔹|💡|---|$)', 
-                     r'<div class="emoji-point blue"><strong>🔷 \1</strong><div class="content">\2</div></div>', 
-                     html, flags=re.DOTALL)
-        
-        html = re.sub(r'🔶\s*\*\*(.*?)\*\*\s*\n(.*?)(?=\n\n|🔷|🔹|💡|---|$)', 
-                     r'<div class="emoji-point orange"><strong>🔶 \1</strong><div class="content">\2</div></div>', 
-                     html, flags=re.DOTALL)
-        
-        html = re.sub(r'🔹\s*\*\*(.*?)\*\*\s*\n(.*?)(?=\n\n|🔷|🔶|💡|---|$)', 
-                     r'<div class="emoji-point light-blue"><strong>🔹 \1</strong><div class="content">\2</div></div>', 
-                     html, flags=re.DOTALL)
-        
-        # 处理关键总结
-        html = re.sub(r'💡\s*\*\*(.*?)\*\*\s*\n(.*?)(?=\n\n|---|$)', 
-                     r'<div class="emoji-summary"><strong>💡 \1</strong><div class="content">\2</div></div>', 
-                     html, flags=re.DOTALL)
+        # 处理分点内容和关键总结
+        for pattern, replacement in _EMOJI_POINT_RULES:
+            html = pattern.sub(replacement, html)
         
         # 处理分隔线
         html = html.replace('---', '<hr class="emoji-divider">')
@@ -225,23 +371,7 @@ class TextFormatter:
     
     def _is_timeline_content(self, text: str) -> bool:
         """检测是否为时间线格式内容"""
-        timeline_indicators = [
-            '一日游', '行程', '时间安排', '游览路线', 
-            '早晨', '上午', '中午', '下午', '傍晚', '夜晚',
-            '清晨', '深夜', '时光', '时段'
-        ]
-        
-        # 检查是否包含时间线指示词
-        for indicator in timeline_indicators:
-            if indicator in text:
-                return True
-                
-        # 检查是否包含多个时间段
-        time_periods = ['早晨', '上午', '中午', '下午', '傍晚', '夜晚', '清晨', '深夜']
-        time_count = sum(1 for period in time_periods if period in text)
-        
-        return time_count >= 2
-    
+        return any(indicator in text for indicator in _TIMELINE_INDICATORS)
     def _format_timeline(self, text: str) -> str:
         """格式化时间线内容"""
         # 提取标题
@@ -380,10 +510,10 @@ class TextFormatter:
     def _parse_expert_response(self, text: str) -> List[Dict]:
         """解析专家回复文本结构"""
         sections = []
-        lines = text.strip().split('\n')
-        current_section = {"title": "主要内容", "content": ""}
+        title = "主要内容"
+        content_lines: List[str] = []
         
-        for line in lines:
+        for line in text.strip().split('\n'):
             line = line.strip()
             if not line:
                 continue
@@ -391,23 +521,18 @@ class TextFormatter:
             # 检测是否为新的章节标题
             if self._is_section_title(line):
                 # 保存当前章节
-                if current_section["content"].strip():
-                    sections.append(current_section)
+                if content_lines:
+                    sections.append({"title": title, "content": "\n".join(content_lines)})
                 
                 # 开始新章节
-                current_section = {
-                    "title": self._clean_section_title(line),
-                    "content": ""
-                }
+                title = self._clean_section_title(line)
+                content_lines = []
             else:
-                # 添加到当前章节内容
-                if current_section["content"]:
-                    current_section["content"] += "\n"
-                current_section["content"] += line
+                content_lines.append(line)
         
         # 添加最后一个章节
-        if current_section["content"].strip():
-            sections.append(current_section)
+        if content_lines:
+            sections.append({"title": title, "content": "\n".join(content_lines)})
         
         # 如果没有明确的章节，将整个文本作为一个章节
         if not sections:
@@ -416,106 +541,47 @@ class TextFormatter:
         return sections
     
     def _is_section_title(self, line: str) -> bool:
-        """判断是否为章节标题"""
-        # 检测标题模式
-        title_patterns = [
-            r'^#{1,6}\s+',  # Markdown标题
-            r'^\*\*.*\*\*$',  # 粗体标题
-            r'^第[一二三四五六七八九十\d]+[站步章节]',  # 第X站/步/章/节
-            r'^[🎯🌟📍🔷🔶🔹💡⭐✨🎊🎉🎭🏮🍽️🏗️]',  # Emoji开头
-            r'^\d+[\.、]\s*',  # 数字编号
-            r'^[一二三四五六七八九十][、．]\s*',  # 中文数字编号
-        ]
-        
-        for pattern in title_patterns:
-            if re.match(pattern, line):
-                return True
-        
-        # 检测关键词标题
-        title_keywords = [
-            '推荐', '介绍', '特色', '亮点', '重点', '要点', 
-            '路线', '行程', '安排', '计划', '攻略',
-            '美食', '小吃', '茶点', '甜品', '菜品',
-            '表演', '节目', '活动', '庆典', '仪式',
-            '建筑', '景点', '地点', '场所', '位置',
-            '工艺', '技法', '制作', '步骤', '方法',
-            '历史', '文化', '传统', '故事', '背景',
-            '总结', '小贴士', '注意事项', '温馨提示'
-        ]
-        
-        return any(keyword in line for keyword in title_keywords)
+        """判断是否为章节标题（标题格式或包含标题关键词）"""
+        return bool(_SECTION_TITLE_PATTERN.match(line) or _SECTION_TITLE_KEYWORDS.search(line))
     
     def _clean_section_title(self, title: str) -> str:
         """清理章节标题"""
         # 移除Markdown标记
-        title = re.sub(r'^#{1,6}\s+', '', title)
+        title = _TITLE_HEADING_PATTERN.sub('', title)
         # 移除粗体标记
-        title = re.sub(r'^\*\*(.*)\*\*$', r'\1', title)
+        title = _TITLE_BOLD_PATTERN.sub(r'\1', title)
         # 移除数字编号
-        title = re.sub(r'^\d+[\.、]\s*', '', title)
-        title = re.sub(r'^[一二三四五六七八九十][、．]\s*', '', title)
+        title = _TITLE_NUMBER_PATTERN.sub('', title)
+        title = _TITLE_CN_NUMBER_PATTERN.sub('', title)
         
         return title.strip()
     
     def _get_section_icon(self, title: str, expert_type: str) -> str:
         """根据章节标题和专家类型获取图标"""
-        # 通用图标映射
-        icon_mapping = {
-            # 位置相关
-            '站': '📍', '地点': '📍', '位置': '📍', '场所': '🏛️',
-            # 美食相关
-            '美食': '🍽️', '小吃': '🥟', '茶点': '🍵', '甜品': '🧁', '菜品': '🍜',
-            # 活动相关
-            '表演': '🎭', '节目': '🎪', '活动': '🎊', '庆典': '🎉', '仪式': '🙏',
-            # 建筑相关
-            '建筑': '🏗️', '景点': '🏛️', '园林': '🌸', '街道': '🛤️',
-            # 工艺相关
-            '工艺': '🎨', '技法': '🔨', '制作': '👨‍🍳', '步骤': '📋',
-            # 文化相关
-            '历史': '📜', '文化': '📚', '传统': '🏮', '故事': '📖',
-            # 其他
-            '推荐': '⭐', '特色': '✨', '亮点': '🌟', '总结': '💡',
-            '贴士': '💭', '提示': '⚠️', '注意': '❗'
-        }
-        
         # 根据标题内容匹配图标
-        for keyword, icon in icon_mapping.items():
+        for keyword, icon in _SECTION_ICONS.items():
             if keyword in title:
                 return icon
         
         # 根据专家类型返回默认图标
-        default_icons = {
-            "culinary": "🍽️",
-            "cantonese_opera": "🎭", 
-            "festival": "🎊",
-            "architecture": "🏗️"
-        }
-        
-        return default_icons.get(expert_type, "📝")
+        return _EXPERT_DEFAULT_ICONS.get(expert_type, "📝")
     
     def _format_section_content(self, content: str) -> str:
-        """格式化章节内容"""
-        # 首先应用现有的格式化逻辑
-        formatted_content = self.format_text(content)
-        
-        # 检测特殊内容类型并添加样式
-        lines = content.split('\n')
+        """格式化章节内容：检测特殊内容类型并添加样式"""
         enhanced_lines = []
         
-        for line in lines:
+        for line in content.split('\n'):
             line = line.strip()
             if not line:
                 enhanced_lines.append('<br>')
-                continue
-            
             # 检测高亮内容
-            if any(keyword in line for keyword in ['重要', '关键', '必须', '一定要', '特别']):
+            elif _HIGHLIGHT_KEYWORDS.search(line):
                 enhanced_lines.append(f'<div class="highlight-box">{line}</div>')
             # 检测提示内容
-            elif any(keyword in line for keyword in ['建议', '提示', '小贴士', '注意', '温馨提示']):
+            elif _TIP_KEYWORDS.search(line):
                 enhanced_lines.append(f'<div class="tip-box">{line}</div>')
             # 检测文化引用
-            elif any(keyword in line for keyword in ['古语', '俗话', '传说', '典故', '诗词']):
+            elif _QUOTE_KEYWORDS.search(line):
                 enhanced_lines.append(f'<div class="cultural-quote">{line}</div>')
             else:
                 enhanced_lines.append(line)
@@ -525,69 +591,67 @@ class TextFormatter:
     def _process_markdown(self, text: str) -> str:
         """处理Markdown格式"""
         # 处理标题
-        for level in range(4, 0, -1):
-            pattern = r'^' + '#' * level + r'\s*(.+)$'
-            replacement = self.symbol_mapping.get('#' * level, '■') + ' \\1'
-            text = re.sub(pattern, replacement, text, flags=re.MULTILINE)
+        if '#' in text:
+            for pattern in _HEADING_PATTERNS:
+                text = pattern.sub('■ \\1', text)
         
-        # 处理粗体 **text** -> 【text】
-        text = re.sub(r'\*\*([^*]+)\*\*', r'【\1】', text)
-        
-        # 处理斜体 *text* -> 《text》
-        text = re.sub(r'\*([^*]+)\*', r'《\1》', text)
+        if '*' in text:
+            # 处理粗体 **text** -> 【text】
+            text = _BOLD_PATTERN.sub(r'【\1】', text)
+            
+            # 处理斜体 *text* -> 《text》
+            text = _ITALIC_PATTERN.sub(r'《\1》', text)
         
         # 处理代码块 `code` -> 「code」
-        text = re.sub(r'`([^`]+)`', r'「\1」', text)
+        if '`' in text:
+            text = _CODE_PATTERN.sub(r'「\1」', text)
         
         return text
     
     def _process_special_symbols(self, text: str) -> str:
         """处理特殊符号"""
         # 移除所有剩余的星号（包括单独的星号和未被Markdown处理的星号）
-        text = re.sub(r'\*+', '', text)
-        
-        # 处理破折号
-        text = re.sub(r'---+', '——', text)
-        
-        # 处理省略号
-        text = re.sub(r'\.{3,}', '…', text)
-        
-        # 处理引号
-        text = re.sub(r'"([^"]*)"', r'"\1"', text)
-        text = re.sub(r"'([^']*)'", r"'\1'", text)
+        if '*' in text:
+            text = text.replace('*', '')
         
+        # 处理破折号和省略号
+        if '---' in text or '...' in text:
+            text = _DASH_ELLIPSIS_PATTERN.sub(lambda m: '——' if m.group(0)[0] == '-' else '…', text)
         return text
     
     def _optimize_paragraphs(self, text: str) -> str:
         """优化段落结构"""
         # 规范化换行
-        text = re.sub(r'\n{3,}', '\n\n', text)
+        if '\n\n\n' in text:
+            text = _EXTRA_NEWLINES_PATTERN.sub('\n\n', text)
         
         # 在句号、问号、感叹号后添加适当的换行，但避免与表情符号冲突
-        text = re.sub(r'([。！？])(?!\n)([^。！？\n🎭🎵⭐📚🏛️🏮🎨📜🍽️🍵👨‍🍳🥬😋🎊🎉📖📋])', r'\1\n\n\2', text)
+        text = _SENTENCE_BREAK_PATTERN.sub(r'\1\n\n\2', text)
         
         # 在"Day X"、"第X天"等标题后强制换行
-        text = re.sub(r'(Day\s*\d+[：:][^。！？\n]*[。！？]?)(?!\n)', r'\1\n\n', text)
-        text = re.sub(r'(第[一二三四五六七八九十\d]+天[：:][^。！？\n]*[。！？]?)(?!\n)', r'\1\n\n', text)
+        if 'Day' in text:
+            text = _DAY_TITLE_PATTERN.sub(r'\1\n\n', text)
+        if '天' in text:
+            text = _CN_DAY_TITLE_PATTERN.sub(r'\1\n\n', text)
         
         # 在"---"分隔符前后添加换行
-        text = re.sub(r'(?<!\n)\n?---\n?(?!\n)', r'\n\n---\n\n', text)
+        if '---' in text:
+            text = _DIVIDER_PATTERN.sub(r'\n\n---\n\n', text)
         
         # 在数字编号列表项前添加换行（如"1. "、"2. "等），但避免重复处理已格式化的步骤
-        text = re.sub(r'(?<!\n)(?<!步骤)(\d+\.\s)', r'\n\n\1', text)
+        text = _NUMBERED_ITEM_PATTERN.sub(r'\n\n\1', text)
         
         # 确保步骤格式前有换行
-        text = re.sub(r'(?<!\n)(📋\s*步骤|👨‍🍳\s*步骤)', r'\n\n\1', text)
+        if '步骤' in text:
+            text = _STEP_PREFIX_PATTERN.sub(r'\n\n\1', text)
         
         # 处理段落开头的缩进
-        paragraphs = text.split('\n\n')
         formatted_paragraphs = []
-        
-        for paragraph in paragraphs:
+        for paragraph in text.split('\n\n'):
             paragraph = paragraph.strip()
             if paragraph:
                 # 如果不是特殊格式（如列表、标题、表情符号开头、分隔符、步骤），添加缩进
-                if not re.match(r'^[■●◆▶\-\*\d+\.]|^[🎭🎵⭐📚🏛️🏮🎨📜🍽️🍵👨‍🍳🥬😋🎊🎉📖📋]|^---', paragraph):
+                if not _NO_INDENT_PATTERN.match(paragraph):
                     paragraph = '　　' + paragraph
                 formatted_paragraphs.append(paragraph)
         
@@ -597,80 +661,66 @@ class TextFormatter:
         """处理列表格式 - 优化分点内容的排版和展示"""
         
         # 1. 处理无序列表（- 或 * 开头）
-        text = re.sub(r'^[\-\*]\s*(.+)$', r'• \1', text, flags=re.MULTILINE)
+        if '-' in text or '*' in text:
+            text = _BULLET_PATTERN.sub(r'• \1', text)
         
         # 2. 优先处理标准分点格式（大模型按要求输出的格式）
         # 匹配形如：
         # 1. 内容
         # 
         # 2. 内容
-        # 这种已经有空行分隔的标准格式
-        standard_list_pattern = r'^(\d+)\.\s*(.+?)(?=\n\s*\n\s*\d+\.\s*|\n\s*\n\s*$|\Z)'
-        matches = list(re.finditer(standard_list_pattern, text, re.MULTILINE | re.DOTALL))
-        
-        if matches:
-            # 如果找到标准格式的分点，直接添加图标
-            for match in reversed(matches):  # 从后往前替换避免位置偏移
-                number = match.group(1)
-                content = match.group(2).strip()
-                replacement = f'📋 步骤{number}：{content}'
-                text = text[:match.start()] + replacement + text[match.end():]
-        else:
+        # 这种已经有空行分隔的标准格式，直接添加图标
+        text, count = _STANDARD_LIST_PATTERN.subn(
+            lambda m: f'📋 步骤{m.group(1)}：{m.group(2).strip()}', text
+        )
+        
+        if not count:
             # 3. 处理连续的数字列表（没有标准换行的情况）
-            # 智能识别并分隔连续的数字列表项
-            continuous_pattern = r'(\d+)\.\s*([^0-9\n]+?)(?=\s*\d+\.\s*|$)'
-            continuous_matches = list(re.finditer(continuous_pattern, text))
+            # 智能识别并分隔连续的数字列表项：除第一项外，每一项前添加双换行
+            seen = 0
             
-            if len(continuous_matches) > 1:
-                # 从后往前处理，避免位置偏移
-                new_text = text
-                for i in range(len(continuous_matches) - 1, 0, -1):
-                    match = continuous_matches[i]
-                    # 在当前匹配项前添加双换行
-                    new_text = new_text[:match.start()] + '\n\n' + new_text[match.start():]
-                text = new_text
+            def separate(match):
+                nonlocal seen
+                seen += 1
+                return match.group(0) if seen == 1 else '\n\n' + match.group(0)
+            
+            text = _CONTINUOUS_LIST_PATTERN.sub(separate, text)
             
             # 4. 为所有数字列表项添加步骤图标
-            text = re.sub(r'^(\d+)\.\s*(.+)$', r'📋 步骤\1：\2', text, flags=re.MULTILINE)
-        
-        # 5. 处理烹饪相关的特殊步骤格式（替换为烹饪图标）
-        cooking_keywords = [
-            '烤', '炒', '煮', '蒸', '炖', '焖', '煎', '炸', '腌', '调', '拌', 
-            '切', '洗', '选', '放', '加', '倒', '刷', '预热', '热锅', '下油', 
-            '爆香', '翻炒', '起锅', '焯水', '过油', '勾芡', '收汁', '装盘',
-            '撒', '淋', '浇', '蘸', '搅拌', '揉', '醒面', '发酵', '烘烤'
-        ]
+            text = _NUMBERED_LINE_PATTERN.sub(r'📋 步骤\1：\2', text)
         
-        for keyword in cooking_keywords:
-            # 将包含烹饪关键词的步骤图标替换为烹饪图标
-            text = re.sub(f'📋 步骤(\\d+)：([^\\n]*{keyword}[^\\n]*)', r'👨‍🍳 步骤\1：\2', text)
+        # 5. 处理烹饪相关的特殊步骤格式（替换为烹饪图标），跳过文本中没有出现的关键词
+        if '📋 步骤' in text:
+            for keyword, pattern in _COOKING_STEP_PATTERNS:
+                if keyword in text:
+                    text = pattern.sub(r'👨‍🍳 步骤\1：\2', text)
         
         # 6. 处理其他特殊格式
         # 处理时间点格式（如"上午："、"下午："等）
-        text = re.sub(r'^([上下]午|早晨|中午|傍晚|晚上|夜晚)[：:]\s*', r'🕐 \1：', text, flags=re.MULTILINE)
+        text = _TIME_POINT_PATTERN.sub(r'🕐 \1：', text)
         
         # 处理Day标题格式
-        text = re.sub(r'^(Day\s*\d+)[：:]', r'📅 \1：', text, flags=re.MULTILINE)
-        text = re.sub(r'^(第[一二三四五六七八九十\d]+天)[：:]', r'📅 \1：', text, flags=re.MULTILINE)
+        if 'Day' in text:
+            text = _DAY_HEADER_PATTERN.sub(r'📅 \1：', text)
+        if '天' in text:
+            text = _CN_DAY_HEADER_PATTERN.sub(r'📅 \1：', text)
         
         # 7. 优化分点内容的视觉效果
         # 确保每个步骤前后都有适当的空白
-        text = re.sub(r'(📋|👨‍🍳)\s*步骤(\d+)：', r'\n\1 步骤\2：', text)
-        text = re.sub(r'^(\n)+(📋|👨‍🍳)', r'\n\2', text, flags=re.MULTILINE)
+        if '📋' in text or '👨‍🍳' in text:
+            text = _STEP_SPACING_PATTERN.sub(r'\n\1 步骤\2：', text)
+            text = _STEP_LEADING_NEWLINES_PATTERN.sub(r'\n\2', text)
         
         return text
     
     def _beautify_emphasis(self, text: str) -> str:
         """美化引用和强调"""
         # 处理引用块
-        text = re.sub(r'^>\s*(.+)$', r'💬 \1', text, flags=re.MULTILINE)
+        if '>' in text:
+            text = _QUOTE_BLOCK_PATTERN.sub(r'💬 \1', text)
         
-        # 美化重要提示
-        text = re.sub(r'注意[:：]\s*', '⚠️ 注意：', text)
-        text = re.sub(r'提示[:：]\s*', '💡 提示：', text)
-        text = re.sub(r'重要[:：]\s*', '⭐ 重要：', text)
-        
-        return text
+        # 美化重要提示（注意、提示、重要）
+        return _NOTICE_PATTERN.sub(lambda m: _NOTICE_ICONS[m.group(1)], text)
     
     def _clean_whitespace(self, text: str) -> str:
         """清理多余空白"""
@@ -702,22 +752,10 @@ class TextFormatter:
         Returns:
             格式化后的HTML
         """
-        # 专家信息映射
-        expert_info = {
-            "culinary": {"name": "味师傅", "icon": "👨‍🍳", "title": "广府美食文化"},
-            "cantonese_opera": {"name": "梅韵师傅", "icon": "🎭", "title": "粤剧艺术传承"},
-            "festival": {"name": "庆师傅", "icon": "🎊", "title": "节庆民俗文化"},
-            "architecture": {"name": "匠师傅", "icon": "🏗️", "title": "建筑工艺传统"},
-            "general": {"name": "文化师傅", "icon": "🏮", "title": "广府文化"}
-        }
-        
-        expert = expert_info.get(expert_type, expert_info["general"])
-        
-        # 分析文本结构
-        sections = self._parse_expert_response(text)
+        expert = _EXPERT_INFO.get(expert_type, _EXPERT_INFO["general"])
         
         # 构建卡片HTML
-        card_html = f'''<div class="expert-response-card">
+        parts = [f'''<div class="expert-response-card">
     <div class="expert-response-header">
         <div class="expert-response-title">
             <span class="title-icon">{expert["icon"]}</span>
@@ -727,12 +765,12 @@ class TextFormatter:
             {expert["name"]}为您精心整理
         </div>
     </div>
-    <div class="expert-response-body">'''
+    <div class="expert-response-body">''']
         
-        # 添加各个部分
-        for i, section in enumerate(sections):
+        # 分析文本结构，添加各个部分
+        for section in self._parse_expert_response(text):
             section_icon = self._get_section_icon(section["title"], expert_type)
-            card_html += f'''
+            parts.append(f'''
         <div class="expert-response-section">
             <div class="section-title">
                 <span class="section-icon">{section_icon}</span>
@@ -741,10 +779,10 @@ class TextFormatter:
             <div class="section-content">
                 {self._format_section_content(section["content"])}
             </div>
-        </div>'''
+        </div>''')
         
         # 添加底部签名
-        card_html += f'''
+        parts.append(f'''
     </div>
     <div class="expert-response-footer">
         <div class="expert-signature">
@@ -752,62 +790,32 @@ class TextFormatter:
             <span class="expert-timestamp">刚刚</span>
         </div>
     </div>
-</div>'''
+</div>''')
         
-        return card_html
+        return ''.join(parts)
+    
+    def _decorate(self, text: str, expert_type: str) -> str:
+        """按专家类型添加表情符号，并在装饰前换段"""
+        rules, break_pattern = _DECORATIONS[expert_type]
+        for pattern, replacement in rules:
+            text = pattern.sub(replacement, text)
+        return break_pattern.sub(r'\1\n\n\2', text)
     
     def _add_opera_decorations(self, text: str) -> str:
         """为粤剧专家回复添加装饰"""
-        # 添加戏曲相关的表情符号和格式优化
-        text = re.sub(r'(粤剧|戏曲)', r'🎭 \1', text)
-        text = re.sub(r'(唱腔|表演|演出)', r'🎵 \1', text)
-        text = re.sub(r'(名角|演员|艺术家)', r'⭐ \1', text)
-        text = re.sub(r'(剧目|经典|传统)', r'📚 \1', text)
-        
-        # 优化段落结构 - 在重要信息前添加换行
-        text = re.sub(r'([。！？])\s*(🎭|🎵|⭐|📚)', r'\1\n\n\2', text)
-        
-        return text
+        return self._decorate(text, "cantonese_opera")
     
     def _add_architecture_decorations(self, text: str) -> str:
         """为建筑专家回复添加装饰"""
-        # 添加建筑相关的表情符号和格式优化
-        text = re.sub(r'(建筑|骑楼|楼房)', r'🏛️ \1', text)
-        text = re.sub(r'(园林|庭院|花园)', r'🏮 \1', text)
-        text = re.sub(r'(雕刻|装饰|工艺)', r'🎨 \1', text)
-        text = re.sub(r'(历史|文化|传承)', r'📜 \1', text)
-        
-        # 优化段落结构
-        text = re.sub(r'([。！？])\s*(🏛️|🏮|🎨|📜)', r'\1\n\n\2', text)
-        
-        return text
+        return self._decorate(text, "architecture")
     
     def _add_culinary_decorations(self, text: str) -> str:
         """为美食专家回复添加装饰"""
-        # 添加美食相关的表情符号和格式优化
-        text = re.sub(r'(美食|菜品|佳肴)', r'🍽️ \1', text)
-        text = re.sub(r'(茶楼|点心|小食)', r'🍵 \1', text)
-        text = re.sub(r'(烹饪|制作|技艺)', r'👨‍🍳 \1', text)
-        text = re.sub(r'(食材|原料|配菜)', r'🥬 \1', text)
-        text = re.sub(r'(口感|味道|香味)', r'😋 \1', text)
-        
-        # 优化段落结构
-        text = re.sub(r'([。！？])\s*(🍽️|🍵|👨‍🍳|🥬|😋)', r'\1\n\n\2', text)
-        
-        return text
+        return self._decorate(text, "culinary")
     
     def _add_festival_decorations(self, text: str) -> str:
         """为节庆专家回复添加装饰"""
-        # 添加节庆相关的表情符号和格式优化
-        text = re.sub(r'(节庆|民俗|庆典)', r'🎊 \1', text)
-        text = re.sub(r'(传统|习俗|风俗)', r'🏮 \1', text)
-        text = re.sub(r'(活动|仪式|庆祝)', r'🎉 \1', text)
-        text = re.sub(r'(文化|历史|意义)', r'📖 \1', text)
-        
-        # 优化段落结构
-        text = re.sub(r'([。！？])\s*(🎊|🏮|🎉|📖)', r'\1\n\n\2', text)
-        
-        return text
+        return self._decorate(text, "festival")
 
 
 # 创建全局格式化器实例
@@ -825,4 +833,4 @@ def format_agent_response(text: str, expert_type: str = None) -> str:
     Returns:
         格式化后的文本
     """
-    return text_formatter.format_expert_response(text, expert_type)
\ No newline at end of file
+    return text_formatter.format_expert_response(text, expert_type)
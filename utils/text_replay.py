@@ -0,0 +1,55 @@
+"""
+文本分帧输出工具
+把默认回复、错误提示、缓存结果等整段文本按句子或固定长度切成帧，以流式片段的形式输出
+"""
+
+import asyncio
+import re
+from typing import AsyncIterator, List, Optional
+
+# 句子结尾（含换行），结尾标点与后面的引号、括号一起保留在句子里
+_SENTENCE_PATTERN = re.compile(r'[^。！？!?；;\n]*(?:[。！？!?；;\n]+[”’」』）)]*|$)')
+
+
+def split_frames(text: str, frame_size: int = 32, by_sentence: bool = True) -> List[str]:
+    """把文本切成帧
+
+    by_sentence=True 时按句子切分，超过 frame_size 的句子再按长度切分；
+    否则直接按 frame_size 个字符切分。
+    """
+    if not text:
+        return []
+    frame_size = max(1, frame_size)
+    if not by_sentence:
+        return [text[start:start + frame_size] for start in range(0, len(text), frame_size)]
+
+    frames = []
+    for sentence in _SENTENCE_PATTERN.findall(text):
+        for start in range(0, len(sentence), frame_size):
+            frame = sentence[start:start + frame_size]
+            # 只有空白的帧并入前一帧，避免被前端当作空片段丢弃
+            if frames and not frame.strip():
+                frames[-1] += frame
+            else:
+                frames.append(frame)
+    return frames
+
+
+async def replay_text(text: str, frame_size: Optional[int] = None, by_sentence: bool = True,
+                      delay_ms: Optional[float] = None) -> AsyncIterator[str]:
+    """以流式片段输出整段文本
+
+    默认不做任何延时，打字效果由前端负责；delay_ms 大于0时每帧之间等待相应时间。
+    未指定的参数取 Config.STREAM_REPLAY_FRAME_CHARS / STREAM_REPLAY_DELAY_MS。
+    """
+    if frame_size is None or delay_ms is None:
+        from config import Config
+        if frame_size is None:
+            frame_size = Config.STREAM_REPLAY_FRAME_CHARS
+        if delay_ms is None:
+            delay_ms = Config.STREAM_REPLAY_DELAY_MS
+
+    for index, frame in enumerate(split_frames(text, frame_size, by_sentence)):
+        if index and delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+        yield frame